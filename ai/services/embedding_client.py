@@ -0,0 +1,53 @@
+import base64
+import os
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# web의 임베딩 서비스(manage.py run_embedding_service) 주소, 비어 있으면 모델을 직접 로드
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "")
+
+
+class RemoteEmbeddings(Embeddings):
+    """임베딩 서비스를 호출하는 Embeddings (HuggingFaceEmbeddings와 같은 결과)"""
+
+    def __init__(self, url, normalize=False, timeout=30.0, chunk_size=256):
+        self.normalize = normalize
+        self.chunk_size = chunk_size
+        self._client = httpx.Client(
+            base_url=url.rstrip("/"),
+            timeout=timeout,
+            transport=httpx.HTTPTransport(retries=2),
+        )
+
+    def _embed(self, texts, query=False):
+        # query=True면 서비스의 쿼리 인코더(EMBEDDING_BACKEND=onnx면 int8 모델) 사용
+        response = self._client.post(
+            "/embed",
+            json={
+                "texts": [t.replace("\n", " ") for t in texts],
+                "normalize": self.normalize,
+                "query": query,
+            },
+        )
+        response.raise_for_status()
+        payload = response.json()
+        data = base64.b64decode(payload["b64"])
+        return np.frombuffer(data, dtype=np.float32).reshape(payload["shape"])
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        parts = [
+            self._embed(texts[i : i + self.chunk_size])
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+        return np.concatenate(parts).tolist()
+
+    def embed_query(self, text):
+        return self._embed([text], query=True)[0].tolist()
@@ -16,6 +16,7 @@ from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 
 from models.chat_model import ChatRequest
+from services.embedding_client import EMBEDDING_SERVICE_URL, RemoteEmbeddings
 
 load_dotenv()
 
@@ -67,7 +68,12 @@ def create_chroma_db():
 if not os.path.isdir(DB_DIR):
     create_chroma_db()
 
-embedding_model = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
+# 임베딩 서비스가 있으면 bge-m3를 이 프로세스에 올리지 않음 (HuggingFaceEmbeddings 기본값처럼 정규화 안 함)
+if EMBEDDING_SERVICE_URL:
+    logger.info(f"-------- embedding service: {EMBEDDING_SERVICE_URL}")
+    embedding_model = RemoteEmbeddings(EMBEDDING_SERVICE_URL, normalize=False)
+else:
+    embedding_model = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
 
 
 # 툴 정의
@@ -0,0 +1,158 @@
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apichat.management.commands.bench_retrieval import (
+    DEFAULT_DATASET,
+    load_dataset,
+    percentile,
+    rss_mb,
+)
+
+BACKENDS = ("onnx", "torch")
+
+
+def load_backend(backend, model_name, model_dir):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name, device="cpu")
+    from apichat.utils.onnx_encoder import OnnxEncoder
+
+    return OnnxEncoder(model_dir)
+
+
+class Command(BaseCommand):
+    help = (
+        "QA 데이터셋 질문으로 쿼리 임베딩 백엔드(torch fp32 / onnx int8)의 "
+        "로드 시간, 메모리, 질문 1개 지연(p50/p95), 배치 처리량, 벡터 일치도 측정"
+    )
+
+    def add_arguments(self, parser):
+        from apichat.utils.onnx_encoder import ONNX_MODEL_DIR
+
+        parser.add_argument("--dataset", default=str(DEFAULT_DATASET))
+        parser.add_argument("--samples", type=int, default=200, help="0이면 전체")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            choices=BACKENDS,
+            default=list(BACKENDS),
+            help="순서대로 로드 (메모리를 정확히 보려면 하나씩 실행)",
+        )
+        parser.add_argument("--model", default="BAAI/bge-m3")
+        parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--output", help="결과 JSON 저장 경로")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["dataset"]):
+            raise CommandError(f"데이터셋 없음: {options['dataset']}")
+        items = load_dataset(options["dataset"], options["samples"], options["seed"])
+        questions = [item["question"].replace("\n", " ") for item in items]
+        if not questions:
+            raise CommandError("측정할 질문 없음")
+
+        results, vectors = [], {}
+        for backend in options["backends"]:
+            result, vectors[backend] = self.run_backend(backend, questions, options)
+            results.append(result)
+
+        self.report(results)
+        agreement = None
+        if len(vectors) == 2:
+            a, b = vectors.values()
+            cosine = (a * b).sum(axis=1)
+            agreement = {
+                "mean": round(float(cosine.mean()), 5),
+                "min": round(float(cosine.min()), 5),
+            }
+            self.stdout.write(
+                f"torch/onnx 쿼리 벡터 코사인: 평균 {agreement['mean']:.4f}, "
+                f"최소 {agreement['min']:.4f}"
+            )
+
+        if options["output"]:
+            payload = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "dataset": options["dataset"],
+                "samples": len(questions),
+                "batch_size": options["batch_size"],
+                "results": results,
+                "agreement": agreement,
+            }
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"결과 저장: {options['output']}")
+
+    def run_backend(self, backend, questions, options):
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        model = load_backend(backend, options["model"], options["model_dir"])
+        load_seconds = time.perf_counter() - start
+        rss_loaded = rss_mb()
+
+        def encode(texts, batch_size=1):
+            return model.encode(
+                texts,
+                batch_size=batch_size,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+
+        encode(questions[:8])  # 워밍업
+
+        # 서비스와 같이 질문 1개씩 (쿼리 임베딩은 요청마다 1개)
+        latencies, single = [], []
+        for question in questions:
+            start = time.perf_counter()
+            single.append(encode([question])[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        encode(questions, batch_size=options["batch_size"])
+        batch_seconds = time.perf_counter() - start
+
+        result = {
+            "backend": backend,
+            "load_seconds": round(load_seconds, 2),
+            "rss_mb": {
+                "before": round(rss_before, 1),
+                "loaded": round(rss_loaded, 1),
+                "peak": round(rss_mb(), 1),
+            },
+            "latency_ms": {
+                "p50": round(statistics.median(latencies), 2),
+                "p95": round(percentile(latencies, 0.95), 2),
+                "mean": round(statistics.mean(latencies), 2),
+            },
+            "batch_per_second": round(len(questions) / batch_seconds, 1),
+        }
+        return result, np.asarray(single, dtype=np.float32)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'backend':>7} | {'load(s)':>7} | {'RSS +MB':>7} | {'p50(ms)':>8} | "
+            f"{'p95(ms)':>8} | {'mean(ms)':>8} | {'batch q/s':>9}"
+        )
+        for r in results:
+            rss = r["rss_mb"]["loaded"] - r["rss_mb"]["before"]
+            self.stdout.write(
+                f"{r['backend']:>7} | {r['load_seconds']:>7.1f} | {rss:>7.0f} | "
+                f"{r['latency_ms']['p50']:>8.1f} | {r['latency_ms']['p95']:>8.1f} | "
+                f"{r['latency_ms']['mean']:>8.1f} | {r['batch_per_second']:>9.1f}"
+            )
+        by_backend = {r["backend"]: r for r in results}
+        if len(by_backend) == 2:
+            speedup = (
+                by_backend["torch"]["latency_ms"]["p50"]
+                / by_backend["onnx"]["latency_ms"]["p50"]
+            )
+            self.stdout.write(f"onnx p50 속도 향상: {speedup:.2f}x")
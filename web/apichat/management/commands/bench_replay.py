@@ -0,0 +1,296 @@
+import json
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+# --corpus/--from-db가 없을 때 쓰는 기본 질문 (history는 이번 질문 이전 대화)
+SAMPLE_CORPUS = [
+    {"question": "구글 드라이브 API로 파일 권한 수정하는 방법 알려줘", "history": []},
+    {
+        "question": "Gmail API에서 특정 라벨이 붙은 메일만 가져올 수 있어?",
+        "history": [],
+    },
+    {
+        "question": "그럼 라벨을 새로 만드는 건?",
+        "history": [
+            {"role": "user", "content": "Gmail API에서 라벨 목록 조회 방법"},
+            {
+                "role": "assistant",
+                "content": "users.labels.list 메서드를 호출하면 됩니다.",
+            },
+        ],
+    },
+    {"question": "캘린더 API에서 이벤트를 어떻게 추가하나요?", "history": []},
+    {
+        "question": "How do I update cell values with the Google Sheets API?",
+        "history": [],
+    },
+    {"question": "오늘 날씨 어때?", "history": []},
+    {"question": "딥러닝에서 Transformer 구조가 뭐야?", "history": []},
+]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def load_corpus(path):
+    """JSONL 한 줄에 {"question": ..., "history": [...], "image": 선택}"""
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                item.setdefault("history", [])
+                corpus.append(item)
+    return corpus
+
+
+def corpus_from_db(limit):
+    """최근 사용자 메시지와 그 직전 대화 6개 (views.build_chat_history와 같은 형태)"""
+    from main.models import ChatMessage
+
+    corpus = []
+    questions = ChatMessage.objects.filter(role="user").order_by("-created_at")[:limit]
+    for message in questions:
+        previous = ChatMessage.objects.filter(
+            session=message.session_id,
+            created_at__lt=message.created_at,
+            role__in=("user", "assistant"),
+        ).order_by("-created_at")[:6]
+        history = [{"role": m.role, "content": m.content} for m in reversed(previous)]
+        corpus.append({"question": message.content, "history": history})
+    corpus.reverse()
+    return corpus
+
+
+def summarize(records, elapsed, concurrency):
+    """요청별 metrics 기록 → 처리량, 지연 시간, 노드별 시간"""
+    latencies = [r["seconds"] * 1000 for r in records]
+    node_seconds = defaultdict(list)
+    node_llm = defaultdict(float)
+    non_llm = []
+    for record in records:
+        for node, seconds in record["nodes"]:
+            node_seconds[node].append(seconds * 1000)
+        llm_total = 0.0
+        for call in record["llm"]:
+            node_llm[call["node"]] += call["seconds"] * 1000
+            llm_total += call["seconds"]
+        node_total = sum(seconds for _, seconds in record["nodes"])
+        non_llm.append(max(0.0, node_total - llm_total) * 1000)
+
+    nodes = {}
+    for node, values in node_seconds.items():
+        nodes[node] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.5), 1),
+            "p95_ms": round(percentile(values, 0.95), 1),
+            "llm_share": round(node_llm[node] / sum(values), 3) if sum(values) else 0,
+        }
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(records) / elapsed, 3) if elapsed else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+        },
+        # 노드 시간 합 - LLM 호출 시간 합 (오케스트레이션 + 검색 + 후처리)
+        "non_llm_ms_p50": round(percentile(non_llm, 0.5), 1),
+        "errors": sum(1 for r in records if r.get("error")),
+        "routes": dict(Counter(r["route"] for r in records)),
+        "nodes": nodes,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "OpenAI 대신 로컬 스텁 LLM으로 run_langraph를 재생해서 "
+        "동시 요청 수별 처리량, 지연 시간, 노드별 시간 측정 (파이프라인 성능 회귀 확인용)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", help="질문/히스토리 JSONL 파일")
+        parser.add_argument(
+            "--from-db", type=int, default=0, help="DB의 최근 사용자 메시지 N개 사용"
+        )
+        parser.add_argument("--save-corpus", help="사용한 질문 목록을 JSONL로 저장")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=None,
+            help="동시성 단계별 요청 수 (기본: 코퍼스 크기)",
+        )
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+        parser.add_argument(
+            "--llm-latency", type=float, default=None, help="스텁 LLM 호출당 지연(초)"
+        )
+        parser.add_argument(
+            "--token-latency",
+            type=float,
+            default=None,
+            help="스트리밍 토큰 사이 지연(초)",
+        )
+        parser.add_argument(
+            "--responses", help="종류별 스텁 응답 JSON (classify, quality 등)"
+        )
+        parser.add_argument(
+            "--semantic-cache", action="store_true", help="시맨틱 캐시 사용 (기본: 끔)"
+        )
+        parser.add_argument("--output", help="결과 JSON 저장 경로")
+        parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=20.0,
+            help="baseline 대비 허용할 p50 지연 증가/처리량 감소(%%)",
+        )
+
+    def handle(self, *args, **options):
+        from apichat.utils import http_client, metrics
+        from apichat.utils.stub_llm import configure_stub, stub_config
+
+        # 체인/클라이언트는 노드 모듈 import 시점에 만들어지므로 그래프 로드 전에 스텁으로 전환
+        if (
+            "apichat.utils.langgraph_node2" in sys.modules
+            and http_client.LLM_BACKEND != "stub"
+        ):
+            raise CommandError(
+                "그래프가 이미 OpenAI로 로드됨 → LLM_BACKEND=stub으로 실행"
+            )
+        http_client.LLM_BACKEND = "stub"
+        responses = None
+        if options["responses"]:
+            with open(options["responses"], encoding="utf-8") as f:
+                responses = json.load(f)
+        configure_stub(
+            latency=options["llm_latency"],
+            token_latency=options["token_latency"],
+            responses=responses,
+        )
+        metrics.METRICS_ENABLED = True
+
+        from apichat.utils import main3
+
+        if not options["semantic_cache"]:
+            main3.SEMANTIC_CACHE_ENABLED = False
+
+        if options["corpus"]:
+            corpus = load_corpus(options["corpus"])
+        elif options["from_db"]:
+            corpus = corpus_from_db(options["from_db"])
+        else:
+            corpus = SAMPLE_CORPUS
+        if not corpus:
+            raise CommandError("재생할 질문 없음")
+        if options["save_corpus"]:
+            with open(options["save_corpus"], "w", encoding="utf-8") as f:
+                for item in corpus:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+        def run_one(item, run_id):
+            history = list(item["history"]) + [
+                {"role": "user", "content": item["question"]}
+            ]
+            main3.run_langraph(
+                item["question"], f"bench-{run_id}", item.get("image"), history
+            )
+
+        # 워밍업 (임베딩 모델, 인덱스 로드 등)
+        run_one(corpus[0], uuid.uuid4().hex)
+
+        n = options["requests"] or len(corpus)
+        levels = []
+        for concurrency in options["concurrency"]:
+            records = []
+            listener = records.append
+            metrics.add_listener(listener)
+            run_ids = [uuid.uuid4().hex for _ in range(n)]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(
+                    pool.map(
+                        run_one, [corpus[i % len(corpus)] for i in range(n)], run_ids
+                    )
+                )
+            elapsed = time.perf_counter() - start
+            metrics.remove_listener(listener)
+            levels.append(summarize(records, elapsed, concurrency))
+
+        self.report(levels)
+        result = {
+            "stub": {
+                "latency": stub_config["latency"],
+                "token_latency": stub_config["token_latency"],
+            },
+            "corpus": len(corpus),
+            "levels": levels,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"결과 저장: {options['output']}")
+        if options["baseline"]:
+            self.compare(levels, options["baseline"], options["max_regression"])
+
+    def report(self, levels):
+        self.stdout.write(
+            f"{'conc':>4} | {'req':>4} | {'req/s':>7} | {'p50(ms)':>8} | {'p95(ms)':>8} | "
+            f"{'p99(ms)':>8} | {'non-LLM p50':>11} | {'err':>3} | routes"
+        )
+        for level in levels:
+            latency = level["latency_ms"]
+            self.stdout.write(
+                f"{level['concurrency']:>4} | {level['requests']:>4} | {level['throughput']:>7.2f} | "
+                f"{latency['p50']:>8.1f} | {latency['p95']:>8.1f} | {latency['p99']:>8.1f} | "
+                f"{level['non_llm_ms_p50']:>11.1f} | {level['errors']:>3} | {level['routes']}"
+            )
+
+        for level in levels:
+            self.stdout.write(f"\n노드별 시간 (concurrency={level['concurrency']})")
+            self.stdout.write(
+                f"{'node':>16} | {'count':>5} | {'p50(ms)':>8} | {'p95(ms)':>8} | {'LLM 비중':>8}"
+            )
+            for node, stats in sorted(
+                level["nodes"].items(), key=lambda item: -item[1]["p50_ms"]
+            ):
+                self.stdout.write(
+                    f"{node:>16} | {stats['count']:>5} | {stats['p50_ms']:>8.1f} | "
+                    f"{stats['p95_ms']:>8.1f} | {stats['llm_share']:>8.0%}"
+                )
+
+    def compare(self, levels, path, max_regression):
+        """baseline과 같은 동시성 단계끼리 p50 지연/처리량 비교, 허용치를 넘으면 실패"""
+        with open(path, encoding="utf-8") as f:
+            baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+        failures = []
+        self.stdout.write(f"\nbaseline 비교 ({path}, 허용 {max_regression:.0f}%)")
+        for level in levels:
+            base = baseline.get(level["concurrency"])
+            if base is None:
+                continue
+            latency = (
+                level["latency_ms"]["p50"] / max(base["latency_ms"]["p50"], 1e-9) - 1
+            ) * 100
+            throughput = (1 - level["throughput"] / max(base["throughput"], 1e-9)) * 100
+            self.stdout.write(
+                f"  concurrency={level['concurrency']}: p50 {latency:+.1f}%, "
+                f"처리량 {-throughput:+.1f}%"
+            )
+            if latency > max_regression or throughput > max_regression:
+                failures.append(level["concurrency"])
+
+        if failures:
+            raise CommandError(f"성능 회귀: concurrency {failures}")
@@ -0,0 +1,116 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apichat.management.commands.bench_retrieval import (
+    DEFAULT_DATASET,
+    TAG_FILTERS,
+    first_relevant_rank,
+    load_dataset,
+    percentile,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "QA 데이터셋 질문으로 하이브리드 검색 후 원문 후보에 리랭커 적용 전/후 비교 "
+        "(source_file 기준 recall@N, MRR, 리랭크 지연 시간)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=str(DEFAULT_DATASET))
+        parser.add_argument("--samples", type=int, default=50, help="0이면 전체")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--tag-filter",
+            choices=TAG_FILTERS,
+            default="gold",
+            help="none: 태그 필터 없음, gold: 데이터셋 태그로 필터 (서비스와 같음)",
+        )
+        parser.add_argument(
+            "--text-k", type=int, default=20, help="리랭크할 원문 후보 수 (leg별 k)"
+        )
+        parser.add_argument("--qa-k", type=int, default=20)
+        parser.add_argument(
+            "--top-n", type=int, nargs="+", default=[1, 3, 5, 10], help="recall@N"
+        )
+        parser.add_argument("--model", default=None, help="리랭커 모델 (기본: 설정값)")
+        parser.add_argument("--max-length", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        from apichat.utils.reranker import (
+            RERANKER_BATCH_SIZE,
+            RERANKER_MAX_LENGTH,
+            RERANKER_MODEL,
+            CrossEncoderReranker,
+        )
+        from apichat.utils.retrieval_executor import hybrid_search
+
+        # 질문은 데이터셋에서, 정답은 질문을 만든 원문 source_file (bench_retrieval과 같음)
+        try:
+            items = load_dataset(
+                options["dataset"], options["samples"], options["seed"]
+            )
+        except FileNotFoundError:
+            raise CommandError(f"데이터셋 없음: {options['dataset']}")
+        if not items:
+            raise CommandError("평가할 질문 없음 (question, source_file 필요)")
+
+        reranker = CrossEncoderReranker(
+            model_name=options["model"] or RERANKER_MODEL,
+            max_length=options["max_length"] or RERANKER_MAX_LENGTH,
+            batch_size=options["batch_size"] or RERANKER_BATCH_SIZE,
+        )
+        reranker.score([("warmup", "warmup")])
+
+        top_ns = sorted(options["top_n"])
+        ranks = {"hybrid": [], "rerank": []}
+        latencies, candidates = [], []
+        for item in items:
+            query = item["question"]
+            tags = item["tags"] if options["tag_filter"] == "gold" else []
+            text_docs, qa_docs = hybrid_search(
+                query, tags, options["text_k"], options["qa_k"]
+            )
+            # 본문 → 문서 (리랭커는 본문 순위만 반환하므로 metadata를 다시 찾음)
+            by_text = {}
+            for doc in text_docs:
+                by_text.setdefault(doc.page_content, doc)
+            text = list(by_text)
+            qa = [d.page_content for d in qa_docs]
+
+            # 서비스와 같이 원문/QA 후보를 한 번에 점수 계산
+            start = time.perf_counter()
+            ranked = reranker.rerank_sections(
+                {
+                    "text": ([query], [text], len(text)),
+                    "qa": ([query], [qa], len(qa)),
+                }
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            candidates.append(len(text) + len(qa))
+
+            reranked = [by_text[t] for t in ranked["text"]]
+            ranks["hybrid"].append(first_relevant_rank(text_docs, item["source_file"]))
+            ranks["rerank"].append(first_relevant_rank(reranked, item["source_file"]))
+
+        n = len(items)
+        header = " | ".join(f"{f'R@{k}':>6}" for k in top_ns)
+        self.stdout.write(f"원문 후보 (text_k={options['text_k']}, source_file 기준)")
+        self.stdout.write(f"{'':>8} | {header} | {'MRR':>6}")
+        for name, values in ranks.items():
+            recalls = " | ".join(
+                f"{sum(1 for r in values if r and r <= k) / n:>6.3f}" for k in top_ns
+            )
+            mrr = sum(1 / r for r in values if r) / n
+            self.stdout.write(f"{name:>8} | {recalls} | {mrr:>6.3f}")
+
+        self.stdout.write(
+            f"리랭크 지연(ms): p50 {statistics.median(latencies):.1f}, "
+            f"p95 {percentile(latencies, 0.95):.1f}, "
+            f"평균 후보 {statistics.mean(candidates):.1f}개 "
+            f"(model={reranker.model_name}, samples={n}, "
+            f"tag_filter={options['tag_filter']})"
+        )
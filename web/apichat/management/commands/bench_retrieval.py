@@ -0,0 +1,306 @@
+import json
+import os
+import random
+import resource
+import statistics
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# data/auto_crawler/4_create_qa_json.py가 만드는 QA 데이터셋 (question, tags, source_file)
+DEFAULT_DATASET = (
+    settings.BASE_DIR.parent / "data" / "auto_crawler" / "google_api_qa_dataset.jsonl"
+)
+MODES = ("chroma", "numpy", "bm25", "hybrid")
+TAG_FILTERS = ("none", "gold")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def rss_mb():
+    """현재 프로세스 RSS(MB), /proc이 없으면 최대 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_dataset(path, samples, seed):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            tags = obj.get("tags")
+            if not obj.get("question") or not obj.get("source_file"):
+                continue
+            items.append(
+                {
+                    "question": obj["question"],
+                    "tags": tags if isinstance(tags, list) else [tags] if tags else [],
+                    "source_file": obj["source_file"],
+                }
+            )
+    if samples and samples < len(items):
+        items = random.Random(seed).sample(items, samples)
+    return items
+
+
+def first_relevant_rank(docs, source_file):
+    """source_file이 같은 첫 문서의 순위 (1부터), 없으면 None"""
+    for i, doc in enumerate(docs, start=1):
+        if doc.metadata.get("source_file") == source_file:
+            return i
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "QA 데이터셋 질문으로 Chroma / numpy(DenseIndex) / BM25 / 하이브리드 검색을 "
+        "k, 태그 필터별로 실행해서 source_file 기준 recall@k, MRR, 지연 시간(p50/p99), 메모리, "
+        "numpy exact 결과 대비 Chroma(HNSW) 일치율 측정"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", default=str(DEFAULT_DATASET))
+        parser.add_argument("--samples", type=int, default=200, help="0이면 전체")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 20])
+        parser.add_argument(
+            "--tag-filters",
+            nargs="+",
+            choices=TAG_FILTERS,
+            default=list(TAG_FILTERS),
+            help="none: 필터 없음, gold: 질문의 원래 태그로 필터",
+        )
+        parser.add_argument(
+            "--collection",
+            choices=("text", "qa"),
+            default="text",
+            help="검색할 컬렉션 (qa는 질문 자신이 들어 있어 상한 확인용, Chroma leg는 서비스와 같이 5개 고정)",
+        )
+        parser.add_argument(
+            "--hybrid-weights",
+            type=float,
+            nargs=2,
+            default=None,
+            help="하이브리드 (Chroma, BM25) 융합 가중치 (기본: HYBRID_WEIGHTS)",
+        )
+        parser.add_argument(
+            "--fusion",
+            nargs="+",
+            choices=("rrf", "linear"),
+            default=None,
+            help="하이브리드 융합 방식 (rrf: 가중 RRF, linear: 점수 정규화 가중합, 기본: FUSION_METHOD)",
+        )
+        parser.add_argument(
+            "--warm-embeddings",
+            action="store_true",
+            help="설정마다 쿼리 임베딩 캐시를 비우지 않음 (임베딩 제외 검색 시간만 측정)",
+        )
+        parser.add_argument("--output", help="결과 JSON 저장 경로")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["dataset"]):
+            raise CommandError(f"데이터셋 없음: {options['dataset']}")
+        items = load_dataset(options["dataset"], options["samples"], options["seed"])
+        if not items:
+            raise CommandError("평가할 질문 없음")
+
+        rss_start = rss_mb()
+        from apichat.utils.embedding_cache import query_cache
+        from apichat.utils.fusion import FUSION_METHOD, CandidatePool
+        from apichat.utils.retriever import COLLECTION_NAME
+        from apichat.utils import dense_store
+        from apichat.utils.bm25_store import VECTORSTORES
+        from apichat.utils.retriever_bm25 import BM25_INDEX, BM25_QA_INDEX
+        from apichat.utils.retriever_dense import DENSE_ENGINE, dense_retriever
+        from apichat.utils.retriever_hybrid import HYBRID_WEIGHTS, get_hybrid_pipeline
+        from apichat.utils.retriever_qa import COLLECTION_NAME as QA_COLLECTION_NAME
+        from apichat.utils.retrieval_executor import search_leg
+
+        if options["collection"] == "text":
+            collection, bm25_index = COLLECTION_NAME, BM25_INDEX.get()
+        else:
+            collection, bm25_index = QA_COLLECTION_NAME, BM25_QA_INDEX.get()
+        vs = VECTORSTORES[collection]()
+        weights = options["hybrid_weights"] or HYBRID_WEIGHTS
+        fusions = options["fusion"] or [FUSION_METHOD]
+        rss_loaded = rss_mb()
+        self.stdout.write(
+            f"질문 {len(items)}개, 컬렉션 {collection}, 하이브리드 가중치 {weights} "
+            f"({'/'.join(fusions)}), "
+            f"DENSE_ENGINE {DENSE_ENGINE}, "
+            f"RSS {rss_start:.0f} → {rss_loaded:.0f}MB (인덱스/모델 로드)"
+        )
+
+        dense_index = None
+        if "numpy" in options["modes"]:
+            start = time.perf_counter()
+            dense_index = dense_store.load_index(collection)
+            self.stdout.write(
+                f"Dense 인덱스 {len(dense_index)}개 x {dense_index.dim} "
+                f"{dense_index.vectors.dtype} ({dense_index.vectors.nbytes / 2**20:.0f}MB), "
+                f"로드 {time.perf_counter() - start:.1f}s, RSS {rss_mb():.0f}MB"
+            )
+
+        # chroma/numpy 모드는 DENSE_ENGINE과 관계없이 해당 엔진으로 비교
+        # (QA 컬렉션은 서비스와 같이 5개 고정)
+        dense_retrievers = {}
+
+        def dense_for(mode, tags, k):
+            key = (mode, tuple(sorted(tags)), k)
+            if key not in dense_retrievers:
+                dense_k = k if collection == COLLECTION_NAME else 5
+                if mode == "numpy":
+                    retriever = dense_retriever(dense_index, key[1], dense_k)
+                else:
+                    tag_filter = {"tags": {"$in": list(key[1])}} if key[1] else None
+                    retriever = vs.as_retriever(
+                        search_kwargs={"k": dense_k, "filter": tag_filter}
+                    )
+                dense_retrievers[key] = retriever
+            return dense_retrievers[key]
+
+        def search_for(mode, tags, k, fusion=None):
+            """질문 → Document 리스트 함수 (해당 leg가 없으면 None)"""
+            if mode in ("chroma", "numpy"):
+                return dense_for(mode, tags, k).invoke
+            if mode == "bm25" and not tags:
+                # BM25 leg는 태그가 없으면 만들지 않으므로 전체 태그로 검색
+                tags = list(bm25_index.tag_ranges)
+            pipeline = get_hybrid_pipeline(tags, k, collection)
+            if mode == "bm25":
+                return pipeline.bm25.invoke if pipeline.bm25 is not None else None
+
+            # 서비스(retrieval_executor)와 같이 leg별 결과를 청크 id 기준으로 융합
+            def search(question):
+                pool = CandidatePool()
+                legs = [pipeline.dense, pipeline.bm25]
+                pool.add_legs(
+                    [search_leg(leg, question) if leg else None for leg in legs],
+                    weights,
+                )
+                return pool.ranked(fusion)
+
+            return search
+
+        # 워밍업 (임베딩 모델 첫 호출)
+        search_for("hybrid", items[0]["tags"], 5, fusions[0])(items[0]["question"])
+
+        results = []
+        for mode in options["modes"]:
+            for fusion in fusions if mode == "hybrid" else [None]:
+                for tag_filter in options["tag_filters"]:
+                    for k in sorted(options["k"]):
+                        if not options["warm_embeddings"]:
+                            query_cache.clear()
+                        results.append(
+                            self.run_config(
+                                items, mode, tag_filter, k, search_for, fusion
+                            )
+                        )
+
+        # 같은 설정의 numpy(exact) 결과 대비 Chroma(HNSW) 결과 일치율
+        exact = {
+            (r["tag_filter"], r["k"]): r.pop("_docs")
+            for r in results
+            if r["mode"] == "numpy"
+        }
+        for r in results:
+            docs = r.pop("_docs", None)
+            expected = exact.get((r["tag_filter"], r["k"]))
+            if r["mode"] == "chroma" and expected is not None:
+                r["exact_overlap"] = round(
+                    statistics.mean(
+                        len(set(got) & set(want)) / len(want) if want else 1.0
+                        for got, want in zip(docs, expected)
+                    ),
+                    4,
+                )
+
+        self.report(results)
+        if options["output"]:
+            payload = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "dataset": options["dataset"],
+                "samples": len(items),
+                "seed": options["seed"],
+                "collection": collection,
+                "hybrid_weights": list(weights),
+                "fusion": fusions,
+                "warm_embeddings": options["warm_embeddings"],
+                "rss_mb": {
+                    "start": round(rss_start, 1),
+                    "loaded": round(rss_loaded, 1),
+                },
+                "results": results,
+            }
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"결과 저장: {options['output']}")
+
+    def run_config(self, items, mode, tag_filter, k, search_for, fusion=None):
+        ranks, latencies, returned, contents = [], [], [], []
+        rss_before = rss_mb()
+        peak = rss_before
+        for item in items:
+            tags = item["tags"] if tag_filter == "gold" else []
+            start = time.perf_counter()
+            search = search_for(mode, tags, k, fusion)
+            docs = search(item["question"]) if search is not None else []
+            latencies.append((time.perf_counter() - start) * 1000)
+            docs = docs[:k]
+            returned.append(len(docs))
+            contents.append([doc.page_content for doc in docs])
+            ranks.append(first_relevant_rank(docs, item["source_file"]))
+            peak = max(peak, rss_mb())
+
+        n = len(items)
+        return {
+            "mode": mode,
+            "fusion": fusion,
+            "tag_filter": tag_filter,
+            "k": k,
+            "recall": round(sum(1 for r in ranks if r) / n, 4),
+            "mrr": round(sum(1 / r for r in ranks if r) / n, 4),
+            "latency_ms": {
+                "p50": round(statistics.median(latencies), 2),
+                "p99": round(percentile(latencies, 0.99), 2),
+                "mean": round(statistics.mean(latencies), 2),
+            },
+            "avg_returned": round(statistics.mean(returned), 2),
+            "rss_mb": {
+                "before": round(rss_before, 1),
+                "peak": round(peak, 1),
+                "delta": round(peak - rss_before, 1),
+            },
+            "_docs": contents,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'mode':>13} | {'tags':>4} | {'k':>3} | {'recall@k':>8} | {'MRR':>6} | "
+            f"{'p50(ms)':>8} | {'p99(ms)':>8} | {'docs':>5} | {'RSS peak(MB)':>12}"
+        )
+        for r in results:
+            mode = f"{r['mode']}/{r['fusion']}" if r["fusion"] else r["mode"]
+            self.stdout.write(
+                f"{mode:>13} | {r['tag_filter']:>4} | {r['k']:>3} | {r['recall']:>8.3f} | "
+                f"{r['mrr']:>6.3f} | {r['latency_ms']['p50']:>8.1f} | {r['latency_ms']['p99']:>8.1f} | "
+                f"{r['avg_returned']:>5.1f} | {r['rss_mb']['peak']:>12.0f}"
+            )
+        for r in results:
+            if "exact_overlap" in r:
+                self.stdout.write(
+                    f"chroma/numpy(exact) 일치율 {r['tag_filter']}, k={r['k']}: "
+                    f"{r['exact_overlap']:.3f}"
+                )
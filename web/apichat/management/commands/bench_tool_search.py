@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+# (쿼리, api_tag) - split_queries가 만드는 한글/영어 쌍과 같은 형태
+SAMPLE_QUERIES = [
+    ("구글 드라이브 파일 권한 수정 방법", "drive"),
+    ("How to update file permissions in Google Drive API", "drive"),
+    ("Gmail API 특정 라벨 메일 조회", "gmail"),
+    ("List messages with a label using Gmail API", "gmail"),
+    ("캘린더 API 이벤트 추가", "calendar"),
+    ("Insert an event with Google Calendar API", "calendar"),
+    ("Sheets API 셀 값 업데이트", "sheets"),
+    ("Update cell values with Google Sheets API", "sheets"),
+]
+
+
+class Command(BaseCommand):
+    help = "쿼리 개수별 vector_search_tool 검색 시간 측정 (순차 vs 동시 실행)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="측정할 쿼리 개수 목록",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="반복 횟수")
+        parser.add_argument("--text-k", type=int, default=5)
+        parser.add_argument("--qa-k", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # 모델/DB 로드 비용이 측정에 섞이지 않도록 먼저 import
+        from apichat.utils.langgraph_node2 import run_vector_searches
+
+        def make_args(n):
+            args_list = []
+            for i in range(n):
+                query, tag = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+                args_list.append(
+                    {
+                        "query": query,
+                        "api_tags": [tag],
+                        "text_k": options["text_k"],
+                        "qa_k": options["qa_k"],
+                    }
+                )
+            return args_list
+
+        # 워밍업 (임베딩 모델 첫 호출 등)
+        run_vector_searches(make_args(1), max_workers=1)
+
+        self.stdout.write(
+            f"{'queries':>7} | {'sequential(ms)':>14} | {'concurrent(ms)':>14} | {'speedup':>7}"
+        )
+        for n in options["queries"]:
+            args_list = make_args(n)
+            timings = {}
+            for label, workers in (("sequential", 1), ("concurrent", None)):
+                samples = []
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    run_vector_searches(args_list, max_workers=workers)
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings[label] = statistics.median(samples)
+
+            speedup = timings["sequential"] / max(timings["concurrent"], 1e-9)
+            self.stdout.write(
+                f"{n:>7} | {timings['sequential']:>14.1f} | {timings['concurrent']:>14.1f} | {speedup:>6.2f}x"
+            )
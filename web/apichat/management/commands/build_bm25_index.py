@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Chroma 컬렉션에서 BM25 인덱스를 미리 생성 (배포 전 오프라인 빌드용)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--collection",
+            choices=["text", "qa", "all"],
+            default="all",
+            help="생성할 인덱스 (text: 원문, qa: QA)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="fingerprint가 같아도 다시 생성",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="생성하지 않고 인덱스가 최신인지만 확인 (오래됐으면 종료 코드 1)",
+        )
+
+    def handle(self, *args, **options):
+        import time
+
+        from apichat.utils.bm25_store import (
+            COLLECTION_NAME,
+            INDEX_DIRS,
+            QA_COLLECTION_NAME,
+            VECTORSTORES,
+            build_index,
+            index_status,
+        )
+
+        collections = {
+            "text": [COLLECTION_NAME],
+            "qa": [QA_COLLECTION_NAME],
+            "all": [COLLECTION_NAME, QA_COLLECTION_NAME],
+        }[options["collection"]]
+
+        stale = []
+        for collection in collections:
+            vs = VECTORSTORES[collection]()
+            manifest, fingerprint, fresh = index_status(collection, vs)
+            state = "최신" if fresh else ("없음" if manifest is None else "오래됨")
+            self.stdout.write(f"[{collection}] {INDEX_DIRS[collection]}: {state}")
+
+            if options["check"]:
+                if not fresh:
+                    stale.append(collection)
+                continue
+            if fresh and not options["force"]:
+                continue
+
+            start = time.perf_counter()
+            index = build_index(collection, vs, fingerprint)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"[{collection}] 생성 완료: 문서 {len(index)}개, "
+                    f"용어 {len(index.vocab)}개, 태그 {len(index.tags)}개 "
+                    f"({time.perf_counter() - start:.1f}s)"
+                )
+            )
+
+        if stale:
+            raise CommandError(f"오래된 BM25 인덱스: {', '.join(stale)}")
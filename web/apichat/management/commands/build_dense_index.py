@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Chroma 컬렉션 임베딩으로 numpy Dense 인덱스를 미리 생성 "
+        "(DENSE_ENGINE=numpy용, 배포 전 오프라인 빌드)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--collection",
+            choices=["text", "qa", "all"],
+            default="all",
+            help="생성할 인덱스 (text: 원문, qa: QA)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="fingerprint가 같아도 다시 생성",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="생성하지 않고 인덱스가 최신인지만 확인 (오래됐으면 종료 코드 1)",
+        )
+
+    def handle(self, *args, **options):
+        import time
+
+        from apichat.utils.dense_store import (
+            COLLECTION_NAME,
+            DENSE_INDEX_DTYPE,
+            INDEX_DIRS,
+            QA_COLLECTION_NAME,
+            VECTORSTORES,
+            build_index,
+            index_status,
+        )
+
+        collections = {
+            "text": [COLLECTION_NAME],
+            "qa": [QA_COLLECTION_NAME],
+            "all": [COLLECTION_NAME, QA_COLLECTION_NAME],
+        }[options["collection"]]
+
+        stale = []
+        for collection in collections:
+            vs = VECTORSTORES[collection]()
+            manifest, fingerprint, fresh = index_status(collection, vs)
+            state = "최신" if fresh else ("없음" if manifest is None else "오래됨")
+            self.stdout.write(
+                f"[{collection}] {INDEX_DIRS[collection]} ({DENSE_INDEX_DTYPE}): {state}"
+            )
+
+            if options["check"]:
+                if not fresh:
+                    stale.append(collection)
+                continue
+            if fresh and not options["force"]:
+                continue
+
+            start = time.perf_counter()
+            index = build_index(collection, vs, fingerprint)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"[{collection}] 생성 완료: 문서 {len(index)}개 x {index.dim}차원, "
+                    f"{index.vectors.nbytes / 2**20:.0f}MB, 태그 {len(index.tags)}개 "
+                    f"({time.perf_counter() - start:.1f}s)"
+                )
+            )
+
+        if stale:
+            raise CommandError(f"오래된 Dense 인덱스: {', '.join(stale)}")
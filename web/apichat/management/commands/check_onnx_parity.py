@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+THRESHOLDS = (0.99, 0.98, 0.95)
+
+
+class Command(BaseCommand):
+    help = (
+        "Chroma에 저장된 fp32 문서 임베딩과 ONNX 인코더로 다시 만든 임베딩을 비교해서 "
+        "코사인 드리프트와 자기 자신 검색 일치율(top-1) 리포트"
+    )
+
+    def add_arguments(self, parser):
+        from apichat.utils.onnx_encoder import ONNX_MODEL_DIR
+
+        parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+        parser.add_argument("--collection", choices=("text", "qa"), default="text")
+        parser.add_argument("--samples", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--max-length",
+            type=int,
+            default=None,
+            help="문서 최대 토큰 수 (기본: 모델 max_seq_length, DB 생성 때와 같게)",
+        )
+        parser.add_argument("--batch-size", type=int, default=8)
+        parser.add_argument(
+            "--min-cosine",
+            type=float,
+            default=0.99,
+            help="평균 코사인이 이보다 낮으면 실패 (종료 코드 1)",
+        )
+
+    def handle(self, *args, **options):
+        from apichat.utils.bm25_store import (
+            COLLECTION_NAME,
+            QA_COLLECTION_NAME,
+            VECTORSTORES,
+        )
+        from apichat.utils.onnx_encoder import OnnxEncoder, read_manifest
+
+        manifest = read_manifest(options["model_dir"])
+        if manifest is None:
+            raise CommandError(f"ONNX 모델 없음: {options['model_dir']}")
+        encoder = OnnxEncoder(
+            options["model_dir"],
+            max_length=options["max_length"] or manifest["max_seq_length"],
+        )
+
+        collection = (
+            COLLECTION_NAME if options["collection"] == "text" else QA_COLLECTION_NAME
+        )
+        vs = VECTORSTORES[collection]()
+        ids = vs.get(include=[])["ids"]
+        if not ids:
+            raise CommandError(f"컬렉션이 비어 있음: {collection}")
+        if options["samples"] and options["samples"] < len(ids):
+            ids = random.Random(options["seed"]).sample(ids, options["samples"])
+        data = vs.get(ids=ids, include=["documents", "embeddings", "metadatas"])
+
+        stored = np.asarray(data["embeddings"], dtype=np.float32)
+        stored /= np.maximum(np.linalg.norm(stored, axis=1, keepdims=True), 1e-12)
+        self.stdout.write(
+            f"{collection}: 문서 {len(data['ids'])}개, 모델 {manifest['model']} "
+            f"({'int8' if manifest['quantized'] else 'fp32'}, max_length {encoder.max_length})"
+        )
+        # DB 생성 때(HuggingFaceEmbeddings)와 같이 줄바꿈을 공백으로
+        encoded = encoder.encode(
+            [(doc or "").replace("\n", " ") for doc in data["documents"]],
+            batch_size=options["batch_size"],
+            normalize_embeddings=True,
+        )
+
+        cosine = (stored * encoded).sum(axis=1)
+        # ONNX 벡터로 샘플 안에서 검색했을 때 자기 자신(fp32 벡터)이 1등인 비율
+        top1 = float(
+            np.mean((encoded @ stored.T).argmax(axis=1) == np.arange(len(stored)))
+        )
+
+        self.stdout.write(
+            f"코사인 평균 {cosine.mean():.4f}, 최소 {cosine.min():.4f}, "
+            f"p1 {np.percentile(cosine, 1):.4f}, p5 {np.percentile(cosine, 5):.4f}, "
+            f"중앙값 {np.median(cosine):.4f}"
+        )
+        for threshold in THRESHOLDS:
+            below = int((cosine < threshold).sum())
+            self.stdout.write(f"  < {threshold}: {below}개 ({below / len(cosine):.1%})")
+        self.stdout.write(f"top-1 일치율 {top1:.1%}")
+
+        self.stdout.write("코사인이 가장 낮은 문서")
+        for i in np.argsort(cosine)[:5]:
+            metadata = data["metadatas"][i] or {}
+            self.stdout.write(
+                f"  {cosine[i]:.4f}  {data['ids'][i]}  {metadata.get('source_file', '')} "
+                f"({len(data['documents'][i] or '')}자)"
+            )
+
+        if cosine.mean() < options["min_cosine"]:
+            raise CommandError(
+                f"평균 코사인 {cosine.mean():.4f} < {options['min_cosine']} (양자화 드리프트 큼)"
+            )
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "로컬 의도 분류기를 LLM 분류 결과와 비교 (혼동 행렬, 임계값별 적용률/정확도)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data", default=None, help="정답 JSONL 경로 (기본: 분류 로그)"
+        )
+        parser.add_argument(
+            "--cv",
+            type=int,
+            default=0,
+            help="k-fold 교차 검증 (저장된 분류기 대신 fold마다 새로 학습)",
+        )
+        parser.add_argument(
+            "--thresholds",
+            type=float,
+            nargs="+",
+            default=[0.5, 0.7, 0.85, 0.9, 0.95],
+        )
+
+    def handle(self, *args, **options):
+        import os
+
+        import numpy as np
+
+        from apichat.utils.intent_classifier import (
+            CLASSIFY_LOG_PATH,
+            HEAD_FILE_PATH,
+            LABELS,
+            IntentClassifier,
+            load_labelled,
+            train_classifier,
+            training_data,
+        )
+        from apichat.utils.rag2 import CLASSIFY_EXAMPLES
+
+        path = options["data"] or CLASSIFY_LOG_PATH
+        pairs = load_labelled(path)
+        if not pairs:
+            raise CommandError(f"평가 데이터 없음: {path}")
+
+        # (정답, 예측, 확률) 목록
+        results = []
+        if options["cv"] > 1:
+            k = options["cv"]
+            order = np.random.default_rng(0).permutation(len(pairs))
+            for fold in range(k):
+                test_idx = set(order[fold::k].tolist())
+                train = list(CLASSIFY_EXAMPLES) + [
+                    p for i, p in enumerate(pairs) if i not in test_idx
+                ]
+                classifier = train_classifier(list(dict(train).items()))
+                for i in sorted(test_idx):
+                    question, label = pairs[i]
+                    results.append((label, *classifier.predict(question)))
+        else:
+            if os.path.exists(HEAD_FILE_PATH):
+                classifier = IntentClassifier.load(HEAD_FILE_PATH)
+            else:
+                classifier = train_classifier(training_data(path))
+            for question, label in pairs:
+                results.append((label, *classifier.predict(question)))
+
+        self._report(results, LABELS, options["thresholds"])
+
+    def _report(self, results, labels, thresholds):
+        import numpy as np
+
+        index = {label: i for i, label in enumerate(labels)}
+        matrix = np.zeros((len(labels), len(labels)), dtype=int)
+        for truth, pred, _ in results:
+            matrix[index[truth], index[pred]] += 1
+
+        self.stdout.write(f"평가 {len(results)}개 (행: LLM 라벨, 열: 로컬 예측)")
+        self.stdout.write(" " * 8 + "".join(f"{label:>8}" for label in labels))
+        for label, row in zip(labels, matrix):
+            self.stdout.write(f"{label:>8}" + "".join(f"{v:>8}" for v in row))
+
+        accuracy = np.trace(matrix) / matrix.sum()
+        self.stdout.write(f"\n정확도: {accuracy:.3f}")
+        for i, label in enumerate(labels):
+            precision = matrix[i, i] / max(matrix[:, i].sum(), 1)
+            recall = matrix[i, i] / max(matrix[i, :].sum(), 1)
+            self.stdout.write(
+                f"  {label:>6}: precision {precision:.3f}, recall {recall:.3f}"
+            )
+
+        # 임계값 이상만 로컬로 처리할 때: 적용률(LLM 호출을 줄이는 비율)과 그 정확도
+        self.stdout.write("\n임계값   적용률   정확도")
+        for threshold in thresholds:
+            covered = [(t, p) for t, p, c in results if c >= threshold]
+            coverage = len(covered) / len(results)
+            acc = sum(t == p for t, p in covered) / len(covered) if covered else 0.0
+            self.stdout.write(f"{threshold:>6.2f} {coverage:>8.3f} {acc:>8.3f}")
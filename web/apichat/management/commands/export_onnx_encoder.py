@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "SentenceTransformer 임베딩 모델(bge-m3)을 ONNX로 내보내고 int8 동적 양자화 "
+        "(EMBEDDING_BACKEND=onnx 쿼리 인코더용, requirements-dev의 onnx 필요)"
+    )
+
+    def add_arguments(self, parser):
+        from apichat.utils.onnx_encoder import ONNX_MODEL_DIR
+
+        parser.add_argument("--model", default="BAAI/bge-m3")
+        parser.add_argument("--output", default=ONNX_MODEL_DIR)
+        parser.add_argument("--opset", type=int, default=17)
+        parser.add_argument(
+            "--no-quantize", action="store_true", help="fp32 ONNX 그대로 저장 (비교용)"
+        )
+
+    def handle(self, *args, **options):
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        from apichat.utils.onnx_encoder import (
+            MANIFEST_FILE,
+            MODEL_FILE,
+            TOKENIZER_FILE,
+            OnnxEncoder,
+        )
+
+        st = SentenceTransformer(options["model"], device="cpu")
+        pooling = next((m for m in st if isinstance(m, Pooling)), None)
+        if pooling is None or pooling.get_pooling_mode_str() not in ("cls", "mean"):
+            raise CommandError("cls/mean 풀링 모델만 지원")
+        tokenizer = st.tokenizer
+        if not tokenizer.is_fast:
+            raise CommandError("tokenizer.json이 있는 fast 토크나이저가 필요")
+
+        class Encoder(torch.nn.Module):
+            # 마지막 hidden state만 출력 (풀링/정규화는 OnnxEncoder에서)
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, input_ids, attention_mask):
+                return self.model(
+                    input_ids=input_ids, attention_mask=attention_mask
+                ).last_hidden_state
+
+        output = options["output"]
+        os.makedirs(output, exist_ok=True)
+        sample = tokenizer(["warmup", "ONNX export"], padding=True, return_tensors="pt")
+
+        # bge-m3 fp32는 2GB가 넘어서 external data로 저장됨 → 임시 디렉토리에서 양자화
+        with tempfile.TemporaryDirectory() as tmp:
+            fp32_path = os.path.join(tmp, MODEL_FILE)
+            self.stdout.write(
+                f"ONNX 내보내기: {options['model']} (opset {options['opset']})"
+            )
+            with torch.no_grad():
+                torch.onnx.export(
+                    Encoder(st[0].auto_model.eval()),
+                    (sample["input_ids"], sample["attention_mask"]),
+                    fp32_path,
+                    input_names=["input_ids", "attention_mask"],
+                    output_names=["last_hidden_state"],
+                    dynamic_axes={
+                        "input_ids": {0: "batch", 1: "sequence"},
+                        "attention_mask": {0: "batch", 1: "sequence"},
+                        "last_hidden_state": {0: "batch", 1: "sequence"},
+                    },
+                    opset_version=options["opset"],
+                    do_constant_folding=True,
+                )
+
+            if options["no_quantize"]:
+                for name in os.listdir(tmp):
+                    shutil.move(os.path.join(tmp, name), os.path.join(output, name))
+            else:
+                self.stdout.write("int8 동적 양자화")
+                quantize_dynamic(
+                    fp32_path,
+                    os.path.join(output, MODEL_FILE),
+                    weight_type=QuantType.QInt8,
+                )
+
+        tokenizer.backend_tokenizer.save(os.path.join(output, TOKENIZER_FILE))
+        manifest = {
+            "model": options["model"],
+            "quantized": not options["no_quantize"],
+            "opset": options["opset"],
+            "pooling": pooling.get_pooling_mode_str(),
+            "normalize": any(isinstance(m, Normalize) for m in st),
+            "dim": st.get_sentence_embedding_dimension(),
+            "max_seq_length": st.max_seq_length,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with open(os.path.join(output, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 내보낸 모델이 원래 모델과 같은 벡터를 내는지 간단히 확인
+        texts = [
+            "구글 드라이브 API로 파일 권한 수정하는 방법",
+            "How to list Gmail labels?",
+        ]
+        expected = st.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        actual = OnnxEncoder(output).encode(texts, normalize_embeddings=True)
+        cosine = (expected * actual).sum(axis=1)
+        size_mb = os.path.getsize(os.path.join(output, MODEL_FILE)) / 2**20
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"저장: {output} ({size_mb:.0f}MB, 샘플 코사인 {np.round(cosine, 4).tolist()})"
+            )
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "bge-m3를 한 번만 로드해서 HTTP로 제공하는 임베딩 서비스 실행 "
+        "(웹 워커는 EMBEDDING_SERVICE_URL로 이 서비스를 호출)"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        from apichat.utils.embedding_service import (
+            EMBEDDING_BATCH_MAX,
+            EMBEDDING_BATCH_WAIT_MS,
+            EMBEDDING_DEVICE,
+        )
+
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--model", default="BAAI/bge-m3")
+        parser.add_argument("--device", default=EMBEDDING_DEVICE)
+        parser.add_argument(
+            "--max-batch",
+            type=int,
+            default=EMBEDDING_BATCH_MAX,
+            help="한 번에 인코딩할 최대 텍스트 수",
+        )
+        parser.add_argument(
+            "--max-wait-ms",
+            type=float,
+            default=EMBEDDING_BATCH_WAIT_MS,
+            help="동시 요청을 모으기 위해 기다리는 시간(ms)",
+        )
+
+    def handle(self, *args, **options):
+        from apichat.utils.embedding_service import serve
+
+        serve(
+            host=options["host"],
+            port=options["port"],
+            model_name=options["model"],
+            device=options["device"],
+            max_batch=options["max_batch"],
+            max_wait_ms=options["max_wait_ms"],
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "few-shot 예시 + LLM 분류 로그로 로컬 의도 분류기(api/basic/none) 학습 후 저장"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=None, help="분류 로그 JSONL 경로")
+        parser.add_argument("--epochs", type=int, default=500)
+        parser.add_argument("--lr", type=float, default=0.5)
+        parser.add_argument("--l2", type=float, default=1e-3)
+
+    def handle(self, *args, **options):
+        from collections import Counter
+
+        from apichat.utils.intent_classifier import (
+            CLASSIFY_LOG_PATH,
+            HEAD_FILE_PATH,
+            train_classifier,
+            training_data,
+        )
+
+        pairs = training_data(options["log"] or CLASSIFY_LOG_PATH)
+        counts = Counter(label for _, label in pairs)
+        self.stdout.write(f"학습 데이터 {len(pairs)}개: {dict(counts)}")
+
+        classifier = train_classifier(
+            pairs, epochs=options["epochs"], lr=options["lr"], l2=options["l2"]
+        )
+        classifier.save(HEAD_FILE_PATH, n_examples=len(pairs), counts=dict(counts))
+
+        # 학습 데이터 정확도 (참고용, 실제 성능은 eval_intent_classifier --cv로 확인)
+        correct = sum(classifier.predict(q)[0] == label for q, label in pairs)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"저장: {HEAD_FILE_PATH} (학습 정확도 {correct / len(pairs):.3f})"
+            )
+        )
@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase
+
+from apichat.utils.answer_evaluator import precheck
+
+
+class PrecheckTests(SimpleTestCase):
+    context = (
+        "permissions.update 메서드로 드라이브 파일 권한의 role을 writer로 변경합니다"
+    )
+
+    def test_refusal_and_empty_context_are_bad(self):
+        self.assertEqual(
+            precheck("죄송하지만 모르겠습니다", self.context, "")[0], "bad"
+        )
+        self.assertEqual(precheck("permissions.update", "", "")[0], "bad")
+
+    def test_overlap_thresholds(self):
+        self.assertEqual(precheck(self.context, self.context, "")[0], "good")
+        self.assertEqual(precheck("캘린더 일정 알림 설정", self.context, "")[0], "bad")
+        # 겹침 약 0.4 (기본 기준 0.2 ~ 0.6 사이) → LLM 평가로 넘김
+        half = "permissions.update 호출 후 캘린더 이벤트 알림과 반복 일정을 따로 설정하세요"
+        self.assertIsNone(precheck(half, self.context, "")[0])
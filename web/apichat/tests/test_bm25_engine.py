@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+from rank_bm25 import BM25Okapi
+
+from apichat.utils.bm25_engine import BM25Index, BM25IndexRetriever
+
+BM25_CORPUS = [
+    ("drive", "drive files permissions update owner"),
+    ("drive", "drive files list query parameters"),
+    ("gmail", "gmail messages send raw base64 message"),
+    ("drive", "files permissions create role writer"),
+    ("gmail", "gmail labels list messages"),
+    ("calendar", "calendar events insert attendees"),
+    ("calendar", "events list calendar timeMin timeMax files"),
+    ("gmail", "messages list query files files"),
+]
+
+
+def bm25_index():
+    texts = [text for _, text in BM25_CORPUS]
+    metas = [{"tags": tag} for tag, _ in BM25_CORPUS]
+    ids = [f"id{i}" for i in range(len(texts))]
+    return BM25Index(texts, metas, ids)
+
+
+class BM25IndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = bm25_index()
+        self.reference = BM25Okapi([text.split() for _, text in BM25_CORPUS])
+
+    def assert_same_scores(self, index, query):
+        # 인덱스는 태그 순으로 정렬되므로 청크 id로 원래 순서에 맞춰 비교
+        scores = index.get_scores(query)
+        by_id = {doc_id: scores[row] for row, doc_id in enumerate(index.ids)}
+        ours = [by_id[f"id{i}"] for i in range(len(BM25_CORPUS))]
+        np.testing.assert_allclose(
+            ours, self.reference.get_scores(query.split()), rtol=1e-5, atol=1e-6
+        )
+
+    def test_scores_match_rank_bm25(self):
+        # files는 문서 절반 이상에 있어서 idf가 음수 → epsilon 보정 경로
+        for query in ["drive permissions", "files", "messages list files", "nothing"]:
+            with self.subTest(query=query):
+                self.assert_same_scores(self.index, query)
+
+    def test_tag_filter_matches_brute_force(self):
+        query = "messages list files"
+        reference = self.reference.get_scores(query.split())
+        rows, scores = self.index.search_rows(query, k=2, tags=["gmail", "calendar"])
+
+        allowed = [
+            i for i, (tag, _) in enumerate(BM25_CORPUS) if tag in ("gmail", "calendar")
+        ]
+        expected = sorted(allowed, key=lambda i: -reference[i])[:2]
+        self.assertEqual(
+            [self.index.ids[row] for row in rows], [f"id{i}" for i in expected]
+        )
+        np.testing.assert_allclose(scores, reference[expected], rtol=1e-5)
+
+        retriever = BM25IndexRetriever(index=self.index, tags=("gmail",), k=10)
+        docs = retriever.invoke(query)
+        self.assertTrue(docs)
+        self.assertTrue(all(doc.metadata["tags"] == "gmail" for doc in docs))
+
+    def test_save_load_round_trip(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self.index.save(f"{path}/index", fingerprint="fp")
+
+        loaded = BM25Index.load(f"{path}/index")
+        self.assertEqual(list(loaded.texts), self.index.texts)
+        self.assertEqual(loaded.ids, self.index.ids)
+        self.assert_same_scores(loaded, "drive permissions files")
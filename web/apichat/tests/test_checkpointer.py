@@ -0,0 +1,77 @@
+import time
+from typing import List, TypedDict
+
+from django.test import SimpleTestCase
+from langgraph.graph import END, StateGraph
+
+from apichat.utils.checkpointer import BoundedCheckpointer
+
+
+class GraphState(TypedDict, total=False):
+    question: str
+    search_results: List[str]
+    answer: str
+
+
+def search_node(state):
+    chunk = f"{state['question']} 검색 결과 " + "긴 본문 " * 20
+    return {"search_results": [chunk, chunk]}
+
+
+def answer_node(state):
+    return {"answer": f"답변 {len(state['search_results'])}"}
+
+
+class BoundedCheckpointerTests(SimpleTestCase):
+    def build(self, **kwargs):
+        checkpointer = BoundedCheckpointer(":memory:", prune_interval=3600, **kwargs)
+        graph = StateGraph(GraphState)
+        graph.add_node("search", search_node)
+        graph.add_node("answer", answer_node)
+        graph.set_entry_point("search")
+        graph.add_edge("search", "answer")
+        graph.add_edge("answer", END)
+        return checkpointer, graph.compile(checkpointer=checkpointer)
+
+    def run_turn(self, graph, thread_id, question):
+        config = {"configurable": {"thread_id": thread_id}}
+        return graph.invoke({"question": question}, config=config), config
+
+    def test_round_trip_restores_slim_keys(self):
+        checkpointer, graph = self.build()
+        result, config = self.run_turn(graph, "t1", "드라이브 권한")
+
+        state = graph.get_state(config).values
+        self.assertEqual(state["search_results"], result["search_results"])
+        self.assertEqual(state["answer"], "답변 2")
+
+        # 긴 검색 결과는 청크 테이블에 한 번만 저장되고 체크포인트에는 해시만 남음
+        chunk = result["search_results"][0].encode("utf-8")
+        blobs = checkpointer.conn.execute("SELECT checkpoint FROM checkpoints")
+        self.assertTrue(all(chunk not in blob for (blob,) in blobs))
+        self.assertEqual(checkpointer.stats()["chunks"], 1)
+
+    def test_keeps_latest_checkpoints_per_thread(self):
+        checkpointer, graph = self.build(keep=2)
+        self.run_turn(graph, "t1", "첫 질문")
+        _, config = self.run_turn(graph, "t1", "두 번째 질문")
+
+        self.assertEqual(checkpointer.stats()["checkpoints"], 2)
+        state = graph.get_state(config).values
+        self.assertTrue(state["search_results"][0].startswith("두 번째 질문"))
+
+    def test_prune_removes_overflow_and_expired_threads(self):
+        checkpointer, graph = self.build(max_threads=1, ttl=60)
+        self.run_turn(graph, "old", "오래된 질문")
+        self.run_turn(graph, "new", "새 질문")
+
+        checkpointer.prune()
+        self.assertEqual(checkpointer.stats()["threads"], 1)
+        self.assertIsNone(
+            checkpointer.get_tuple({"configurable": {"thread_id": "old"}})
+        )
+
+        checkpointer.prune(now=time.time() + 120)
+        stats = checkpointer.stats()
+        self.assertEqual((stats["threads"], stats["checkpoints"]), (0, 0))
+        self.assertEqual(stats["chunks"], 0)
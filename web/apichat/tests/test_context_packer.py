@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from apichat.utils.context_packer import ContextPacker, count_tokens
+
+
+class ContextPackerTests(SimpleTestCase):
+    def test_skips_duplicates_and_strips_splitter_overlap(self):
+        first = (
+            "드라이브 권한은 permissions.update 메서드로 수정하며 role 필드를 바꿉니다. "
+            * 2
+        )
+        overlap = first[-60:]
+        second = overlap + "소유권 이전은 transferOwnership 파라미터가 필요합니다."
+        packer = ContextPacker(budgets={})
+
+        packed, stats = packer.pack({"context_text": [first, first, second]})
+
+        self.assertEqual(stats["context_text"]["duplicate"], 1)
+        self.assertEqual(stats["context_text"]["kept"], 2)
+        self.assertEqual(packed["context_text"].count(overlap.strip()), 1)
+        self.assertIn("transferOwnership", packed["context_text"])
+
+    def test_budget_skips_chunks_that_do_not_fit(self):
+        first = "첫 번째 청크 내용입니다."
+        packer = ContextPacker(budgets={"context_qa": count_tokens(first) + 1})
+
+        packed, stats = packer.pack(
+            {"context_qa": [first, "두 번째 청크는 예산을 넘는 긴 내용입니다. " * 5]}
+        )
+
+        self.assertEqual(packed["context_qa"], first)
+        self.assertEqual(stats["context_qa"]["over_budget"], 1)
+
+    def test_truncates_first_chunk_larger_than_budget(self):
+        packer = ContextPacker(budgets={"context_text": 5})
+        packed, stats = packer.pack({"context_text": ["아주 긴 청크 " * 50]})
+        self.assertEqual(stats["context_text"]["kept"], 1)
+        self.assertLessEqual(count_tokens(packed["context_text"]), 5)
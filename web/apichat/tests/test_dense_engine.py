@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apichat.utils.dense_engine import DenseIndex
+
+
+class DenseIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(60, 8)).astype(np.float32)
+        self.tags = [["drive", "gmail", "calendar"][i % 3] for i in range(60)]
+        self.index = DenseIndex(
+            self.vectors,
+            [f"doc {i}" for i in range(60)],
+            [{"tags": tag} for tag in self.tags],
+            [f"id{i}" for i in range(60)],
+        )
+        self.query = rng.normal(size=8).astype(np.float32)
+
+    def brute_force(self, k, tags=None):
+        normed = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normed @ (self.query / np.linalg.norm(self.query))
+        allowed = [i for i in range(60) if not tags or self.tags[i] in tags]
+        top = sorted(allowed, key=lambda i: -scores[i])[:k]
+        return [f"id{i}" for i in top], scores[top]
+
+    def search(self, index, k, tags=None):
+        rows, scores = index.search_rows(self.query, k, tags)
+        return [index.ids[row] for row in rows], scores
+
+    def test_tag_filtered_top_k_matches_brute_force(self):
+        for tags in [None, ["gmail"], ["drive", "calendar"], ["missing"]]:
+            with self.subTest(tags=tags):
+                ids, scores = self.search(self.index, 5, tags)
+                expected_ids, expected_scores = self.brute_force(5, tags)
+                self.assertEqual(ids, expected_ids)
+                np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_save_load_and_float16(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self.index.save(f"{path}/index", fingerprint="fp")
+        loaded = DenseIndex.load(f"{path}/index")
+        self.assertEqual(
+            self.search(loaded, 5, ["gmail"])[0], self.brute_force(5, ["gmail"])[0]
+        )
+
+        half = DenseIndex(
+            self.vectors,
+            [f"doc {i}" for i in range(60)],
+            [{"tags": tag} for tag in self.tags],
+            [f"id{i}" for i in range(60)],
+            dtype="float16",
+        )
+        _, scores = self.search(half, 5)
+        np.testing.assert_allclose(scores, self.brute_force(5)[1], atol=1e-2)
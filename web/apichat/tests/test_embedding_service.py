@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apichat.utils.embedding_service import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_requests_share_one_encode_call(self):
+        # max_wait 동안 들어온 요청은 encode_fn 한 번에 모아서 처리
+        calls = []
+
+        def encode(texts):
+            calls.append(list(texts))
+            return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+        batcher = MicroBatcher(encode, max_batch=32, max_wait=0.2)
+        results = {}
+
+        def submit(text, normalize):
+            results[text] = batcher.submit([text], normalize=normalize)
+
+        threads = [
+            threading.Thread(target=submit, args=(t, t != "raw"))
+            for t in ["a", "bb", "raw"]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(sum(len(c) for c in calls), 3)
+        self.assertLess(len(calls), 3)
+        np.testing.assert_allclose(results["raw"], [[3.0, 1.0]])
+        np.testing.assert_allclose(np.linalg.norm(results["bb"], axis=1), [1.0])
+        self.assertEqual(batcher.stats()["requests"], 3)
+
+    def test_encode_error_reaches_caller(self):
+        def encode(texts):
+            raise RuntimeError("encode failed")
+
+        batcher = MicroBatcher(encode, max_wait=0.0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(["a"])
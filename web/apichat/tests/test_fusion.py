@@ -0,0 +1,63 @@
+import random
+
+from django.test import SimpleTestCase
+from langchain.retrievers import EnsembleRetriever
+from langchain_core.documents import Document
+
+from apichat.tests.test_bm25_engine import bm25_index
+from apichat.utils.bm25_engine import BM25IndexRetriever
+from apichat.utils.fusion import CandidatePool, LegResult, doc_key
+
+
+def _leg(keys):
+    docs = [Document(page_content=f"text {key}", id=key) for key in keys]
+    return LegResult(docs, [doc_key(doc) for doc in docs], None)
+
+
+class CandidatePoolTests(SimpleTestCase):
+    def ensemble_order(self, lists, weights):
+        # EnsembleRetriever의 가중 RRF (retriever는 점수 계산에 쓰이지 않음)
+        retriever = BM25IndexRetriever(index=bm25_index())
+        ensemble = EnsembleRetriever(
+            retrievers=[retriever] * len(lists), weights=weights
+        )
+        doc_lists = [
+            [Document(page_content=f"text {key}") for key in keys] for keys in lists
+        ]
+        return [
+            doc.page_content for doc in ensemble.weighted_reciprocal_rank(doc_lists)
+        ]
+
+    def pool_order(self, lists, weights):
+        pool = CandidatePool()
+        pool.add_legs([_leg(keys) for keys in lists], weights)
+        return [doc.page_content for doc in pool.ranked("rrf")]
+
+    def test_ties_keep_first_seen_order(self):
+        # a, b 점수가 같으면 먼저 나온 a가 앞 (EnsembleRetriever와 같음)
+        lists, weights = [["a", "b"], ["b", "a"]], [0.5, 0.5]
+        self.assertEqual(self.pool_order(lists, weights), ["text a", "text b"])
+        self.assertEqual(
+            self.pool_order(lists, weights), self.ensemble_order(lists, weights)
+        )
+
+    def test_matches_ensemble_retriever(self):
+        rng = random.Random(0)
+        keys = [str(i) for i in range(12)]
+        for _ in range(50):
+            lists = [rng.sample(keys, rng.randint(0, 8)) for _ in range(2)]
+            weights = rng.choice([[0.8, 0.2], [0.5, 0.5], [1.0, 1.0]])
+            with self.subTest(lists=lists, weights=weights):
+                self.assertEqual(
+                    self.pool_order(lists, weights),
+                    self.ensemble_order(lists, weights),
+                )
+
+    def test_group_fuses_only_that_query(self):
+        pool = CandidatePool()
+        pool.add_legs([_leg(["a", "b"]), _leg(["c"])], [0.8, 0.2], group=0)
+        pool.add_legs([_leg(["d", "a"]), _leg([])], [0.8, 0.2], group=1)
+
+        self.assertEqual(len(pool), 4)
+        self.assertEqual([d.id for d in pool.ranked(group=1)], ["d", "a"])
+        self.assertEqual([d.id for d in pool.ranked(top_n=2)], ["a", "d"])
@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase
+
+from apichat.utils.metrics import Histogram
+
+
+class HistogramTests(SimpleTestCase):
+    def test_overflow_counts_only_in_inf_bucket(self):
+        histogram = Histogram("x", "test", ("node",), (1, 2))
+        histogram.observe(0.5, "a")
+        histogram.observe(5, "a")
+        histogram.observe(5, "a")
+
+        lines = histogram.render()
+        self.assertIn('x_bucket{node="a",le="1"} 1', lines)
+        self.assertIn('x_bucket{node="a",le="2"} 1', lines)
+        self.assertIn('x_bucket{node="a",le="+Inf"} 3', lines)
+        self.assertIn('x_sum{node="a"} 10.5', lines)
+        self.assertIn('x_count{node="a"} 3', lines)
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apichat.utils import startup
+
+
+class WarmupRetryTests(SimpleTestCase):
+    def setUp(self):
+        # 다른 모듈이 등록한 컴포넌트/워밍업 상태와 섞이지 않도록 비워둔 상태로 교체
+        patches = [
+            mock.patch.object(startup, "_components", OrderedDict()),
+            mock.patch.object(startup, "APICHAT_WARMUP", "background"),
+            mock.patch.dict(startup._warmup, {"state": "pending", "error": None}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_component_failing_once_becomes_ready_after_retry(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("chroma not up yet")
+            return "ok"
+
+        startup.lazy("flaky", flaky)
+        startup.lazy("stable", lambda: "ok")
+
+        status = startup.warmup(modules=())
+        self.assertFalse(status["ready"])
+        self.assertEqual(status["components"]["flaky"]["state"], "failed")
+
+        status = startup.retry_failed(modules=(), retries=3, backoff=0)
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["warmup"]["retries"], 1)
+        self.assertEqual(len(calls), 2)
+
+    def test_gives_up_after_retries(self):
+        def broken():
+            raise ConnectionError("down")
+
+        startup.lazy("broken", broken)
+        startup.warmup(modules=())
+
+        status = startup.retry_failed(modules=(), retries=2, backoff=0)
+        self.assertFalse(status["ready"])
+        self.assertEqual(status["warmup"]["retries"], 2)
+        self.assertIn("ConnectionError", status["components"]["broken"]["error"])
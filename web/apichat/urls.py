@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path("chat/", views.chat, name="chat"),
+    path("chat/stream/", views.chat_stream, name="chat_stream"),
     path("transcribe/", views.transcribe_audio, name="transcribe_audio"),
     path("sessions/", views.session_list, name="session_list"),
     path("session_create/", views.create_session, name="session_create"),
@@ -0,0 +1,134 @@
+# answer_evaluator.py
+import os
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from .rag2 import REFUSAL_PHRASES
+
+load_dotenv()
+
+# 규칙으로 판단이 끝나도 LLM 평가를 함께 돌리는 비율 (규칙 정확도 확인용)
+EVAL_LLM_SAMPLE_RATE = float(os.getenv("EVAL_LLM_SAMPLE_RATE", "0.0"))
+# 1이면 LLM 평가를 응답 후 백그라운드에서 실행 (애매한 답변은 일단 good으로 통과)
+# - 애매한 답변은 재검색(retry)하지 않음: LLM이 bad로 평가해도 deferred_disagree로 집계만 함
+EVAL_ASYNC = os.getenv("EVAL_ASYNC", "0") == "1"
+# 답변 글자 3-gram 중 검색 결과에 있는 비율 기준
+EVAL_OVERLAP_GOOD = float(os.getenv("EVAL_OVERLAP_GOOD", "0.6"))
+EVAL_OVERLAP_BAD = float(os.getenv("EVAL_OVERLAP_BAD", "0.2"))
+
+_grade_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-eval")
+_stats_lock = threading.Lock()
+evaluator_stats = dict.fromkeys(
+    [
+        "rule_good",
+        "rule_bad",
+        "llm",
+        "deferred",
+        "deferred_disagree",
+        "sampled",
+        "sample_disagree",
+    ],
+    0,
+)
+
+
+def _count(key):
+    with _stats_lock:
+        evaluator_stats[key] += 1
+
+
+def _ngrams(text, n=3):
+    text = re.sub(r"\s+", "", text.lower())
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def lexical_overlap(answer, context):
+    """답변 글자 3-gram 중 검색 결과에도 있는 비율 (한글 조사/어미 변화에 덜 민감)"""
+    answer_grams = _ngrams(answer)
+    if not answer_grams:
+        return 0.0
+    return len(answer_grams & _ngrams(context)) / len(answer_grams)
+
+
+def precheck(answer, context, context_qa):
+    """
+    규칙 기반 1차 평가 → ("good" / "bad" / None(애매), 근거)
+    - 평가 프롬프트 기준 0번의 회피성 문구가 있으면 bad
+    - 검색 결과가 비어 있으면 근거가 없으므로 bad
+    - 답변과 검색 결과의 글자 3-gram 겹침 비율로 good / bad, 중간이면 None
+    """
+    for phrase in REFUSAL_PHRASES:
+        if phrase in answer:
+            return "bad", f"회피 문구: {phrase}"
+
+    merged = f"{context}\n{context_qa}".strip()
+    if not merged:
+        return "bad", "검색 결과 없음"
+
+    overlap = lexical_overlap(answer, merged)
+    if overlap >= EVAL_OVERLAP_GOOD:
+        return "good", f"겹침 {overlap:.2f}"
+    if overlap < EVAL_OVERLAP_BAD:
+        return "bad", f"겹침 {overlap:.2f}"
+    return None, f"겹침 {overlap:.2f}"
+
+
+def _grade_in_background(grade_fn, inputs, verdict, reason):
+    try:
+        result = grade_fn(inputs)
+    except Exception as e:
+        print(f"[answer_evaluator] 백그라운드 평가 에러: {e}")
+        return
+    if verdict is None:
+        # good으로 먼저 통과시킨 답변을 LLM은 bad로 본 경우 (재검색 기회를 놓침)
+        if result != "good":
+            _count("deferred_disagree")
+    elif result != verdict:
+        _count("sample_disagree")
+    print(
+        f"[answer_evaluator] 백그라운드 LLM 평가: {result} "
+        f"(규칙: {verdict or '애매'}, {reason})"
+    )
+
+
+def evaluate_answer(inputs, grade_fn):
+    """
+    단계별 답변 평가 → (품질 "good"/"bad", 평가 방식 "rule"/"llm"/"deferred")
+    - inputs: 평가 프롬프트 입력 (history, question, context, context_qa, answer)
+    - grade_fn: inputs로 LLM 평가를 실행해서 "good"/"bad" 반환
+    - 규칙으로 판단되면 LLM 호출 없음 (EVAL_LLM_SAMPLE_RATE 비율만 LLM도 실행)
+    - EVAL_ASYNC면 LLM 평가는 백그라운드에서 기록만 하고, 애매한 답변은 good(deferred)
+      → 애매한 답변의 재검색이 꺼짐 (LLM이 bad로 보면 evaluator_stats["deferred_disagree"])
+    """
+    verdict, reason = precheck(
+        inputs["answer"], inputs["context"], inputs["context_qa"]
+    )
+    sampled = verdict is not None and random.random() < EVAL_LLM_SAMPLE_RATE
+    if sampled:
+        _count("sampled")
+
+    if verdict is not None and not sampled:
+        _count(f"rule_{verdict}")
+        print(f"[answer_evaluator] 규칙 평가: {verdict} ({reason})")
+        return verdict, "rule"
+
+    if EVAL_ASYNC:
+        _grade_executor.submit(_grade_in_background, grade_fn, inputs, verdict, reason)
+        if verdict is not None:
+            _count(f"rule_{verdict}")
+            return verdict, "rule"
+        _count("deferred")
+        return "good", "deferred"
+
+    result = grade_fn(inputs)
+    _count("llm")
+    if sampled and result != verdict:
+        _count("sample_disagree")
+    print(
+        f"[answer_evaluator] LLM 평가: {result} (규칙: {verdict or '애매'}, {reason})"
+    )
+    return result, "llm"
@@ -0,0 +1,322 @@
+# bm25_engine.py
+import fcntl
+import json
+import os
+import shutil
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# 디스크 형식 버전 (파일 구성이 바뀌면 올림 → 이전 버전 인덱스는 다시 생성)
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def default_preprocess(text: str) -> List[str]:
+    # langchain BM25Retriever 기본 전처리와 동일 (공백 기준 분리)
+    return text.split()
+
+
+class MappedTexts:
+    """texts.bin(UTF-8 본문 이어붙임) + 오프셋 배열을 mmap으로 읽는 읽기 전용 시퀀스"""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._data[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+def read_manifest(path):
+    """인덱스 디렉토리의 manifest (없거나 깨졌으면 None)"""
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_texts(path, texts):
+    """본문을 texts.bin + text_offsets.npy로 저장 (MappedTexts 형식)"""
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    with open(os.path.join(path, "texts.bin"), "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(os.path.join(path, "text_offsets.npy"), offsets)
+
+
+def read_texts(path, mmap=True):
+    """write_texts()로 저장한 본문 (mmap이면 필요한 문서만 읽음)"""
+    texts_path = os.path.join(path, "texts.bin")
+    if mmap and os.path.getsize(texts_path) > 0:
+        data = np.memmap(texts_path, dtype=np.uint8, mode="r")
+    else:
+        with open(texts_path, "rb") as f:
+            data = f.read()
+    offsets = np.load(
+        os.path.join(path, "text_offsets.npy"), mmap_mode="r" if mmap else None
+    )
+    return MappedTexts(data, offsets)
+
+
+@contextmanager
+def index_lock(path):
+    """
+    인덱스 디렉토리별 프로세스 간 배타 락 (path + ".lock" 파일에 flock)
+    - 여러 gunicorn 워커가 동시에 워밍업하면서 같은 인덱스를 다시 만들어도
+      디렉토리 교체가 엇갈리지 않도록 생성/교체는 이 락 안에서만 함
+    """
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def replace_directory(tmp_path, path):
+    """
+    다 쓴 임시 디렉토리로 인덱스 디렉토리 교체 (기존 인덱스는 교체 후 삭제)
+    - rename 두 번이라 원자적이지 않음 → index_lock 안에서 호출
+    """
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+class BM25Index:
+    """
+    모든 태그 문서를 담는 공유 BM25(Okapi) 인덱스
+    - 용어 x 문서 CSR 행렬에 BM25 가중치(idf, 문서 길이 정규화 포함)를 미리 계산해 둠
+    - 검색 = 쿼리 용어 행만 골라 희소 행렬곱 → argpartition으로 top-k
+    - 문서는 태그별로 정렬해 두고, 태그 필터는 해당 행 구간만 보는 마스크로 처리
+    - 생성 후에는 읽기만 하므로 여러 스레드에서 동시에 검색해도 안전함
+    """
+
+    def __init__(
+        self,
+        texts,
+        metadatas,
+        ids=None,
+        k1=1.5,
+        b=0.75,
+        epsilon=0.25,
+        tag_key="tags",
+    ):
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        # 태그 순으로 정렬해서 태그별 문서가 연속 구간이 되도록 함
+        order = sorted(
+            range(len(texts)), key=lambda i: str((metadatas[i] or {}).get(tag_key))
+        )
+        self.texts = [texts[i] for i in order]
+        self.metadatas = [metadatas[i] or {} for i in order]
+        self.ids = [ids[i] for i in order]
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+
+        self.tag_ranges = {}
+        for row, meta in enumerate(self.metadatas):
+            tag = meta.get(tag_key)
+            start, _ = self.tag_ranges.get(tag, (row, row))
+            self.tag_ranges[tag] = (start, row + 1)
+
+        self.vocab = {}
+        rows, cols, tfs = [], [], []
+        doc_len = np.zeros(len(self.texts), dtype=np.float32)
+        for doc_id, text in enumerate(self.texts):
+            tokens = default_preprocess(text)
+            doc_len[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                rows.append(self.vocab.setdefault(term, len(self.vocab)))
+                cols.append(doc_id)
+                tfs.append(tf)
+
+        n_docs, n_terms = len(self.texts), len(self.vocab)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        # idf (rank_bm25 BM25Okapi와 동일: 음수 idf는 epsilon * 평균 idf로 대체)
+        df = np.bincount(rows, minlength=n_terms).astype(np.float64)
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if n_terms:
+            idf[idf < 0] = self.epsilon * idf.mean()
+        self.idf = idf.astype(np.float32)
+
+        # 문서 길이 정규화 후 BM25 가중치
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        norm = k1 * (1 - b + b * doc_len / avgdl) if avgdl else np.full(n_docs, k1)
+        weights = self.idf[rows] * tfs * (k1 + 1) / (tfs + norm[cols])
+
+        self.term_doc = sparse.csr_matrix(
+            (weights.astype(np.float32), (rows, cols)), shape=(n_terms, n_docs)
+        )
+
+    def __len__(self):
+        return len(self.texts)
+
+    def save(self, path, fingerprint=None, **extra):
+        """
+        mmap으로 읽을 수 있는 디렉토리 형식으로 저장
+        - term_doc_{data,indices,indptr}.npy, idf.npy: BM25 가중치 CSR 행렬
+        - texts.bin + text_offsets.npy: 문서 본문
+        - vocab.json, docs.json(ids, metadatas), manifest.json(버전, fingerprint 등)
+        - 임시 디렉토리에 다 쓴 뒤 교체하므로, 저장 중 실패해도 기존 인덱스는 그대로
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        term_doc = self.term_doc
+        np.save(os.path.join(tmp_path, "term_doc_data.npy"), term_doc.data)
+        np.save(os.path.join(tmp_path, "term_doc_indices.npy"), term_doc.indices)
+        np.save(os.path.join(tmp_path, "term_doc_indptr.npy"), term_doc.indptr)
+        np.save(os.path.join(tmp_path, "idf.npy"), self.idf)
+
+        write_texts(tmp_path, self.texts)
+
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(tmp_path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(vocab, f, ensure_ascii=False)
+        with open(os.path.join(tmp_path, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": self.ids, "metadatas": self.metadatas}, f, ensure_ascii=False
+            )
+
+        # manifest는 마지막에 기록 (manifest가 있으면 완성된 인덱스)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "n_docs": len(self.texts),
+            "n_terms": len(vocab),
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "tag_ranges": [
+                [tag, start, end] for tag, (start, end) in self.tag_ranges.items()
+            ],
+            **extra,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        replace_directory(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """save()로 저장한 인덱스 로드 (큰 배열과 본문은 mmap으로 필요할 때만 읽음)"""
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"BM25 인덱스 없음: {path}")
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"BM25 인덱스 형식 버전 불일치: {manifest.get('format_version')} "
+                f"(필요: {FORMAT_VERSION})"
+            )
+
+        mmap_mode = "r" if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        self = cls.__new__(cls)
+        self.k1, self.b, self.epsilon = (
+            manifest["k1"],
+            manifest["b"],
+            manifest["epsilon"],
+        )
+        self.tag_ranges = {
+            tag: (start, end) for tag, start, end in manifest["tag_ranges"]
+        }
+        self.idf = array("idf.npy")
+        self.term_doc = sparse.csr_matrix(
+            (
+                array("term_doc_data.npy"),
+                array("term_doc_indices.npy"),
+                array("term_doc_indptr.npy"),
+            ),
+            shape=(manifest["n_terms"], manifest["n_docs"]),
+            copy=False,
+        )
+
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = {term: i for i, term in enumerate(json.load(f))}
+        with open(os.path.join(path, "docs.json"), encoding="utf-8") as f:
+            docs = json.load(f)
+        self.ids, self.metadatas = docs["ids"], docs["metadatas"]
+        self.texts = read_texts(path, mmap)
+        return self
+
+    @property
+    def tags(self):
+        return [tag for tag in self.tag_ranges if tag is not None]
+
+    def get_scores(self, query: str) -> np.ndarray:
+        """모든 문서에 대한 BM25 점수 (쿼리에서 반복된 용어는 횟수만큼 반영)"""
+        counts = Counter(t for t in default_preprocess(query) if t in self.vocab)
+        if not counts:
+            return np.zeros(len(self.texts), dtype=np.float32)
+
+        term_rows = np.fromiter((self.vocab[t] for t in counts), dtype=np.int32)
+        q_weights = np.fromiter(counts.values(), dtype=np.float32)
+        return self.term_doc[term_rows].T.dot(q_weights)
+
+    def candidate_rows(self, tags=None) -> np.ndarray:
+        """태그 필터에 해당하는 문서 행 번호 (tags가 없으면 전체)"""
+        if not tags:
+            return np.arange(len(self.texts))
+        ranges = [self.tag_ranges[t] for t in tags if t in self.tag_ranges]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in sorted(ranges)])
+
+    def search_rows(self, query: str, k=5, tags=None) -> Tuple[np.ndarray, np.ndarray]:
+        """top-k 문서의 (행 번호, 점수) - 점수 내림차순"""
+        rows = self.candidate_rows(tags)
+        if rows.size == 0 or k <= 0:
+            return rows[:0], np.empty(0, dtype=np.float32)
+
+        scores = self.get_scores(query)[rows]
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < rows.size else np.arange(k)
+        top = top[np.lexsort((rows[top], -scores[top]))]
+        return rows[top], scores[top]
+
+    def document(self, row: int) -> Document:
+        return Document(
+            page_content=self.texts[row], metadata=self.metadatas[row], id=self.ids[row]
+        )
+
+    def search(self, query: str, k=5, tags=None) -> List[Document]:
+        rows, _ = self.search_rows(query, k, tags)
+        return [self.document(int(row)) for row in rows]
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """공유 BM25Index를 태그/k 조건으로 검색하는 retriever (인덱스는 수정하지 않음)"""
+
+    index: Any
+    tags: Optional[Tuple[str, ...]] = None
+    k: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.index.search(query, self.k, self.tags)
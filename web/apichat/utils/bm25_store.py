@@ -0,0 +1,170 @@
+# bm25_store.py
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .bm25_engine import FORMAT_VERSION, BM25Index, index_lock, read_manifest
+from .retriever import vectorstore, COLLECTION_NAME
+from .retriever_qa import (
+    vectorstore as qa_vectorstore,
+    COLLECTION_NAME as QA_COLLECTION_NAME,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 컬렉션별 BM25 인덱스 디렉토리 (bm25_engine.BM25Index.save 형식)
+INDEX_DIRS = {
+    COLLECTION_NAME: os.path.join(HERE, "bm25_index"),
+    QA_COLLECTION_NAME: os.path.join(HERE, "bm25_qa_index"),
+}
+# 컬렉션별 공유 Chroma 벡터스토어 getter (서비스 검색과 같은 인스턴스)
+VECTORSTORES = {
+    COLLECTION_NAME: vectorstore.get,
+    QA_COLLECTION_NAME: qa_vectorstore.get,
+}
+
+# 인덱스가 Chroma와 다를 때: rebuild(다시 생성) / error(실행 중단)
+BM25_ON_MISMATCH = os.getenv("BM25_ON_MISMATCH", "rebuild")
+
+
+# fingerprint 계산 때 Chroma에서 한 번에 가져올 문서 수 (본문까지 가져오므로 메모리 제한)
+_FINGERPRINT_BATCH = 5000
+
+
+def collection_fingerprint(vs):
+    """
+    Chroma 컬렉션 내용 fingerprint (id + metadata + 본문 기준 sha256)
+    - 청크가 추가/삭제되거나 metadata(source, last_verified 등)가 바뀌면 달라짐
+    - 같은 id로 본문만 다시 upsert해도(6_insert_qa_vs.py) 달라짐
+    - 본문은 문서별 sha256만 남기고 배치 단위로 가져옴
+    """
+    total = len(vs.get(include=[])["ids"])
+    entries = []
+    for offset in range(0, total, _FINGERPRINT_BATCH):
+        data = vs.get(
+            include=["documents", "metadatas"],
+            limit=_FINGERPRINT_BATCH,
+            offset=offset,
+        )
+        for doc_id, doc, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+            meta = json.dumps(meta, sort_keys=True, ensure_ascii=False)
+            text = hashlib.sha256((doc or "").encode("utf-8")).hexdigest()
+            entries.append((doc_id, meta, text))
+
+    digest = hashlib.sha256()
+    for doc_id, meta, text in sorted(entries):
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(meta.encode("utf-8"))
+        digest.update(text.encode("ascii"))
+    return f"{len(entries)}:{digest.hexdigest()}"
+
+
+def collection_marker(vs):
+    """
+    워커가 인덱스를 로드할 때 쓰는 가벼운 최신 여부 키 (청크 수 + id/metadata sha256)
+    - 본문은 가져오지 않으므로 같은 id로 본문만 바뀐 upsert는 잡지 못함
+      → build_bm25_index --check / 오프라인 재생성은 본문까지 보는 collection_fingerprint 사용
+    """
+    data = vs.get(include=["metadatas"])
+    entries = sorted(
+        (doc_id, json.dumps(meta, sort_keys=True, ensure_ascii=False))
+        for doc_id, meta in zip(data["ids"], data["metadatas"])
+    )
+    digest = hashlib.sha256()
+    for doc_id, meta in entries:
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(meta.encode("utf-8"))
+    return f"{len(entries)}:{digest.hexdigest()}"
+
+
+def build_from_chroma(vs):
+    """Chroma 문서 중 태그가 있는 것만으로 BM25Index 생성 (기존 태그별 인덱스와 동일)"""
+    data = vs.get(include=["documents", "metadatas"])
+    texts, metas, ids = [], [], []
+    for doc_id, doc, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+        if meta and meta.get("tags"):
+            texts.append(doc)
+            metas.append(meta)
+            ids.append(doc_id)
+    return BM25Index(texts, metas, ids)
+
+
+def _is_fresh(manifest, fingerprint, key="fingerprint"):
+    return (
+        manifest is not None
+        and manifest.get("format_version") == FORMAT_VERSION
+        and manifest.get(key) == fingerprint
+    )
+
+
+def index_status(collection, vs=None):
+    """(manifest 또는 None, 현재 본문 fingerprint, 최신 여부) - 전체 본문을 읽음 (빌드/점검용)"""
+    vs = vs or VECTORSTORES[collection]()
+    fingerprint = collection_fingerprint(vs)
+    manifest = read_manifest(INDEX_DIRS[collection])
+    return manifest, fingerprint, _is_fresh(manifest, fingerprint)
+
+
+def build_index(collection, vs=None, fingerprint=None):
+    """Chroma에서 BM25 인덱스를 만들어 디스크에 저장 (인덱스 락 안에서)"""
+    with index_lock(INDEX_DIRS[collection]):
+        return _build_index(collection, vs, fingerprint)
+
+
+def _build_index(collection, vs=None, fingerprint=None, marker=None):
+    vs = vs or VECTORSTORES[collection]()
+    fingerprint = fingerprint or collection_fingerprint(vs)
+    index = build_from_chroma(vs)
+    index.save(
+        INDEX_DIRS[collection],
+        fingerprint=fingerprint,
+        marker=marker or collection_marker(vs),
+        collection=collection,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    return index
+
+
+def load_index(collection):
+    """
+    디스크 인덱스를 mmap으로 로드
+    - 최신 여부는 collection_marker(청크 수 + id/metadata)로만 확인 (본문 전체를 읽지 않음)
+    - 없거나 형식 버전/marker가 Chroma와 다르면 다시 생성 (BM25_ON_MISMATCH=error면 중단)
+    - 생성은 인덱스 락 안에서 (여러 워커가 동시에 워밍업해도 한 워커만 생성)
+    """
+    path = INDEX_DIRS[collection]
+    vs = VECTORSTORES[collection]()
+    marker = collection_marker(vs)
+
+    if _is_fresh(read_manifest(path), marker, "marker"):
+        print(f"BM25 인덱스 로드: {path}")
+        return BM25Index.load(path)
+
+    with index_lock(path):
+        # 락을 기다리는 동안 다른 워커가 이미 다시 만들었으면 그대로 로드
+        manifest = read_manifest(path)
+        if _is_fresh(manifest, marker, "marker"):
+            print(f"BM25 인덱스 로드 (다른 프로세스가 생성): {path}")
+            return BM25Index.load(path)
+
+        if manifest is None:
+            print(f"BM25 인덱스 없음 → 새로 생성: {path}")
+        else:
+            if BM25_ON_MISMATCH == "error":
+                raise RuntimeError(
+                    f"BM25 인덱스가 Chroma 컬렉션({collection})과 다릅니다: {path} "
+                    "(manage.py build_bm25_index로 다시 생성하세요)"
+                )
+            print(f"BM25 인덱스가 오래됨 → 다시 생성: {path}")
+
+        _build_index(collection, vs, marker=marker)
+        return BM25Index.load(path)
+
+
+def indexed_fingerprints():
+    """컬렉션별로 디스크 BM25 인덱스가 만들어진 Chroma fingerprint (manifest 값)"""
+    return {
+        collection: (read_manifest(path) or {}).get("fingerprint")
+        for collection, path in INDEX_DIRS.items()
+    }
@@ -0,0 +1,459 @@
+# checkpointer.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+load_dotenv()
+
+# memory: 프로세스 메모리(sqlite :memory:)에 저장, 크기 제한 있음
+# sqlite: 파일에 저장 (재시작 후에도 유지, 같은 파일을 쓰는 워커끼리 공유, 기본 경로는 .gitignore에 포함)
+# unbounded: 기존 MemorySaver (제한 없음)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory")
+CHECKPOINT_SQLITE_PATH = os.getenv(
+    "CHECKPOINT_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.sqlite3"),
+)
+# 스레드(세션)별로 남길 최신 체크포인트 개수 (다음 턴은 마지막 것만 사용)
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "2"))
+# 최근 사용 순으로 남길 최대 스레드 수, 이 시간(초) 동안 안 쓴 스레드는 삭제
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "2000"))
+CHECKPOINT_THREAD_TTL = int(os.getenv("CHECKPOINT_THREAD_TTL", str(3 * 86400)))
+CHECKPOINT_PRUNE_INTERVAL = int(os.getenv("CHECKPOINT_PRUNE_INTERVAL", "60"))
+
+# 청크 텍스트 대신 해시만 체크포인트에 저장할 state 키
+SLIM_KEYS = {
+    "search_results",
+    "qa_search_results",
+    "hyde_text_results",
+    "hyde_qa_results",
+    "search_results_final",
+    "tool_calls",
+    "packed_context",
+    "prefetch_results",
+}
+# 이보다 짧은 문자열은 그대로 저장
+CHUNK_MIN_CHARS = 64
+CHUNK_REF = "__chunk__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, parent_id TEXT,
+    type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, created_at REAL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, task_id TEXT,
+    idx INTEGER, channel TEXT, type TEXT, value BLOB, task_path TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, updated_at REAL);
+CREATE INDEX IF NOT EXISTS threads_updated ON threads (updated_at);
+CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, text TEXT, last_used REAL);
+CREATE INDEX IF NOT EXISTS chunks_last_used ON chunks (last_used);
+"""
+
+
+class BoundedCheckpointer(BaseCheckpointSaver):
+    """
+    sqlite 기반 LangGraph 체크포인터 (path=":memory:"면 프로세스 메모리)
+    - 스레드별로 최신 keep개 체크포인트만 유지
+    - 오래 안 쓴 스레드(ttl)와 max_threads를 넘는 스레드는 LRU 순으로 삭제
+    - 검색 결과 등 SLIM_KEYS의 긴 문자열은 chunks 테이블에 한 번만 저장하고
+      체크포인트에는 해시만 남김 (읽을 때 원문으로 복원)
+    """
+
+    def __init__(
+        self,
+        path=":memory:",
+        keep=CHECKPOINT_KEEP_PER_THREAD,
+        max_threads=CHECKPOINT_MAX_THREADS,
+        ttl=CHECKPOINT_THREAD_TTL,
+        prune_interval=CHECKPOINT_PRUNE_INTERVAL,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep = keep
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    # ---- 청크 해시 변환 ----
+
+    def _slim(self, value, chunks):
+        if isinstance(value, str) and len(value) >= CHUNK_MIN_CHARS:
+            digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+            chunks[digest] = value
+            return {CHUNK_REF: digest}
+        if isinstance(value, list):
+            return [self._slim(v, chunks) for v in value]
+        if isinstance(value, dict):
+            return {k: self._slim(v, chunks) for k, v in value.items()}
+        return value
+
+    def _fat(self, value, texts):
+        if isinstance(value, dict):
+            if set(value) == {CHUNK_REF}:
+                return texts.get(value[CHUNK_REF], "")
+            return {k: self._fat(v, texts) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._fat(v, texts) for v in value]
+        return value
+
+    @staticmethod
+    def _refs(value, out):
+        if isinstance(value, dict):
+            if set(value) == {CHUNK_REF}:
+                out.add(value[CHUNK_REF])
+            else:
+                for v in value.values():
+                    BoundedCheckpointer._refs(v, out)
+        elif isinstance(value, list):
+            for v in value:
+                BoundedCheckpointer._refs(v, out)
+
+    def _save_chunks(self, chunks, now):
+        # self._lock 안에서 호출
+        if chunks:
+            self.conn.executemany(
+                "INSERT INTO chunks (hash, text, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET last_used = excluded.last_used",
+                [(h, text, now) for h, text in chunks.items()],
+            )
+
+    def _load_chunks(self, values):
+        # self._lock 안에서 호출
+        refs = set()
+        self._refs(values, refs)
+        texts = {}
+        refs = list(refs)
+        for i in range(0, len(refs), 500):
+            batch = refs[i : i + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, text FROM chunks WHERE hash IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            texts.update(rows)
+        return texts
+
+    # ---- 정리 ----
+
+    def _delete_threads(self, thread_ids):
+        for table in ("checkpoints", "writes", "threads"):
+            self.conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ?",
+                [(t,) for t in thread_ids],
+            )
+
+    def _prune_thread(self, thread_id, checkpoint_ns):
+        # 최신 keep개를 제외한 체크포인트와 그 writes 삭제
+        old = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep),
+        ).fetchall()
+        for table in ("checkpoints", "writes"):
+            self.conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, row[0]) for row in old],
+            )
+
+    def prune(self, now=None):
+        """오래된/넘치는 스레드와 어떤 스레드도 참조하지 않는 청크 삭제"""
+        now = now or time.time()
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?",
+                    (now - self.ttl,),
+                )
+            ]
+            overflow = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at >= ? "
+                    "ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+                    (now - self.ttl, self.max_threads),
+                )
+            ]
+            self._delete_threads(expired + overflow)
+
+            # 청크는 저장될 때마다 last_used가 갱신되므로,
+            # 남은 체크포인트 중 가장 오래된 것보다 이전 청크는 참조되지 않음
+            oldest = self.conn.execute(
+                "SELECT MIN(created_at) FROM checkpoints"
+            ).fetchone()[0]
+            cutoff = oldest if oldest is not None else now
+            chunks = self.conn.execute(
+                "DELETE FROM chunks WHERE last_used < ?", (cutoff,)
+            ).rowcount
+            self.conn.commit()
+            self._last_prune = now
+
+        if expired or overflow:
+            print(
+                f"[checkpointer] 스레드 {len(expired) + len(overflow)}개, 청크 {chunks}개 정리"
+            )
+
+    def _maybe_prune(self):
+        if time.time() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def stats(self):
+        with self._lock:
+            return {
+                table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("threads", "checkpoints", "writes", "chunks")
+            }
+
+    # ---- BaseCheckpointSaver ----
+
+    def _tuple(self, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_id, type_, blob, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, blob))
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        pending = [
+            (task_id, channel, self.serde.loads_typed((wtype, value)))
+            for task_id, channel, wtype, value in writes
+        ]
+
+        texts = self._load_chunks([checkpoint["channel_values"], pending])
+        checkpoint["channel_values"] = self._fat(checkpoint["channel_values"], texts)
+        pending = [
+            (task_id, channel, self._fat(value, texts))
+            for task_id, channel, value in pending
+        ]
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=pending,
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        columns = "checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._tuple(thread_id, checkpoint_ns, row)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._tuple(thread_id, checkpoint_ns, row))
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        now = time.time()
+
+        chunks = {}
+        values = {
+            k: self._slim(v, chunks) if k in SLIM_KEYS else v
+            for k, v in checkpoint["channel_values"].items()
+        }
+        type_, blob = self.serde.dumps_typed({**checkpoint, "channel_values": values})
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+
+        with self._lock:
+            self._save_chunks(chunks, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    parent_id,
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                    now,
+                ),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, now)
+            )
+            self._prune_thread(thread_id, checkpoint_ns)
+            self.conn.commit()
+
+        self._maybe_prune()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        chunks, rows = {}, []
+        for idx, (channel, value) in enumerate(writes):
+            if channel in SLIM_KEYS:
+                value = self._slim(value, chunks)
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    blob,
+                    task_path,
+                )
+            )
+
+        # 특수 채널(에러, 인터럽트 등)은 덮어쓰고 일반 채널은 처음 기록만 유지
+        verb = (
+            "INSERT OR REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "INSERT OR IGNORE"
+        )
+        with self._lock:
+            self._save_chunks(chunks, time.time())
+            self.conn.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._delete_threads([thread_id])
+            self.conn.commit()
+
+    # async 메서드: sqlite I/O와 락 대기가 이벤트 루프를 막지 않도록 스레드에서 실행
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(
+            self.put_writes, config, writes, task_id, task_path
+        )
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def build_checkpointer(backend=None):
+    """그래프 compile에 넘길 체크포인터 (그래프당 하나)"""
+    backend = backend or CHECKPOINT_BACKEND
+    if backend == "unbounded":
+        return MemorySaver()
+    if backend == "sqlite":
+        print(f"체크포인트 저장소: {CHECKPOINT_SQLITE_PATH}")
+        return BoundedCheckpointer(CHECKPOINT_SQLITE_PATH)
+    if backend == "memory":
+        return BoundedCheckpointer(":memory:")
+    raise ValueError(f"알 수 없는 CHECKPOINT_BACKEND: {backend}")
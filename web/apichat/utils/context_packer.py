@@ -0,0 +1,149 @@
+# context_packer.py
+import math
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "1") == "1"
+# basic_chain 프롬프트 섹션별 토큰 예산
+CONTEXT_BUDGETS = {
+    "context_text": int(os.getenv("CONTEXT_BUDGET_TEXT", "3000")),
+    "context_qa": int(os.getenv("CONTEXT_BUDGET_QA", "2000")),
+    "context_text2": int(os.getenv("CONTEXT_BUDGET_TEXT2", "1500")),
+    "context_qa2": int(os.getenv("CONTEXT_BUDGET_QA2", "1000")),
+}
+# 이미 넣은 청크와 글자 n-gram이 이 비율 이상 겹치면 중복으로 보고 제외
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_TOKEN_MODEL = os.getenv("CONTEXT_TOKEN_MODEL", "gpt-4o")
+
+# 문서 분할 시 chunk_overlap(150자)로 생기는 앞뒤 겹침을 찾을 때 보는 범위
+_OVERLAP_PROBE = 40
+_OVERLAP_MAX = 300
+_SHINGLE = 5
+
+
+def _load_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(CONTEXT_TOKEN_MODEL)
+    except Exception as e:
+        # BPE 파일을 받을 수 없는 환경 (오프라인 배포 등) → 글자 수로 추정
+        print(f"[context_packer] tiktoken 로드 실패 → 글자 수로 토큰 추정: {e}")
+        return None
+
+
+_encoding = _load_encoding()
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # 한글 기준 대략 2글자당 1토큰 (예산을 넘지 않도록 넉넉하게)
+    return math.ceil(len(text) / 2)
+
+
+def truncate_tokens(text, max_tokens):
+    if _encoding is not None:
+        return _encoding.decode(
+            _encoding.encode(text, disallowed_special=())[:max_tokens]
+        )
+    return text[: max_tokens * 2]
+
+
+def _shingles(text):
+    text = "".join(text.split())
+    return {text[i : i + _SHINGLE] for i in range(len(text) - _SHINGLE + 1)}
+
+
+def _strip_overlap(chunk, packed):
+    """앞에 넣은 청크의 끝부분과 겹치는 chunk 앞부분(splitter overlap)을 잘라냄"""
+    probe = chunk[:_OVERLAP_PROBE]
+    if len(probe) < _OVERLAP_PROBE:
+        return chunk
+    for prev in packed:
+        tail = prev[-_OVERLAP_MAX:]
+        start = tail.find(probe)
+        while start != -1:
+            if chunk.startswith(tail[start:]):
+                return chunk[len(tail) - start :].lstrip()
+            start = tail.find(probe, start + 1)
+    return chunk
+
+
+class ContextPacker:
+    """
+    basic_chain 프롬프트의 검색 결과 섹션을 토큰 예산 안으로 채움
+    - 입력 순서(융합 점수 순위)대로 넣고, 예산을 넘는 청크는 건너뜀
+      (첫 청크가 예산보다 크면 예산만큼 잘라서 넣음)
+    - 앞 섹션까지 포함해 이미 넣은 내용과 거의 같은 청크는 제외
+    - splitter overlap으로 앞 청크와 이어지는 부분은 잘라서 넣음
+    """
+
+    def __init__(self, budgets=None, dedup_threshold=CONTEXT_DEDUP_THRESHOLD):
+        self.budgets = dict(CONTEXT_BUDGETS if budgets is None else budgets)
+        self.dedup_threshold = dedup_threshold
+
+    def pack(self, sections):
+        """
+        sections: {섹션명: [청크, ...]} (섹션 순서대로 처리)
+        반환: ({섹션명: 합친 문자열}, {섹션명: {"in", "kept", "duplicate", "over_budget", "tokens"}})
+        """
+        seen = set()
+        packed, stats = {}, {}
+        for name, chunks in sections.items():
+            budget = self.budgets.get(name)
+            kept, used = [], 0
+            stat = dict.fromkeys(["in", "kept", "duplicate", "over_budget"], 0)
+            for chunk in chunks:
+                stat["in"] += 1
+                chunk = str(chunk)
+                shingles = _shingles(chunk)
+                if shingles and len(shingles & seen) / len(shingles) >= (
+                    self.dedup_threshold
+                ):
+                    stat["duplicate"] += 1
+                    continue
+
+                chunk = _strip_overlap(chunk, kept)
+                tokens = count_tokens(chunk)
+                if budget is not None and used + tokens > budget:
+                    if kept:
+                        stat["over_budget"] += 1
+                        continue
+                    # 1순위 청크 하나가 예산보다 크면 잘라서라도 넣음
+                    chunk = truncate_tokens(chunk, budget)
+                    tokens = count_tokens(chunk)
+
+                kept.append(chunk)
+                seen |= shingles
+                used += tokens
+                stat["kept"] += 1
+
+            stat["tokens"] = used
+            packed[name] = "\n".join(kept)
+            stats[name] = stat
+        return packed, stats
+
+
+context_packer = ContextPacker()
+
+
+def pack_context(sections):
+    """섹션별 검색 결과를 합친 문자열 (CONTEXT_PACKING_ENABLED=0이면 그대로 모두 합침)"""
+    if not CONTEXT_PACKING_ENABLED:
+        return {
+            name: "\n".join(str(chunk) for chunk in chunks)
+            for name, chunks in sections.items()
+        }
+
+    packed, stats = context_packer.pack(sections)
+    summary = ", ".join(
+        f"{name} {s['kept']}/{s['in']}개 {s['tokens']}토큰"
+        for name, s in stats.items()
+        if s["in"]
+    )
+    print(f"[context_packer] {summary}")
+    return packed
@@ -0,0 +1,195 @@
+# dense_engine.py
+import json
+import os
+import shutil
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .bm25_engine import (
+    MANIFEST_FILE,
+    read_manifest,
+    read_texts,
+    replace_directory,
+    write_texts,
+)
+
+# 디스크 형식 버전 (파일 구성이 바뀌면 올림 → 이전 버전 인덱스는 다시 생성)
+FORMAT_VERSION = 1
+DTYPES = ("float32", "float16")
+# float16 행렬은 BLAS matmul이 없어서 이 행 수씩 float32로 바꿔 가며 계산
+CHUNK_ROWS = 8192
+
+
+class DenseIndex:
+    """
+    Chroma 컬렉션 임베딩을 그대로 담은 exact(전수) 벡터 검색 인덱스
+    - 정규화된 벡터 행렬 (float32, 또는 메모리를 절반으로 줄인 float16)
+    - 검색 = 후보 행렬 x 쿼리 벡터 (BLAS) → argpartition으로 top-k
+      (정규화 벡터라 내적 순위 = 코사인/L2 거리 순위, HNSW와 달리 근사 없음)
+    - 문서는 태그별로 정렬해 두고, 태그 필터는 해당 행 구간 슬라이스(복사 없음)로 처리
+    - 생성 후에는 읽기만 하므로 여러 스레드에서 동시에 검색해도 안전함
+    """
+
+    def __init__(
+        self, vectors, texts, metadatas, ids=None, tag_key="tags", dtype="float32"
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"지원하지 않는 dtype: {dtype} ({', '.join(DTYPES)})")
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        # 태그 순으로 정렬해서 태그별 문서가 연속 구간이 되도록 함
+        order = sorted(
+            range(len(texts)), key=lambda i: str((metadatas[i] or {}).get(tag_key))
+        )
+        self.texts = [texts[i] for i in order]
+        self.metadatas = [metadatas[i] or {} for i in order]
+        self.ids = [ids[i] for i in order]
+
+        if len(texts):
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            vectors = vectors[order]
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = (vectors / np.maximum(norms, 1e-12)).astype(dtype)
+
+        self.tag_ranges = {}
+        for row, meta in enumerate(self.metadatas):
+            tag = meta.get(tag_key)
+            start, _ = self.tag_ranges.get(tag, (row, row))
+            self.tag_ranges[tag] = (start, row + 1)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @property
+    def tags(self):
+        return [tag for tag in self.tag_ranges if tag is not None]
+
+    def save(self, path, fingerprint=None, **extra):
+        """
+        mmap으로 읽을 수 있는 디렉토리 형식으로 저장
+        - vectors.npy: 정규화된 벡터 행렬 (행 순서 = 태그 정렬 순서)
+        - texts.bin + text_offsets.npy: 문서 본문
+        - docs.json(ids, metadatas), manifest.json(버전, fingerprint, dtype 등)
+        - 임시 디렉토리에 다 쓴 뒤 교체하므로, 저장 중 실패해도 기존 인덱스는 그대로
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, "vectors.npy"), self.vectors)
+        write_texts(tmp_path, self.texts)
+        with open(os.path.join(tmp_path, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": self.ids, "metadatas": self.metadatas}, f, ensure_ascii=False
+            )
+
+        # manifest는 마지막에 기록 (manifest가 있으면 완성된 인덱스)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "n_docs": len(self.texts),
+            "dim": int(self.vectors.shape[1]),
+            "dtype": str(self.vectors.dtype),
+            "tag_ranges": [
+                [tag, start, end] for tag, (start, end) in self.tag_ranges.items()
+            ],
+            **extra,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        replace_directory(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """save()로 저장한 인덱스 로드 (벡터 행렬과 본문은 mmap → 프로세스 간 페이지 캐시 공유)"""
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"Dense 인덱스 없음: {path}")
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Dense 인덱스 형식 버전 불일치: {manifest.get('format_version')} "
+                f"(필요: {FORMAT_VERSION})"
+            )
+
+        self = cls.__new__(cls)
+        self.tag_ranges = {
+            tag: (start, end) for tag, start, end in manifest["tag_ranges"]
+        }
+        self.vectors = np.load(
+            os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None
+        )
+        with open(os.path.join(path, "docs.json"), encoding="utf-8") as f:
+            docs = json.load(f)
+        self.ids, self.metadatas = docs["ids"], docs["metadatas"]
+        self.texts = read_texts(path, mmap)
+        return self
+
+    def row_ranges(self, tags=None) -> List[Tuple[int, int]]:
+        """태그 필터에 해당하는 (시작, 끝) 행 구간 (tags가 없으면 전체)"""
+        if not tags:
+            return [(0, len(self.texts))] if len(self.texts) else []
+        return sorted(self.tag_ranges[t] for t in set(tags) if t in self.tag_ranges)
+
+    def _block_scores(self, vector, start, end) -> np.ndarray:
+        block = self.vectors[start:end]
+        if block.dtype == np.float32:
+            return block @ vector
+        scores = np.empty(end - start, dtype=np.float32)
+        for offset in range(0, end - start, CHUNK_ROWS):
+            chunk = block[offset : offset + CHUNK_ROWS].astype(np.float32)
+            scores[offset : offset + len(chunk)] = chunk @ vector
+        return scores
+
+    def search_rows(self, vector, k=5, tags=None) -> Tuple[np.ndarray, np.ndarray]:
+        """top-k 문서의 (행 번호, 코사인 유사도) - 유사도 내림차순"""
+        ranges = self.row_ranges(tags)
+        if not ranges or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate(
+            [self._block_scores(vector, start, end) for start, end in ranges]
+        )
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < rows.size else np.arange(k)
+        top = top[np.lexsort((rows[top], -scores[top]))]
+        return rows[top], scores[top]
+
+    def document(self, row: int) -> Document:
+        return Document(
+            page_content=self.texts[row], metadata=self.metadatas[row], id=self.ids[row]
+        )
+
+    def search_by_vector(self, vector, k=5, tags=None) -> List[Document]:
+        rows, _ = self.search_rows(vector, k, tags)
+        return [self.document(int(row)) for row in rows]
+
+
+class DenseIndexRetriever(BaseRetriever):
+    """
+    공유 DenseIndex를 태그/k 조건으로 검색하는 retriever (인덱스는 수정하지 않음)
+    - 쿼리 임베딩은 Chroma 검색과 같은 embeddings(쿼리 캐시 포함)로 계산
+    """
+
+    index: Any
+    embeddings: Any
+    tags: Optional[Tuple[str, ...]] = None
+    k: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        return self.index.search_by_vector(vector, self.k, self.tags)
@@ -0,0 +1,129 @@
+# dense_store.py
+import os
+from datetime import datetime
+
+import numpy as np
+
+from .bm25_store import (
+    COLLECTION_NAME,
+    QA_COLLECTION_NAME,
+    VECTORSTORES,
+    collection_fingerprint,
+    collection_marker,
+)
+from .bm25_engine import index_lock
+from .dense_engine import DTYPES, FORMAT_VERSION, DenseIndex, read_manifest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 컬렉션별 Dense 인덱스 디렉토리 (dense_engine.DenseIndex.save 형식)
+INDEX_DIRS = {
+    COLLECTION_NAME: os.path.join(HERE, "dense_index"),
+    QA_COLLECTION_NAME: os.path.join(HERE, "dense_qa_index"),
+}
+
+# 벡터 저장 dtype: float32 (기본, BLAS 그대로) / float16 (메모리 절반, 검색 때 float32로 변환)
+DENSE_INDEX_DTYPE = os.getenv("DENSE_INDEX_DTYPE", "float32")
+# 인덱스가 Chroma와 다를 때: rebuild(다시 생성) / error(실행 중단)
+DENSE_ON_MISMATCH = os.getenv("DENSE_ON_MISMATCH", "rebuild")
+
+# Chroma에서 한 번에 가져올 문서 수 (임베딩까지 가져오므로 메모리 제한)
+_BATCH_SIZE = 5000
+
+
+def build_from_chroma(vs, dtype=DENSE_INDEX_DTYPE):
+    """
+    Chroma에 저장된 임베딩으로 DenseIndex 생성 (다시 임베딩하지 않음)
+    - 태그 없는 문서도 포함 (태그 없이 검색하면 Chroma처럼 전체에서 찾음)
+    """
+    total = len(vs.get(include=[])["ids"])
+    vectors, texts, metas, ids = [], [], [], []
+    for offset in range(0, total, _BATCH_SIZE):
+        data = vs.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=_BATCH_SIZE,
+            offset=offset,
+        )
+        vectors.append(np.asarray(data["embeddings"], dtype=np.float32))
+        texts.extend(data["documents"])
+        metas.extend(data["metadatas"])
+        ids.extend(data["ids"])
+    vectors = np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32)
+    return DenseIndex(vectors, texts, metas, ids, dtype=dtype)
+
+
+def _is_fresh(manifest, fingerprint, key="fingerprint"):
+    return (
+        manifest is not None
+        and manifest.get("format_version") == FORMAT_VERSION
+        and manifest.get(key) == fingerprint
+        and manifest.get("dtype") == DENSE_INDEX_DTYPE
+    )
+
+
+def index_status(collection, vs=None):
+    """(manifest 또는 None, 현재 본문 fingerprint, 최신 여부) - 전체 본문을 읽음 (빌드/점검용)"""
+    vs = vs or VECTORSTORES[collection]()
+    fingerprint = collection_fingerprint(vs)
+    manifest = read_manifest(INDEX_DIRS[collection])
+    return manifest, fingerprint, _is_fresh(manifest, fingerprint)
+
+
+def build_index(collection, vs=None, fingerprint=None, dtype=DENSE_INDEX_DTYPE):
+    """Chroma에서 Dense 인덱스를 만들어 디스크에 저장 (인덱스 락 안에서)"""
+    with index_lock(INDEX_DIRS[collection]):
+        return _build_index(collection, vs, fingerprint, dtype)
+
+
+def _build_index(
+    collection, vs=None, fingerprint=None, dtype=DENSE_INDEX_DTYPE, marker=None
+):
+    if dtype not in DTYPES:
+        raise ValueError(f"DENSE_INDEX_DTYPE은 {', '.join(DTYPES)} 중 하나: {dtype}")
+    vs = vs or VECTORSTORES[collection]()
+    fingerprint = fingerprint or collection_fingerprint(vs)
+    index = build_from_chroma(vs, dtype)
+    index.save(
+        INDEX_DIRS[collection],
+        fingerprint=fingerprint,
+        marker=marker or collection_marker(vs),
+        collection=collection,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    return index
+
+
+def load_index(collection):
+    """
+    디스크 인덱스를 mmap으로 로드
+    - 최신 여부는 collection_marker(청크 수 + id/metadata)로만 확인 (본문 전체를 읽지 않음)
+    - 없거나 형식 버전/marker/dtype이 다르면 다시 생성 (DENSE_ON_MISMATCH=error면 중단)
+    - 생성은 인덱스 락 안에서 (여러 워커가 동시에 워밍업해도 한 워커만 생성)
+    """
+    path = INDEX_DIRS[collection]
+    vs = VECTORSTORES[collection]()
+    marker = collection_marker(vs)
+
+    if _is_fresh(read_manifest(path), marker, "marker"):
+        print(f"Dense 인덱스 로드: {path}")
+        return DenseIndex.load(path)
+
+    with index_lock(path):
+        # 락을 기다리는 동안 다른 워커가 이미 다시 만들었으면 그대로 로드
+        manifest = read_manifest(path)
+        if _is_fresh(manifest, marker, "marker"):
+            print(f"Dense 인덱스 로드 (다른 프로세스가 생성): {path}")
+            return DenseIndex.load(path)
+
+        if manifest is None:
+            print(f"Dense 인덱스 없음 → 새로 생성: {path}")
+        else:
+            if DENSE_ON_MISMATCH == "error":
+                raise RuntimeError(
+                    f"Dense 인덱스가 Chroma 컬렉션({collection})과 다릅니다: {path} "
+                    "(manage.py build_dense_index로 다시 생성하세요)"
+                )
+            print(f"Dense 인덱스가 오래됨 → 다시 생성: {path}")
+
+        _build_index(collection, vs, marker=marker)
+        return DenseIndex.load(path)
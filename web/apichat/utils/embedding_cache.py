@@ -0,0 +1,176 @@
+# embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from .embedding_service import load_embeddings
+from .startup import LazyComponent, lazy
+
+load_dotenv()
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+# 비워두면 메모리에만 저장, 경로를 주면 sqlite 파일에도 저장 (재시작/워커 간 공유)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+
+def cache_key(model_name, normalize, text):
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}|{int(bool(normalize))}|{digest}"
+
+
+class EmbeddingCache:
+    """
+    쿼리 임베딩 LRU 캐시 (키: 모델명, 정규화 여부, 텍스트 sha256)
+    - 같은 키를 동시에 계산하면 한 스레드만 인코딩하고 나머지는 결과를 기다림
+      (원문/QA dense leg가 같은 쿼리를 동시에 임베딩하는 경우)
+    - path가 있으면 sqlite에 함께 저장하고, 메모리에 없을 때 디스크에서 읽음
+    """
+
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE, path=EMBEDDING_CACHE_PATH):
+        self.max_size = max_size
+        self._lru = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(["hits", "disk_hits", "misses"], 0)
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB)"
+            )
+            self._db.commit()
+
+    def _remember(self, key, vec):
+        # self._lock 안에서 호출
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vec FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def _disk_put(self, key, vec):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                (key, vec.tobytes()),
+            )
+            self._db.commit()
+
+    def get_or_compute(self, key, compute):
+        """캐시에 있으면 반환, 없으면 compute()로 계산해서 저장 (float32 배열)"""
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.counters["hits"] += 1
+                return vec
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self.counters["hits"] += 1
+                    return vec
+            # 계산하던 스레드가 실패한 경우 직접 계산
+            return np.asarray(compute(), dtype=np.float32)
+
+        try:
+            vec = self._disk_get(key)
+            if vec is not None:
+                self.counters["disk_hits"] += 1
+            else:
+                self.counters["misses"] += 1
+                vec = np.asarray(compute(), dtype=np.float32)
+                self._disk_put(key, vec)
+            with self._lock:
+                self._remember(key, vec)
+            return vec
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, size=len(self._lru))
+
+
+# 프로세스 전체가 공유하는 캐시 (apichat 검색, main 문서 검색)
+query_cache = EmbeddingCache()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    embed_query 결과를 query_cache에 저장하는 Embeddings 래퍼
+    - 같은 model_name/normalize 설정이면 래핑한 객체가 달라도 캐시를 공유함
+    - embed_documents(DB 생성용)는 캐시하지 않고 그대로 전달
+    - inner가 LazyComponent면 처음 임베딩할 때 모델을 로드
+    """
+
+    def __init__(self, inner, model_name, normalize=True, cache=None):
+        self._inner = inner
+        self.model_name = model_name
+        self.normalize = normalize
+        self.cache = cache or query_cache
+
+    @property
+    def inner(self):
+        if isinstance(self._inner, LazyComponent):
+            return self._inner.get()
+        return self._inner
+
+    def embed_query(self, text):
+        key = cache_key(self.model_name, self.normalize, text)
+        vec = self.cache.get_or_compute(key, lambda: self.inner.embed_query(text))
+        return vec.tolist()
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+
+_hf_embeddings = {}
+_hf_lock = threading.Lock()
+
+
+def cached_hf_embeddings(model_name, normalize=True):
+    """
+    임베딩 모델을 (모델명, 정규화 여부)별로 한 번만 로드해서 캐시 래퍼로 반환
+    - retriever.py / retriever_qa.py / main 문서 검색이 같은 bge-m3 인스턴스를 공유
+    - EMBEDDING_SERVICE_URL이 있으면 모델 대신 임베딩 서비스 클라이언트
+    - 모델은 import 시점이 아니라 처음 임베딩할 때(또는 startup 워밍업에서) 로드
+    """
+    with _hf_lock:
+        key = (model_name, normalize)
+        if key not in _hf_embeddings:
+            name = f"embeddings:{model_name}" + ("" if normalize else ":raw")
+            inner = lazy(name, lambda: load_embeddings(model_name, normalize))
+            _hf_embeddings[key] = CachedEmbeddings(inner, model_name, normalize)
+        return _hf_embeddings[key]
@@ -0,0 +1,381 @@
+# embedding_service.py
+import base64
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# 값이 있으면 bge-m3를 프로세스에 올리지 않고 임베딩 서비스(run_embedding_service)를 호출
+# 예: http://127.0.0.1:8765
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "")
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "30"))
+# 클라이언트가 embed_documents를 나눠 보내는 단위
+EMBEDDING_CLIENT_CHUNK = int(os.getenv("EMBEDDING_CLIENT_CHUNK", "256"))
+
+# 서버: 이 시간(ms) 동안 들어온 요청을 최대 BATCH_MAX개 텍스트까지 모아서 한 번에 인코딩
+EMBEDDING_BATCH_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+# 쿼리 임베딩 백엔드: torch(SentenceTransformer) / onnx(export_onnx_encoder로 만든 int8 모델)
+# - 문서 임베딩(embed_documents)은 Chroma에 저장된 fp32 벡터와 같도록 항상 torch
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+
+_local_models = {}
+_local_lock = threading.Lock()
+
+
+def local_model(model_name, device=EMBEDDING_DEVICE):
+    """(모델명, 디바이스)별 SentenceTransformer를 프로세스에서 한 번만 로드"""
+    with _local_lock:
+        key = (model_name, device)
+        if key not in _local_models:
+            from sentence_transformers import SentenceTransformer
+
+            _local_models[key] = SentenceTransformer(model_name, device=device)
+        return _local_models[key]
+
+
+def query_model(model_name, device=EMBEDDING_DEVICE):
+    """쿼리 인코더 (EMBEDDING_BACKEND=onnx면 OnnxEncoder, 아니면 local_model과 같은 인스턴스)"""
+    if EMBEDDING_BACKEND != "onnx":
+        return local_model(model_name, device)
+    with _local_lock:
+        key = (model_name, "onnx")
+        if key not in _local_models:
+            from .onnx_encoder import OnnxEncoder
+
+            encoder = OnnxEncoder()
+            if encoder.model_name != model_name:
+                raise ValueError(
+                    f"ONNX 모델({encoder.model_name})이 요청한 모델({model_name})과 다릅니다"
+                )
+            print(
+                f"ONNX 쿼리 인코더 로드: {model_name} (max_length {encoder.max_length})"
+            )
+            _local_models[key] = encoder
+        return _local_models[key]
+
+
+def _clean(texts):
+    # HuggingFaceEmbeddings와 같이 줄바꿈을 공백으로 (로컬/서비스 결과가 같도록)
+    return [("" if t is None else str(t)).replace("\n", " ") for t in texts]
+
+
+def encode_vectors(vectors):
+    """float32 2차원 배열 → JSON 응답 (base64 바이트 + shape)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {
+        "shape": list(vectors.shape),
+        "b64": base64.b64encode(vectors.tobytes()).decode("ascii"),
+    }
+
+
+def decode_vectors(payload):
+    data = base64.b64decode(payload["b64"])
+    return np.frombuffer(data, dtype=np.float32).reshape(payload["shape"])
+
+
+class _Request:
+    __slots__ = ("texts", "normalize", "event", "result", "error")
+
+    def __init__(self, texts, normalize):
+        self.texts = texts
+        self.normalize = normalize
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 임베딩 요청을 모아 encode_fn을 한 번만 호출하는 배처
+    - 첫 요청 후 max_wait초 또는 max_batch개 텍스트가 찰 때까지 대기
+    - encode_fn(texts)는 정규화하지 않은 float32 배열을 반환, 정규화는 요청별로 적용
+    """
+
+    def __init__(
+        self,
+        encode_fn,
+        max_batch=EMBEDDING_BATCH_MAX,
+        max_wait=EMBEDDING_BATCH_WAIT_MS / 1000,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ["requests", "texts", "batches", "max_batch_texts", "encode_seconds"], 0
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, texts, normalize=True):
+        request = _Request(list(texts), normalize)
+        if not request.texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._queue.put(request)
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        count = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            count += len(request.texts)
+        return batch, count
+
+    def _run(self):
+        while True:
+            batch, count = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            start = time.perf_counter()
+            try:
+                vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.event.set()
+                continue
+
+            with self._lock:
+                self.counters["requests"] += len(batch)
+                self.counters["texts"] += count
+                self.counters["batches"] += 1
+                self.counters["max_batch_texts"] = max(
+                    self.counters["max_batch_texts"], count
+                )
+                self.counters["encode_seconds"] += time.perf_counter() - start
+
+            offset = 0
+            for request in batch:
+                result = vectors[offset : offset + len(request.texts)]
+                offset += len(request.texts)
+                if request.normalize:
+                    norms = np.linalg.norm(result, axis=1, keepdims=True)
+                    result = result / np.maximum(norms, 1e-12)
+                request.result = result
+                request.event.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["avg_batch_texts"] = (
+            stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+
+def _handler(batchers, model_name):
+    class EmbeddingHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 클라이언트 keep-alive
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send(404, {"error": "not found"})
+                return
+            self._send(
+                200,
+                {
+                    "model": model_name,
+                    "backend": EMBEDDING_BACKEND,
+                    **batchers["query"].stats(),
+                    "documents": batchers["documents"].stats(),
+                },
+            )
+
+        def do_POST(self):
+            if self.path != "/embed":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                texts = ["" if t is None else str(t) for t in payload["texts"]]
+                batcher = batchers["query" if payload.get("query") else "documents"]
+            except (KeyError, TypeError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            try:
+                vectors = batcher.submit(texts, payload.get("normalize", True))
+            except Exception as e:
+                print(f"[embedding_service] 인코딩 에러: {e}")
+                self._send(500, {"error": str(e)})
+                return
+            self._send(200, {"model": model_name, **encode_vectors(vectors)})
+
+        def log_message(self, format, *args):
+            pass  # 요청마다 로그를 남기지 않음
+
+    return EmbeddingHandler
+
+
+def serve(
+    host="127.0.0.1",
+    port=8765,
+    model_name="BAAI/bge-m3",
+    device=EMBEDDING_DEVICE,
+    max_batch=EMBEDDING_BATCH_MAX,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+):
+    """
+    모델을 한 번 로드하고 POST /embed, GET /health를 처리하는 HTTP 서버 실행 (블로킹)
+    - payload의 query가 참이면 쿼리 인코더(EMBEDDING_BACKEND), 아니면 문서용 torch 모델
+    - 문서용 모델은 처음 문서 요청이 올 때 로드 (백엔드가 torch면 같은 인스턴스)
+    """
+
+    def encoder(get_model):
+        def encode(texts):
+            return get_model().encode(
+                texts,
+                batch_size=max_batch,
+                normalize_embeddings=False,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+
+        return encode
+
+    query_encode = encoder(lambda: query_model(model_name, device))
+    query_encode(["warmup"])
+    batchers = {
+        "query": MicroBatcher(
+            query_encode, max_batch=max_batch, max_wait=max_wait_ms / 1000
+        ),
+        "documents": MicroBatcher(
+            encoder(lambda: local_model(model_name, device)),
+            max_batch=max_batch,
+            max_wait=max_wait_ms / 1000,
+        ),
+    }
+    server = ThreadingHTTPServer((host, port), _handler(batchers, model_name))
+    server.daemon_threads = True
+    print(
+        f"[embedding_service] {model_name} ({device}, 쿼리 {EMBEDDING_BACKEND}) "
+        f"→ http://{host}:{port} (batch {max_batch}, wait {max_wait_ms}ms)"
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    프로세스 안의 모델로 임베딩 (EMBEDDING_SERVICE_URL이 없을 때)
+    - 쿼리: EMBEDDING_BACKEND 인코더, 문서: SentenceTransformer (처음 문서 임베딩 때 로드)
+    """
+
+    def __init__(self, model_name, normalize=True, device=EMBEDDING_DEVICE):
+        self.model_name = model_name
+        self.normalize = normalize
+        self.device = device
+        self.query_client = query_model(model_name, device)
+
+    @property
+    def client(self):
+        return local_model(self.model_name, self.device)
+
+    def _encode(self, model, texts):
+        return model.encode(
+            _clean(texts),
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+
+    def embed_documents(self, texts):
+        return self._encode(self.client, texts).tolist()
+
+    def embed_query(self, text):
+        return self._encode(self.query_client, [text])[0].tolist()
+
+
+class RemoteEmbeddings(Embeddings):
+    """임베딩 서비스를 호출하는 Embeddings (HuggingFaceEmbeddings 대신 사용)"""
+
+    def __init__(
+        self,
+        url=EMBEDDING_SERVICE_URL,
+        normalize=True,
+        timeout=EMBEDDING_SERVICE_TIMEOUT,
+        chunk_size=EMBEDDING_CLIENT_CHUNK,
+    ):
+        self.url = url.rstrip("/")
+        self.normalize = normalize
+        self.chunk_size = chunk_size
+        # 연결 실패(서비스 재시작 등)만 재시도
+        self._client = httpx.Client(
+            base_url=self.url,
+            timeout=timeout,
+            transport=httpx.HTTPTransport(retries=2),
+        )
+
+    def _embed(self, texts, query=False):
+        response = self._client.post(
+            "/embed",
+            json={"texts": _clean(texts), "normalize": self.normalize, "query": query},
+        )
+        response.raise_for_status()
+        return decode_vectors(response.json())
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        parts = [
+            self._embed(texts[i : i + self.chunk_size])
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+        return np.concatenate(parts).tolist()
+
+    def embed_query(self, text):
+        return self._embed([text], query=True)[0].tolist()
+
+    def health(self):
+        response = self._client.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+
+def load_embeddings(model_name, normalize=True):
+    """
+    EMBEDDING_SERVICE_URL이 있으면 RemoteEmbeddings, 없으면 프로세스 안에 모델 로드
+    (모델명은 서비스가 로드한 모델과 같아야 함)
+    """
+    if EMBEDDING_SERVICE_URL:
+        print(f"임베딩 서비스 사용: {EMBEDDING_SERVICE_URL} ({model_name})")
+        return RemoteEmbeddings(EMBEDDING_SERVICE_URL, normalize=normalize)
+    return LocalEmbeddings(model_name, normalize=normalize)
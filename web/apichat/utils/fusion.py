@@ -0,0 +1,121 @@
+# fusion.py
+import os
+from collections import namedtuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 검색 결과 융합 방식
+# - rrf: 가중 RRF (기본, EnsembleRetriever와 같은 점수)
+# - linear: 리스트별 점수를 min-max 정규화한 뒤 가중합
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf")
+FUSION_METHODS = ("rrf", "linear")
+# EnsembleRetriever 기본값과 동일한 RRF 상수
+RRF_C = 60
+
+# leg 하나의 검색 결과 (순위 순 Document, 청크 id 키, 점수(클수록 관련, 없으면 None))
+LegResult = namedtuple("LegResult", ["docs", "keys", "scores"])
+
+
+def doc_key(doc):
+    # Chroma 청크 id (없으면 본문)
+    return doc.id if doc.id is not None else doc.page_content
+
+
+def weighted_rrf(id_lists, weights, size, c=RRF_C):
+    """정수 id 배열(순위 순) 리스트의 가중 RRF 점수 (id로 인덱싱하는 길이 size 배열)"""
+    scores = np.zeros(size, dtype=np.float64)
+    for ids, weight in zip(id_lists, weights):
+        np.add.at(scores, ids, weight / (np.arange(1, len(ids) + 1) + c))
+    return scores
+
+
+def linear_fusion(id_lists, weights, size, score_lists=None):
+    """
+    리스트별 점수를 min-max 정규화([0, 1])한 뒤 가중합
+    - 점수가 없는 리스트는 순위로 대신함 (1등 1.0 → 꼴등 0.0)
+    - 리스트 안 점수가 모두 같으면 전부 1.0
+    """
+    scores = np.zeros(size, dtype=np.float64)
+    score_lists = score_lists or [None] * len(id_lists)
+    for ids, weight, raw in zip(id_lists, weights, score_lists):
+        if len(ids) == 0:
+            continue
+        if raw is None:
+            raw = np.arange(len(ids), 0, -1, dtype=np.float64)
+        raw = np.asarray(raw, dtype=np.float64)
+        low, high = raw.min(), raw.max()
+        norm = (raw - low) / (high - low) if high > low else np.ones(len(raw))
+        np.add.at(scores, ids, weight * norm)
+    return scores
+
+
+class CandidatePool:
+    """
+    요청 하나의 전역 후보 집합 (청크 id → 처음 본 순서대로 0, 1, 2, ... 정수)
+    - 쿼리 x leg 결과 리스트를 정수 배열로 바꿔 쌓아 두고, 마지막에 한 번 융합
+    - 문자열 키는 청크를 넣을 때 한 번만 해시 (1,200자 본문 대신 짧은 청크 id)
+    - 같은 점수면 먼저 나온 청크가 앞 (EnsembleRetriever와 같음)
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self.docs = []
+        self.id_lists, self.weights, self.score_lists, self.groups = [], [], [], []
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, leg, weight=1.0, group=0):
+        """LegResult 하나를 가중치와 그룹(쿼리 번호)으로 추가 → 정수 id 배열"""
+        ids = np.empty(len(leg.keys), dtype=np.int64)
+        for i, (key, doc) in enumerate(zip(leg.keys, leg.docs)):
+            index = self._ids.get(key)
+            if index is None:
+                index = self._ids[key] = len(self.docs)
+                self.docs.append(doc)
+            ids[i] = index
+        self.id_lists.append(ids)
+        self.weights.append(weight)
+        self.score_lists.append(leg.scores)
+        self.groups.append(group)
+        return ids
+
+    def add_legs(self, legs, weights, group=0):
+        """같은 쿼리의 leg 결과들을 leg별 가중치로 추가 (None leg는 건너뜀)"""
+        for leg, weight in zip(legs, weights):
+            if leg is not None:
+                self.add(leg, weight, group)
+
+    def fuse(self, method=FUSION_METHOD, c=RRF_C, group=None):
+        """
+        (정수 id 배열, 융합 점수 배열) - 점수 내림차순
+        - group을 주면 그 쿼리의 leg만 융합 (쿼리별 결과)
+        """
+        picked = [i for i, g in enumerate(self.groups) if group is None or g == group]
+        if not picked:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        id_lists = [self.id_lists[i] for i in picked]
+        weights = [self.weights[i] for i in picked]
+
+        size = len(self.docs)
+        if method == "rrf":
+            scores = weighted_rrf(id_lists, weights, size, c)
+        elif method == "linear":
+            score_lists = [self.score_lists[i] for i in picked]
+            scores = linear_fusion(id_lists, weights, size, score_lists)
+        else:
+            raise ValueError(
+                f"알 수 없는 융합 방식: {method} ({', '.join(FUSION_METHODS)})"
+            )
+
+        candidates = np.unique(np.concatenate(id_lists))
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return order, scores[order]
+
+    def ranked(self, method=FUSION_METHOD, c=RRF_C, group=None, top_n=None):
+        """융합 순위 순 Document 리스트"""
+        order, _ = self.fuse(method, c, group)
+        return [self.docs[i] for i in order[:top_n]]
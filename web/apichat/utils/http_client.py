@@ -0,0 +1,110 @@
+# http_client.py
+import importlib.util
+import os
+import threading
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+load_dotenv()
+
+# openai: 실제 OpenAI 호출 / stub: 네트워크 없이 고정 응답 (bench_replay 등 오프라인 측정용)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# OpenAI 호출이 공유하는 커넥션 풀 설정 (워커 프로세스당 하나)
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "1") == "1"
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "32"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+# 초 단위, read는 스트리밍 토큰 사이 대기 시간도 포함
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+OPENAI_POOL_TIMEOUT = float(os.getenv("OPENAI_POOL_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# HTTP/2는 h2 패키지가 있을 때만 (없으면 HTTP/1.1 keep-alive)
+HTTP2_ENABLED = OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None
+
+_lock = threading.RLock()  # openai 클라이언트를 만들 때 httpx 클라이언트도 같이 만듦
+_clients = {}
+
+
+def default_timeout():
+    return httpx.Timeout(
+        OPENAI_READ_TIMEOUT,
+        connect=OPENAI_CONNECT_TIMEOUT,
+        pool=OPENAI_POOL_TIMEOUT,
+    )
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _shared(name, factory):
+    with _lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def sync_http_client():
+    """동기 OpenAI 호출(체인 invoke, 툴 호출, 이미지 분석, Whisper)이 공유하는 httpx 클라이언트"""
+    return _shared(
+        "sync",
+        lambda: httpx.Client(
+            http2=HTTP2_ENABLED, limits=_limits(), timeout=default_timeout()
+        ),
+    )
+
+
+def async_http_client():
+    """
+    비동기 호출(astream 등)이 공유하는 httpx 클라이언트
+    - 커넥션이 이벤트 루프에 묶이므로 워커의 ASGI 루프 하나에서만 사용
+    """
+    return _shared(
+        "async",
+        lambda: httpx.AsyncClient(
+            http2=HTTP2_ENABLED, limits=_limits(), timeout=default_timeout()
+        ),
+    )
+
+
+def chat_openai(**kwargs):
+    """공유 커넥션 풀을 쓰는 ChatOpenAI (인자는 ChatOpenAI와 동일)"""
+    if LLM_BACKEND == "stub":
+        from .stub_llm import StubChatModel
+
+        return StubChatModel(**kwargs)
+    kwargs.setdefault("timeout", default_timeout())
+    kwargs.setdefault("max_retries", OPENAI_MAX_RETRIES)
+    # 스트리밍 호출도 마지막 청크에 토큰 사용량을 받음 (metrics 토큰 집계용)
+    kwargs.setdefault("stream_usage", True)
+    return ChatOpenAI(
+        http_client=sync_http_client(),
+        http_async_client=async_http_client(),
+        **kwargs,
+    )
+
+
+def get_openai_client():
+    """공유 커넥션 풀을 쓰는 openai.OpenAI (호출별 timeout은 with_options로 지정)"""
+    if LLM_BACKEND == "stub":
+        from .stub_llm import StubOpenAIClient
+
+        return _shared("stub", StubOpenAIClient)
+    return _shared(
+        "openai",
+        lambda: openai.OpenAI(
+            http_client=sync_http_client(),
+            timeout=default_timeout(),
+            max_retries=OPENAI_MAX_RETRIES,
+        ),
+    )
@@ -0,0 +1,207 @@
+# image_cache.py
+import base64
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow가 없으면 원본 그대로 전송
+    Image = None
+
+load_dotenv()
+
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "1") == "1"
+# global: 모든 세션이 분석 결과 공유 / session: 같은 세션(thread_id) 안에서만 재사용
+IMAGE_CACHE_SCOPE = os.getenv("IMAGE_CACHE_SCOPE", "global")
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "512"))
+# gpt-4o vision(detail=high)은 2048px 안으로 줄인 뒤 짧은 변을 768px로 맞춰서 처리함
+IMAGE_MAX_LONG_SIDE = int(os.getenv("IMAGE_MAX_LONG_SIDE", "2048"))
+IMAGE_MAX_SHORT_SIDE = int(os.getenv("IMAGE_MAX_SHORT_SIDE", "768"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "10"))
+
+
+def load_image_bytes(url):
+    """
+    이미지 URL → (바이트, mime), 읽을 수 없으면 (None, None)
+    - MEDIA_URL 경로면 로컬 파일, data URL이면 디코딩, 그 외(S3 등)는 다운로드
+    """
+    if url.startswith("data:"):
+        header, _, data = url.partition(",")
+        mime = header[5:].split(";")[0] or "image/png"
+        return base64.b64decode(data), mime
+
+    path = urlparse(url).path  # "/media/....png"
+    if path.startswith(settings.MEDIA_URL):
+        rel = path[len(settings.MEDIA_URL) :].lstrip("/")  # "chatimage/xxx.png"
+        local_path = os.path.join(settings.MEDIA_ROOT, rel)
+        if os.path.exists(local_path):
+            mime, _ = mimetypes.guess_type(local_path)
+            with open(local_path, "rb") as f:
+                return f.read(), mime or "image/png"
+        print(f"이미지 파일이 로컬에 없음: {local_path}")
+
+    if url.startswith(("http://", "https://")):
+        try:
+            response = requests.get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[image_cache] 이미지 다운로드 실패 → URL 그대로 전송: {e}")
+            return None, None
+        mime = response.headers.get("Content-Type", "").split(";")[0]
+        if not mime.startswith("image/"):
+            mime = mimetypes.guess_type(path)[0] or "image/png"
+        return response.content, mime
+
+    return None, None
+
+
+def _target_size(width, height):
+    scale = min(1.0, IMAGE_MAX_LONG_SIDE / max(width, height))
+    scale *= min(1.0, IMAGE_MAX_SHORT_SIDE / (min(width, height) * scale))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def downscale_image(data, mime):
+    """
+    vision 모델이 실제로 보는 해상도로 줄이고 JPEG로 다시 압축 → (바이트, mime)
+    - 투명도가 있으면 PNG 유지, 결과가 원본보다 크면 원본 사용
+    """
+    if Image is None:
+        return data, mime
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            size = _target_size(*image.size)
+            resized = size != image.size
+            if resized:
+                image = image.resize(size, Image.LANCZOS)
+
+            has_alpha = image.mode in ("RGBA", "LA") or (
+                image.mode == "P" and "transparency" in image.info
+            )
+            out = io.BytesIO()
+            if has_alpha:
+                image.save(out, format="PNG", optimize=True)
+                out_mime = "image/png"
+            else:
+                image.convert("RGB").save(
+                    out, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True
+                )
+                out_mime = "image/jpeg"
+    except Exception as e:
+        print(f"[image_cache] 이미지 변환 실패 → 원본 전송: {e}")
+        return data, mime
+
+    if not resized and out.tell() >= len(data):
+        return data, mime
+    return out.getvalue(), out_mime
+
+
+class ImageAnalysisCache:
+    """
+    이미지 내용(sha256)별 분석 결과 LRU 캐시
+    - scope가 session이면 키에 thread_id를 포함해서 세션 간에는 공유하지 않음
+    - URL → 해시도 기억해서 같은 URL은 다시 다운로드하지 않음
+    - enabled가 False면 조회/저장 없이 이미지 축소만 함
+    """
+
+    def __init__(
+        self,
+        max_size=IMAGE_CACHE_SIZE,
+        scope=IMAGE_CACHE_SCOPE,
+        enabled=IMAGE_CACHE_ENABLED,
+    ):
+        self.max_size = max_size
+        self.scope = scope
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._url_hashes = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ["hits", "misses", "url_hits", "bytes_in", "bytes_sent"], 0
+        )
+
+    def _key(self, digest, session_id):
+        return (session_id if self.scope == "session" else None, digest)
+
+    @staticmethod
+    def _put(store, key, value, max_size):
+        # self._lock 안에서 호출
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_size:
+            store.popitem(last=False)
+
+    def get(self, url, session_id=None, loader=load_image_bytes):
+        """
+        (캐시된 분석 또는 None, 전송할 이미지 URL, 캐시 키 또는 None)
+        - 캐시에 없으면 이미지를 읽어 줄인 data URL을 반환
+        - 이미지를 읽지 못하면 원래 URL을 그대로 반환 (키 없음, 저장 안 함)
+        """
+        with self._lock:
+            digest = self._url_hashes.get(url) if self.enabled else None
+            if digest is not None:
+                self._url_hashes.move_to_end(url)
+                key = self._key(digest, session_id)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    self.counters["url_hits"] += 1
+                    return self._entries[key], url, key
+
+        data, mime = loader(url)
+        if data is None:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None, url, None
+
+        digest = hashlib.sha256(data).hexdigest()
+        key = self._key(digest, session_id)
+        with self._lock:
+            # data URL은 내용이 곧 키라서 URL → 해시로 기억하지 않음
+            if self.enabled and not url.startswith("data:"):
+                self._put(self._url_hashes, url, digest, self.max_size)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return self._entries[key], url, key
+
+        small, small_mime = downscale_image(data, mime)
+        with self._lock:
+            self.counters["misses"] += 1
+            self.counters["bytes_in"] += len(data)
+            self.counters["bytes_sent"] += len(small)
+        print(f"[image_cache] 이미지 {len(data)} → {len(small)} bytes ({small_mime})")
+        b64 = base64.b64encode(small).decode("utf-8")
+        return None, f"data:{small_mime};base64,{b64}", key
+
+    def store(self, key, analysis):
+        if key is None or not self.enabled:
+            return
+        with self._lock:
+            self._put(self._entries, key, analysis, self.max_size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._url_hashes.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries))
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+image_cache = ImageAnalysisCache()
@@ -0,0 +1,264 @@
+# intent_classifier.py
+import hashlib
+import json
+import os
+import threading
+import zipfile
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .bm25_engine import index_lock
+from .rag2 import CLASSIFY_EXAMPLES
+from .retriever import embeddings, EMBED_MODEL
+from .startup import lazy
+
+load_dotenv()
+
+LABELS = ("api", "basic", "none")
+
+# off: LLM만 사용 / shadow: LLM으로 답하고 로컬 예측은 기록만 / on: 로컬 우선
+INTENT_CLASSIFIER_MODE = os.getenv("INTENT_CLASSIFIER_MODE", "off")
+# 로컬 예측 확률이 이 값 이상일 때만 사용, 낮으면 LLM
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.85"))
+# on 모드에서 로컬 분류기를 쓰는 질문 비율 (0~1, 질문 해시 기준이라 같은 질문은 항상 같은 쪽)
+INTENT_CLASSIFIER_ROLLOUT = float(os.getenv("INTENT_CLASSIFIER_ROLLOUT", "1.0"))
+# 분류 문장에 붙일 직전 사용자 질문 수 (후속 질문 "그럼 삭제는?"도 앞 질문 맥락으로 분류)
+INTENT_CLASSIFIER_HISTORY_TURNS = int(os.getenv("INTENT_CLASSIFIER_HISTORY_TURNS", "1"))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAD_FILE_PATH = os.path.join(HERE, "intent_head.npz")
+# LLM 분류 결과 로그 (로컬 분류기 재학습/평가 데이터)
+CLASSIFY_LOG_PATH = os.getenv(
+    "CLASSIFY_LOG_PATH", os.path.join(HERE, "classify_log.jsonl")
+)
+
+_log_lock = threading.Lock()
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """
+    bge-m3 임베딩 + softmax 선형 분류기 (api / basic / none)
+    - 가중치는 (임베딩 차원 x 3) 행렬 하나라서 예측은 임베딩 후 행렬곱 1번
+    """
+
+    def __init__(self, weights, bias, labels=LABELS, embed_fn=None):
+        self.weights = weights
+        self.bias = bias
+        self.labels = tuple(labels)
+        self.embed_fn = embed_fn or embeddings.embed_query
+
+    @classmethod
+    def train(
+        cls, vectors, labels, epochs=500, lr=0.5, l2=1e-3, label_set=LABELS, **kwargs
+    ):
+        """정규화된 임베딩(n x d)과 라벨로 경사하강법 학습 (클래스별 가중치로 불균형 보정)"""
+        x = np.asarray(vectors, dtype=np.float32)
+        y = np.array([label_set.index(label) for label in labels])
+        n, dim = x.shape
+        k = len(label_set)
+
+        counts = np.bincount(y, minlength=k).astype(np.float32)
+        sample_weight = (n / (k * np.maximum(counts, 1)))[y]
+        sample_weight /= sample_weight.sum()
+        onehot = np.eye(k, dtype=np.float32)[y]
+
+        weights = np.zeros((dim, k), dtype=np.float32)
+        bias = np.zeros(k, dtype=np.float32)
+        for _ in range(epochs):
+            probs = _softmax(x @ weights + bias)
+            grad = (probs - onehot) * sample_weight[:, None]
+            weights -= lr * (x.T @ grad + l2 * weights)
+            bias -= lr * grad.sum(axis=0)
+
+        return cls(weights, bias, label_set, **kwargs)
+
+    def predict_proba_vectors(self, vectors):
+        return _softmax(
+            np.asarray(vectors, dtype=np.float32) @ self.weights + self.bias
+        )
+
+    def predict(self, text):
+        """(라벨, 확률)"""
+        vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        vec /= np.linalg.norm(vec) or 1.0
+        probs = self.predict_proba_vectors(vec[None, :])[0]
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    def save(self, path=HEAD_FILE_PATH, **meta):
+        """
+        index_lock 안에서 임시 파일에 쓴 뒤 os.replace로 교체
+        - 로드 중인 다른 워커가 반쯤 쓴 파일을 읽지 않도록
+        """
+        with index_lock(path):
+            self._write(path, **meta)
+
+    def _write(self, path, **meta):
+        # index_lock 안에서 호출
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        # 파일 객체로 넘겨야 np.savez가 이름 끝에 .npz를 붙이지 않음
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                weights=self.weights,
+                bias=self.bias,
+                labels=np.array(self.labels, dtype=str),
+                model=np.array(EMBED_MODEL),
+                meta=np.array(json.dumps(meta, ensure_ascii=False)),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=HEAD_FILE_PATH, **kwargs):
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["model"]) != EMBED_MODEL:
+                raise ValueError(
+                    f"임베딩 모델 불일치: {data['model']} (필요: {EMBED_MODEL})"
+                )
+            return cls(data["weights"], data["bias"], list(data["labels"]), **kwargs)
+
+
+def log_classification(question, label, source, local=None):
+    """
+    분류 결과를 JSONL로 기록 (source: llm/local, local: 로컬 예측 (라벨, 확률))
+    - question에는 로컬 분류기 입력과 같은 classify_text를 넣어야 재학습/평가가 맞음
+    """
+    record = {"question": question, "label": label, "source": source}
+    if local is not None:
+        record["local_label"], record["local_confidence"] = local
+    try:
+        with _log_lock, open(CLASSIFY_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[intent_classifier] 로그 기록 실패: {e}")
+
+
+def load_labelled(path):
+    """JSONL에서 (질문, 라벨) 목록 (LLM이 분류한 것만)"""
+    pairs = []
+    if not path or not os.path.exists(path):
+        return pairs
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("source", "llm") == "llm" and record.get("label") in LABELS:
+                pairs.append((record["question"], record["label"]))
+    return pairs
+
+
+def training_data(log_path=CLASSIFY_LOG_PATH):
+    """few-shot 예시 + LLM 분류 로그 (같은 질문은 마지막 라벨 사용)"""
+    merged = dict(CLASSIFY_EXAMPLES)
+    merged.update(load_labelled(log_path))
+    return list(merged.items())
+
+
+def train_classifier(pairs, **kwargs):
+    texts = [q for q, _ in pairs]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return IntentClassifier.train(vectors, [label for _, label in pairs], **kwargs)
+
+
+def in_rollout(question, fraction=None):
+    """질문 해시로 롤아웃 대상 여부 결정 (같은 질문은 항상 같은 결과)"""
+    fraction = INTENT_CLASSIFIER_ROLLOUT if fraction is None else fraction
+    digest = hashlib.sha256(question.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 < fraction
+
+
+# 저장된 분류기 파일을 읽지 못하는 경우 (없음, 반쯤 쓴 파일, 다른 임베딩 모델 등)
+_LOAD_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile)
+
+
+def _try_load(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return IntentClassifier.load(path)
+    except _LOAD_ERRORS as e:
+        print(f"의도 분류기 로드 실패 → 다시 학습: {type(e).__name__}: {e}")
+        return None
+
+
+def load_intent_classifier():
+    """
+    저장된 분류기 로드, 없거나 읽지 못하면 few-shot 예시 + 로그로 학습해서 저장
+    - 학습/저장은 index_lock 안에서 (여러 워커가 동시에 워밍업해도 한 워커만 학습)
+    - 학습도 실패하면 None (분류는 LLM으로)
+    """
+    if INTENT_CLASSIFIER_MODE == "off":
+        return None
+    classifier = _try_load(HEAD_FILE_PATH)
+    if classifier is not None:
+        print(f"의도 분류기 로드: {HEAD_FILE_PATH}")
+        return classifier
+
+    try:
+        with index_lock(HEAD_FILE_PATH):
+            # 락을 기다리는 동안 다른 워커가 이미 저장했으면 그대로 사용
+            classifier = _try_load(HEAD_FILE_PATH)
+            if classifier is not None:
+                print(f"의도 분류기 로드 (다른 프로세스가 학습): {HEAD_FILE_PATH}")
+                return classifier
+
+            pairs = training_data()
+            print(f"의도 분류기 학습: {len(pairs)}개 예시")
+            classifier = train_classifier(pairs)
+            classifier._write(HEAD_FILE_PATH, n_examples=len(pairs))
+            return classifier
+    except Exception as e:
+        print(f"의도 분류기 준비 실패 → LLM 분류 사용: {type(e).__name__}: {e}")
+        return None
+
+
+# 처음 분류할 때 또는 startup 워밍업에서 로드 (off 모드면 None)
+intent_classifier = lazy("intent_classifier", load_intent_classifier)
+
+
+def classify_text(question, chat_history=None):
+    """
+    로컬 분류기 입력 문장: 직전 사용자 질문 + 이번 질문 (semantic_cache.cache_text와 같은 방식)
+    - chat_history 마지막 항목은 이번 질문이므로 제외
+    """
+    history = chat_history or []
+    if history and history[-1].get("content") == question:
+        history = history[:-1]
+
+    prior = [m["content"] for m in history if m.get("role") == "user"]
+    prior = (
+        prior[-INTENT_CLASSIFIER_HISTORY_TURNS:]
+        if INTENT_CLASSIFIER_HISTORY_TURNS
+        else []
+    )
+    return "\n".join(prior + [question])
+
+
+def local_classify(question, chat_history=None):
+    """
+    (사용할 라벨 또는 None, 로컬 예측 (라벨, 확률) 또는 None)
+    - 직전 사용자 질문까지 포함한 classify_text로 예측 (LLM 분류도 히스토리를 봄)
+    - on 모드이고 롤아웃 대상이며 확률이 임계값 이상일 때만 라벨을 반환
+    - shadow 모드는 예측만 반환 (LLM 결과와 함께 로그에 기록)
+    """
+    classifier = intent_classifier.get()
+    if classifier is None:
+        return None, None
+    prediction = classifier.predict(classify_text(question, chat_history))
+    if (
+        INTENT_CLASSIFIER_MODE == "on"
+        and prediction[1] >= INTENT_CLASSIFIER_THRESHOLD
+        and in_rollout(question)
+    ):
+        return prediction[0], prediction
+    return None, prediction
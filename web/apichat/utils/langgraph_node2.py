@@ -1,6 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List, Dict, Any
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
 
 from .rag2 import (
     basic_chain_setting,
@@ -12,22 +13,31 @@ from .rag2 import (
     alternative_queries_chain_setting,
 )
 
-from .retriever_hybrid import hybrid_retriever_setting, hybrid_retriever_setting_qa
+from .retrieval_executor import search_legs, dump_legs, load_legs
+from .retriever_hybrid import HYBRID_WEIGHTS
+from .fusion import CandidatePool
+from .tag_router import build_tag_router, TAG_ROUTER_ENABLED
+from .startup import lazy
+from .metrics import register_stats
+from .intent_classifier import (
+    classify_text,
+    local_classify,
+    log_classification,
+    intent_classifier,
+)
+from .answer_evaluator import evaluate_answer
+from .image_cache import image_cache
+from .http_client import chat_openai, get_openai_client
+from .context_packer import pack_context
+from .reranker import rank_search_results
 
-import openai
 from dotenv import load_dotenv
 import os
 
-import base64
-import mimetypes
-from urllib.parse import urlparse
-from django.conf import settings
-
-
 load_dotenv()
 
 # OpenAI 클라이언트 초기화
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_openai_client()
 
 
 basic_chain = basic_chain_setting()
@@ -53,10 +63,13 @@ class ChatState(TypedDict, total=False):
     tool_calls: List[Dict[str, Any]]  # 도구 호출 기록
     qa_tool_calls: List[Dict[str, Any]]
     answer_quality: str
+    answer_quality_source: str  # 평가 방식 (rule / llm / deferred)
     retry: bool
     hyde_qa_results: List[str]
     hyde_text_results: List[str]
     search_results_final: List[str]
+    packed_context: Dict[str, str]  # 토큰 예산으로 채운 basic_chain 검색 결과 섹션
+    prefetch_results: Dict[str, Any]  # 병렬 그래프: 원문 질문 검색 결과 (dump_legs)
 
 
 # [QA] Google API 선택 옵션 정의
@@ -82,6 +95,18 @@ def classify(state: ChatState):
     chat_history = state.get("messages", [])
     chat_history = chat_history[-4:]
 
+    # 이미지가 없으면 로컬 의도 분류기 먼저 (확신이 낮으면 아래 LLM 분류)
+    local = None
+    if intent_classifier.get() is not None and not image_text:
+        label, local = local_classify(question, chat_history)
+        if label is not None:
+            print(f"[classify] 로컬 분류: {label} ({local[1]:.2f})")
+            log_classification(
+                classify_text(question, chat_history), label, "local", local
+            )
+            state["classify"] = label
+            return state
+
     # 이미지 분석 결과가 있으면 질문에 포함
     if state.get("image_analysis"):
         question = (
@@ -94,6 +119,11 @@ def classify(state: ChatState):
         {"question": question, "context": chat_history}
     ).strip()
 
+    if intent_classifier.get() is not None:
+        log_classification(
+            classify_text(state["question"], chat_history), result, "llm", local
+        )
+
     state["classify"] = result
 
     return state
@@ -104,28 +134,21 @@ def route_from_classify(state):
     # classification_chain이 실제로 뭘 반환하는지에 따라 매핑
     return route
 
-def analyze_image(state: ChatState) -> ChatState:
+
+def analyze_image(state: ChatState, config: RunnableConfig) -> ChatState:
     """ChatState의 이미지를 분석하는 함수"""
     print(f"analyze_image 호출됨 - 이미지 존재: {bool(state.get('image'))}")
     if not state.get("image"):
         return state
 
     try:
-        img = state["image"]
-
-        path = urlparse(img).path  # "/media/....png"
-        if path.startswith(settings.MEDIA_URL):
-            rel = path[len(settings.MEDIA_URL):].lstrip("/")  # "chatimage/xxx.png"
-            local_path = os.path.join(settings.MEDIA_ROOT, rel)
-
-            if os.path.exists(local_path):
-                mime, _ = mimetypes.guess_type(local_path)
-                mime = mime or "image/png"
-                with open(local_path, "rb") as f:
-                    b64 = base64.b64encode(f.read()).decode("utf-8")
-                img = f"data:{mime};base64,{b64}"
-            else:
-                print(f"이미지 파일이 로컬에 없음: {local_path}")
+        # 같은 이미지(내용 해시)는 이전 분석 결과 재사용, 처음 보는 이미지는 축소한 data URL
+        session_id = config.get("configurable", {}).get("thread_id")
+        cached, img, cache_key = image_cache.get(state["image"], session_id)
+        if cached is not None:
+            print("[analyze_image] 캐시된 이미지 분석 사용")
+            state["image_analysis"] = cached
+            return state
 
         response = client.chat.completions.create(
             model="gpt-4o",
@@ -133,8 +156,14 @@ def analyze_image(state: ChatState) -> ChatState:
                 {
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": "이 이미지에 대해 자세히 설명해주세요."},
-                        {"type": "image_url", "image_url": {"url": img}},  # ✅ state["image"] 말고 img
+                        {
+                            "type": "text",
+                            "text": "이 이미지에 대해 자세히 설명해주세요.",
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": img},
+                        },  # ✅ state["image"] 말고 img
                     ],
                 }
             ],
@@ -142,6 +171,7 @@ def analyze_image(state: ChatState) -> ChatState:
         )
 
         state["image_analysis"] = response.choices[0].message.content
+        image_cache.store(cache_key, state["image_analysis"])
         return state
 
     except Exception as e:
@@ -155,10 +185,10 @@ def analyze_image(state: ChatState) -> ChatState:
 #     print(f"analyze_image 호출됨 - 이미지 존재: {bool(state.get('image'))}")
 #     if not state.get("image"):
 #         return state
-    
+
 #     try:
 #         img = state["image"]
-        
+
 #         path = urlparse(img).path  # "/media/....png" 로 정리됨
 #     if path.startswith(settings.MEDIA_URL):
 #         rel = path[len(settings.MEDIA_URL):].lstrip("/")  # "chatimage/xxx.png"
@@ -171,7 +201,7 @@ def analyze_image(state: ChatState) -> ChatState:
 #             img = f"data:{mime};base64,{b64}"
 #         else:
 #             print(f"이미지 파일이 로컬에 없음: {local_path}")
-            
+
 #         response = client.chat.completions.create(
 #             model="gpt-4o",
 #             messages=[
@@ -197,21 +227,19 @@ def analyze_image(state: ChatState) -> ChatState:
 #         answer = response.choices[0].message.content
 #         state["image_analysis"] = answer
 #         return state
-    
+
 #     except Exception as e:
 #         print(f"이미지 분석 에러: {str(e)}")
 #         state["image_analysis"] = f"이미지 분석 중 오류가 발생했습니다: {str(e)}"
 #         return state
-    # else:
-    #     return state
+# else:
+#     return state
 
 
 # (1) 사용자 질문 + 히스토리 통합 → 통합된 질문과 쿼리 추출
 def extract_queries(state: ChatState) -> ChatState:
     user_text = state["question"]
-    image_text = state.get(
-        "image_analysis"
-    )
+    image_text = state.get("image_analysis")
 
     # 히스토리에서 최근 몇 개의 메시지를 가져와서 통합 질문을 생성
     messages = state.get("messages", [])
@@ -254,33 +282,63 @@ def vector_search_tool(
     """
     태그 기반 원문 하이브리드 검색 (Chroma + BM25, 다중 태그 지원)
     """
-    retriever = hybrid_retriever_setting(api_tags, text_k)
-    retriever_qa = hybrid_retriever_setting_qa(api_tags, qa_k)
+    # 원문/QA 각각의 Chroma, BM25 검색을 동시에 실행 (융합은 요청 단위로 한 번에)
+    legs = search_legs(query, api_tags, text_k, qa_k)
 
-    results_text = retriever.get_relevant_documents(query)
+    print(f"[vector_search_tool] hybrid 검색 완료: '{query}', tags={api_tags}")
 
-    results_qa = retriever_qa.get_relevant_documents(query)
+    # {"text": (dense, bm25), "qa": (dense, bm25)} leg별 결과 (청크 id, 점수 포함)
+    return legs
 
-    print(f"[vector_search_tool] hybrid 검색 완료: '{query}', tags={api_tags}")
 
-    # 각 결과에서 page_content만 추출하여 반환
-    return {
-        "text": [result.page_content for result in results_text],
-        "qa": [result.page_content for result in results_qa],
-    }
+# 쿼리별 vector_search_tool 동시 실행용 스레드 풀
+TOOL_SEARCH_WORKERS = int(os.getenv("TOOL_SEARCH_WORKERS", "8"))
+_search_executor = ThreadPoolExecutor(
+    max_workers=TOOL_SEARCH_WORKERS, thread_name_prefix="vector-search"
+)
 
 
-llm = ChatOpenAI(model="gpt-4.1", temperature=0)
+def run_vector_searches(args_list, max_workers=None):
+    """
+    vector_search_tool 호출 인자 리스트를 동시에 실행하고, 입력 순서대로 결과 반환
+    - max_workers=1 이면 순차 실행 (벤치마크 비교용)
+    """
+    if max_workers == 1 or len(args_list) <= 1:
+        return [vector_search_tool.invoke(args) for args in args_list]
 
+    if max_workers is None:
+        return list(_search_executor.map(vector_search_tool.invoke, args_list))
 
-def tool_based_search_node(state: ChatState) -> ChatState:
-    """LLM이 툴을 사용해서 벡터 DB 검색을 수행하는 노드"""
-    queries = state.get("queries", [])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(vector_search_tool.invoke, args_list))
+
+
+llm = chat_openai(model="gpt-4.1", temperature=0)
+
+
+def _load_tag_router():
+    if not TAG_ROUTER_ENABLED:
+        return None
+    try:
+        router = build_tag_router(GOOGLE_API_OPTIONS)
+    except Exception as e:
+        # 중심 벡터를 만들 수 없으면 태그 선택은 모두 LLM(bind_tools)으로
+        print(f"[tag_router] 로드 실패 → LLM 태그 선택 사용: {type(e).__name__}: {e}")
+        return None
+    register_stats("tag_router", lambda: dict(router.counters))
+    return router
+
+
+# 쿼리별 api_tags를 임베딩으로 먼저 고르고, 애매한 쿼리만 LLM에 맡김
+# (처음 검색할 때 또는 startup 워밍업에서 로드, 꺼져 있으면 None)
+tag_router = lazy("tag_router", _load_tag_router)
+
+
+def llm_tool_calls(queries):
+    """LLM(bind_tools)이 쿼리마다 api_tags를 골라 만든 vector_search_tool 호출 목록"""
     llm_with_tools = llm.bind_tools([vector_search_tool])
     options_str = "\n".join([f"- {k}: {v}" for k, v in GOOGLE_API_OPTIONS.items()])
 
-    print(f"[tool_based_search_node] 실행 - queries={queries}")
-
     # LLM에게 명시적으로 "각 질문마다 툴 호출"을 요구
     search_instruction = f"""
     다음의 Google API 관련 **검색 쿼리**들에 대해, 각 쿼리마다 반드시 한 번씩
@@ -305,38 +363,101 @@ def tool_based_search_node(state: ChatState) -> ChatState:
 
     response = llm_with_tools.invoke(search_instruction)
 
-    # 툴 호출 결과 추출
-    search_results = []
-    qa_search_results = []
-    tool_calls = []
-
     if hasattr(response, "tool_calls") and response.tool_calls:
-        for tool_call in response.tool_calls:
-            if tool_call["name"] == "vector_search_tool":
-                # 툴 실행
-                args = tool_call["args"]
-                if state.get("retry"):
-                    args["text_k"] = 15
-                    args["qa_k"] = 30
-                result = vector_search_tool.invoke(args)
-                qa_results = result["qa"]
-                text_results = result["text"]
-                search_results.extend(text_results)
-                qa_search_results.extend(qa_results)
-                tool_calls.append(
-                    {
-                        "tool": "vector_search_tool",
-                        "args": tool_call["args"],
-                        "result": result,
-                    }
-                )
+        return [c for c in response.tool_calls if c["name"] == "vector_search_tool"]
+    return []
+
 
+def prefetch_search(state: ChatState) -> ChatState:
+    """
+    병렬 그래프용: 분류/쿼리 분리를 기다리지 않고 원문 질문 그대로 검색
+    - 태그는 태그 라우터로만 고름 (LLM 호출 없음, 애매하면 태그 필터 없이 검색)
+    - 결과는 tool_based_search_node에서 쿼리 검색 결과와 같은 후보 집합에 합침
+    """
+    question = state["question"]
+    router = tag_router.get()
+    api_tags = (router.route(question) if router is not None else None) or []
+
+    legs = search_legs(question, api_tags)
+    print(f"[prefetch_search] 원문 질문 검색 완료: '{question}', tags={api_tags}")
+
+    state["prefetch_results"] = dump_legs(legs)
+    return state
+
+
+def tool_based_search_node(state: ChatState) -> ChatState:
+    """쿼리별 api_tags를 정해서 벡터 DB 검색을 수행하는 노드"""
+    queries = state.get("queries", [])
+
+    print(f"[tool_based_search_node] 실행 - queries={queries}")
+
+    # 태그 라우터로 정한 쿼리는 바로 검색, 애매한 쿼리만 LLM 툴 호출
+    router = tag_router.get()
+    if router is not None:
+        routed, pending = router.route_queries(queries)
+    else:
+        routed, pending = [], queries
+
+    calls = [
+        {"name": "vector_search_tool", "args": {"query": q, "api_tags": tags}}
+        for q, tags in routed
+    ]
+    if pending:
+        calls.extend(llm_tool_calls(pending))
+    print(
+        f"[tool_based_search_node] 태그 선택 - 라우터 {len(routed)}개, LLM {len(pending)}개"
+    )
+
+    # 모든 쿼리 x leg 결과를 청크 id 기준 후보 집합 하나로 모음 (그룹 = 쿼리 번호)
+    text_pool = CandidatePool()
+    qa_pool = CandidatePool()
+    tool_calls = []
+
+    if calls:
+        for tool_call in calls:
+            if state.get("retry"):
+                tool_call["args"]["text_k"] = 15
+                tool_call["args"]["qa_k"] = 30
+
+        # 쿼리별 검색을 동시에 실행 (결과는 호출 순서대로 합침)
+        results = run_vector_searches([c["args"] for c in calls])
+
+        for group, (tool_call, legs) in enumerate(zip(calls, results)):
+            text_pool.add_legs(legs["text"], HYBRID_WEIGHTS, group)
+            qa_pool.add_legs(legs["qa"], HYBRID_WEIGHTS, group)
+            # 기록용 쿼리별 결과 (그 쿼리의 leg만 융합한 순서)
+            result = {
+                "text": [d.page_content for d in text_pool.ranked(group=group)],
+                "qa": [d.page_content for d in qa_pool.ranked(group=group)],
+            }
+            tool_calls.append(
+                {
+                    "tool": "vector_search_tool",
+                    "args": tool_call["args"],
+                    "result": result,
+                }
+            )
+
+    queries = [c["args"]["query"] for c in calls]
+
+    # 병렬 그래프의 원문 질문 검색 결과는 마지막 그룹으로 추가 (첫 검색에서 한 번만 사용)
+    prefetch = state.get("prefetch_results")
+    if prefetch and not state.get("retry"):
+        legs = load_legs(prefetch)
+        text_pool.add_legs(legs["text"], HYBRID_WEIGHTS, len(queries))
+        qa_pool.add_legs(legs["qa"], HYBRID_WEIGHTS, len(queries))
+        queries.append(state["question"])
+    state["prefetch_results"] = None
+
+    # 여러 쿼리에서 상위로 나온 청크가 앞에 오도록 한 번에 융합 (청크 id로 중복 제거)
+    # - RERANKER_ENABLED면 cross-encoder 점수 상위 N개, 아니면 융합(FUSION_METHOD) 순서
+    text_results, qa_results = rank_search_results(queries, text_pool, qa_pool)
     if not state.get("retry"):
-        state["search_results"] = list(dict.fromkeys(search_results))
-        state["qa_search_results"] = list(dict.fromkeys(qa_search_results))
+        state["search_results"] = text_results
+        state["qa_search_results"] = qa_results
     else:
-        state["hyde_text_results"] = list(dict.fromkeys(search_results))
-        state["hyde_qa_results"] = list(dict.fromkeys(qa_search_results))
+        state["hyde_text_results"] = text_results
+        state["hyde_qa_results"] = qa_results
 
     state["tool_calls"] = tool_calls
 
@@ -366,18 +487,27 @@ def basic_langgraph_node(state: ChatState) -> Dict[str, Any]:
             + f'사용자가 이번에 혹은 이전에 첨부한 이미지에 대한 설명: {state.get("image_analysis")}'
         )
 
+    # 검색 결과를 중복 제거 후 섹션별 토큰 예산 안에서 순위 순으로 채움
+    packed = pack_context(
+        {
+            "context_text": search_results_text,
+            "context_qa": search_results_qa,
+            "context_text2": search_results_text2,
+            "context_qa2": search_results_qa2,
+        }
+    )
+
     # 검색된 결과를 바탕으로 답변 생성
     answer = basic_chain.invoke(
         {
             "question": question,
-            "context_text": "\n".join([str(res) for res in search_results_text]),
-            "context_qa": "\n".join([str(res) for res in search_results_qa]),
-            "context_text2": "\n".join([str(res) for res in search_results_text2]),
-            "context_qa2": "\n".join([str(res) for res in search_results_qa2]),
+            **packed,
             "history": history,
         }
     ).strip()
 
+    state["packed_context"] = packed
+
     state["search_results_final"] = (
         search_results_text
         + search_results_qa
@@ -457,24 +587,31 @@ def evaluate_answer_node(state: ChatState) -> str:
     history = state.get("messages", [])
     question = state["question"]
 
-    context = "\n".join(state.get("search_results", []))  # 원본 문서
-    context_qa = "\n".join(state.get("qa_search_results", []))  # QA 문서
-
-    result = quality_chain.invoke(
+    # 답변 생성에 실제로 들어간 검색 결과로 평가 (재검색이면 HyDE 결과 포함)
+    packed = state.get("packed_context", {})
+    context = "\n".join(
+        filter(None, [packed.get("context_text"), packed.get("context_text2")])
+    )  # 원본 문서
+    context_qa = "\n".join(
+        filter(None, [packed.get("context_qa"), packed.get("context_qa2")])
+    )  # QA 문서
+
+    # 규칙으로 판단 가능한 답변은 LLM 평가 없이 결정
+    result, source = evaluate_answer(
         {
             "history": history[-4:],
             "question": question,
             "context": context,
             "context_qa": context_qa,
             "answer": answer,
-        }
-    ).strip()
+        },
+        lambda inputs: quality_chain.invoke(inputs).strip(),
+    )
 
     state["answer_quality"] = result
+    state["answer_quality_source"] = source
 
-    if state.get("classify") in ["basic", "none"]:
-        state["answer_quality"] = "final"
-    elif result == "good":
+    if result == "good":
         state["answer_quality"] = "good"
     elif state.get("retry", False):
         state["answer_quality"] = "final"
@@ -1,12 +1,71 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from .rag2 import basic_chain_setting
 from .retriever import retriever_setting
-from langgraph.checkpoint.memory import MemorySaver
+from .checkpointer import build_checkpointer
 from .langgraph_node2 import *
+import inspect
+import os
+
+# 1이면 이미지 분석/분류/쿼리 분리/원문 질문 검색을 동시에 실행하는 병렬 그래프 사용
+LANGGRAPH_PARALLEL = os.getenv("LANGGRAPH_PARALLEL", "0") == "1"
+
+
+def _partial(node, keys):
+    """
+    전체 state를 반환하는 노드를 지정한 키만 반환하도록 감쌈
+    - 같은 step에서 병렬로 실행되는 노드들이 같은 키를 동시에 쓰지 않게 함
+    - config를 받는 노드(analyze_image 등)에는 config도 전달
+    """
+    takes_config = "config" in inspect.signature(node).parameters
+
+    def wrapper(state, config: RunnableConfig = None):
+        result = node(dict(state), config) if takes_config else node(dict(state))
+        return {key: result[key] for key in keys if key in result}
+
+    wrapper.__name__ = node.__name__
+    return wrapper
+
+
+def extract_and_split_queries(state):
+    # 병렬 그래프용: 질문 통합(LLM 호출 없음) + 쿼리 분리를 한 노드에서 실행
+    # (따로 두면 classify와 같은 step에 묶여 쿼리 분리가 한 step 늦게 시작됨)
+    return split_queries(extract_queries(state))
+
+
+_search_partial = _partial(
+    tool_based_search_node,
+    ["search_results", "qa_search_results", "tool_calls", "prefetch_results"],
+)
+
+# 병렬 그래프 첫 step에서 동시에 실행되고, search에서 합류하는 노드
+FIRST_STEP_NODES = ["analyze_image", "classify", "split_queries", "prefetch"]
+
+
+def join_search(state):
+    """
+    병렬 그래프의 합류 노드 (첫 step의 노드가 모두 끝난 뒤 실행)
+    - api면 분리된 쿼리로 검색하고, prefetch(원문 질문 검색) 결과와 한 번에 융합
+    - api가 아니면(basic/none) 검색하지 않고 prefetch 결과를 버림
+    """
+    route = (state.get("classify") or "").strip()
+    if route != "api":
+        print(f"[join_search] 분류 결과 {route} → 추측 검색 결과 버림")
+        return {"prefetch_results": None}
+    return _search_partial(state)
+
+
+def route_after_search(state):
+    # api면 답변 생성, 아니면 simple/impossible이 이미 답변하므로 종료
+    return "basic" if (state.get("classify") or "").strip() == "api" else "discard"
 
 
 # 그래프 설정
-def graph_setting():
+def graph_setting(parallel=None):
+    if parallel is None:
+        parallel = LANGGRAPH_PARALLEL
+    if parallel:
+        return parallel_graph_setting()
+
     # LangGraph 정의
     graph = StateGraph(ChatState)
 
@@ -59,8 +118,87 @@ def graph_setting():
     graph.add_edge("simple", END)  # 일상 질문 시 답변 후 종료
     graph.add_edge("impossible", END)
 
-    # 그래프 컴파일
-    memory = MemorySaver()
+    # 그래프 컴파일 (체크포인트 저장소는 CHECKPOINT_BACKEND로 선택)
+    memory = build_checkpointer()
+    compiled_graph = graph.compile(checkpointer=memory)
+
+    return compiled_graph
+
+
+# 병렬 그래프 설정
+def parallel_graph_setting():
+    """
+    api 질문의 LLM 왕복을 줄이기 위해 독립적인 단계를 동시에 실행하는 그래프
+    - 첫 step: analyze_image ∥ classify ∥ (질문 통합 + split_queries) ∥ prefetch
+      (prefetch = 원문 질문 그대로 하이브리드 검색, 분류 결과를 기다리지 않는 추측 검색)
+    - 첫 step이 모두 끝나면 search에서 합류: api면 분리된 쿼리 검색 + prefetch 결과를
+      융합한 뒤 basic, basic/none이면 simple/impossible이 답변하고 prefetch 결과는 버림
+    - 이번 턴 이미지 분석과 동시에 실행되므로 classify/split_queries는 이번 이미지 설명을
+      보지 못함 (이전 턴 분석 결과만 사용, basic에는 이번 분석 결과가 들어감)
+    - basic/none 질문에서는 split_queries(LLM), prefetch 검색이 헛수고가 되고,
+      simple/impossible도 첫 step의 가장 느린 노드가 끝난 뒤 시작됨
+    - 재검색(retry) 흐름은 기존 그래프와 동일 (generate_queries → tool → basic)
+    """
+    graph = StateGraph(ChatState)
+
+    # 병렬로 실행되는 노드는 자신이 바꾸는 키만 반환
+    graph.add_node("analyze_image", _partial(analyze_image, ["image_analysis"]))
+    graph.add_node("classify", _partial(classify, ["classify"]))
+    graph.add_node(
+        "split_queries",
+        _partial(extract_and_split_queries, ["rewritten", "queries"]),
+    )
+    graph.add_node("prefetch", _partial(prefetch_search, ["prefetch_results"]))
+    graph.add_node("search", join_search)
+    graph.add_node("simple", _partial(simple, ["answer"]))
+    graph.add_node("impossible", _partial(impossible, ["answer"]))
+    graph.add_node("basic", basic_langgraph_node)
+    graph.add_node("tool", tool_based_search_node)
+    graph.add_node("evaluate", evaluate_answer_node)
+    graph.add_node("generate_queries", generate_alternative_queries)
+
+    # 시작: 네 노드를 동시에 실행 (이미지가 없으면 analyze_image는 바로 끝남)
+    for node in FIRST_STEP_NODES:
+        graph.add_edge(START, node)
+
+    # 분류: api면 search → basic으로 이어지고, 아니면 바로 답변
+    graph.add_conditional_edges(
+        "classify",
+        route_from_classify,
+        {
+            "api": END,
+            "basic": "simple",
+            "none": "impossible",
+        },
+    )
+
+    # 첫 step의 노드가 모두 끝나야 search 실행
+    graph.add_edge(FIRST_STEP_NODES, "search")
+
+    graph.add_conditional_edges(
+        "search",
+        route_after_search,
+        {"basic": "basic", "discard": END},
+    )
+    graph.add_edge("basic", "evaluate")
+
+    graph.add_conditional_edges(
+        "evaluate",
+        lambda state: state["answer_quality"],  # good / bad
+        {
+            "good": END,
+            "bad": "generate_queries",
+            "final": END,
+        },
+    )
+
+    graph.add_edge("generate_queries", "tool")
+    graph.add_edge("tool", "basic")
+
+    graph.add_edge("simple", END)
+    graph.add_edge("impossible", END)
+
+    memory = build_checkpointer()
     compiled_graph = graph.compile(checkpointer=memory)
 
     return compiled_graph
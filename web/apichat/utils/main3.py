@@ -1,28 +1,99 @@
-from .langgraph_setting2 import graph_setting
+from asgiref.sync import sync_to_async
 
-graph = graph_setting()
+from .semantic_cache import answer_cache, is_cacheable, SEMANTIC_CACHE_ENABLED
+from .embedding_cache import query_cache
+from .image_cache import image_cache
+from .answer_evaluator import evaluator_stats
+from .metrics import start_request, finish_request, register_stats
+from .startup import lazy, startup_stats
 
 
-def run_langraph(user_input, config_id, image, chat_history=None):
+def _load_graph():
+    # 노드 모듈 import 시 체인/LLM 클라이언트를 만들므로 그래프 로드 시점까지 미룸
+    from .langgraph_setting2 import graph_setting
+
+    compiled = graph_setting()
+    if hasattr(compiled.checkpointer, "stats"):
+        register_stats("checkpointer", compiled.checkpointer.stats)
+    return compiled
+
+
+# 처음 요청할 때 또는 startup 워밍업에서 컴파일
+graph = lazy("graph", _load_graph)
+
+# /metrics에 함께 노출할 캐시/평가기 카운터, 시작 시간
+register_stats("semantic_cache", answer_cache.stats)
+register_stats("embedding_cache", query_cache.stats)
+register_stats("image_cache", image_cache.stats)
+register_stats("answer_evaluator", lambda: dict(evaluator_stats))
+register_stats("startup", startup_stats)
+
+# 답변 토큰을 스트리밍할 노드 (그 외 노드의 LLM 토큰은 내보내지 않음)
+ANSWER_NODES = ("basic", "simple", "impossible")
+
+
+def _graph_input(user_input, image, chat_history):
+    # chat_history가 None이면 빈 리스트로 초기화
+    if chat_history is None:
+        chat_history = []
+
+    return {
+        "messages": chat_history,
+        "question": user_input,
+        "image": image,
+        "retry": False,
+    }
+
+
+def _cache_lookup(user_input, image, chat_history):
+    """시맨틱 캐시 조회 → (캐시된 답변 또는 None, 저장용 키 또는 None)"""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None, None
     try:
-        config = {"configurable": {"thread_id": config_id}}
+        return answer_cache.lookup(user_input, chat_history, image)
+    except Exception as e:
+        # 캐시 오류로 답변이 실패하지 않도록 그래프 실행으로 넘어감
+        print(f"semantic_cache 조회 에러: {str(e)}")
+        return None, None
+
+
+def _cache_store(cache_key, route, answer_quality, answer, quality_source=None):
+    # 평가를 백그라운드로 미룬 답변(deferred)은 검증 전이라 저장하지 않음
+    if quality_source == "deferred":
+        return
+    if cache_key is not None and answer and is_cacheable(route, answer_quality):
+        answer_cache.store(cache_key, answer)
 
-        # chat_history가 None이면 빈 리스트로 초기화
-        if chat_history is None:
-            chat_history = []
+
+def run_langraph(user_input, config_id, image, chat_history=None):
+    # 노드별 시간/토큰 기록 (콜백으로 그래프의 모든 노드, LLM 호출을 측정)
+    trace, callbacks = start_request(config_id)
+    try:
+        config = {"configurable": {"thread_id": config_id}, "callbacks": callbacks}
 
         print(f"run_langraph 호출 - 입력: {user_input}, 이미지: {bool(image)}")
 
-        result = graph.invoke(
-            {
-                "messages": chat_history,
-                "question": user_input,
-                "image": image,
-                "retry": False,
-            },
+        cached, cache_key = _cache_lookup(user_input, image, chat_history)
+        if cached is not None:
+            finish_request(trace, cache="semantic")
+            return cached
+
+        result = graph.get().invoke(
+            _graph_input(user_input, image, chat_history),
             config=config,
         )
 
+        _cache_store(
+            cache_key,
+            result.get("classify"),
+            result.get("answer_quality"),
+            result.get("answer"),
+            result.get("answer_quality_source"),
+        )
+        finish_request(
+            trace, route=result.get("classify"), quality=result.get("answer_quality")
+        )
+
         # print(f"그래프 실행 결과: {result}")
         return result["answer"]
     except Exception as e:
@@ -30,4 +101,108 @@ def run_langraph(user_input, config_id, image, chat_history=None):
         import traceback
 
         traceback.print_exc()
+        finish_request(trace, error=str(e))
         return f"처리 중 오류가 발생했습니다: {str(e)}"
+
+
+def _progress_event(node, update):
+    """노드 실행 결과(update)를 클라이언트에 보낼 진행 이벤트로 변환"""
+    event = {"type": "progress", "node": node}
+    if not isinstance(update, dict):
+        return event
+
+    if node == "classify":
+        event["route"] = (update.get("classify") or "").strip()
+    elif node == "split_queries":
+        event["queries"] = update.get("queries", [])
+    elif node in ("tool", "search"):
+        if update.get("retry"):
+            event["text_chunks"] = len(update.get("hyde_text_results", []))
+            event["qa_chunks"] = len(update.get("hyde_qa_results", []))
+        else:
+            event["text_chunks"] = len(update.get("search_results", []))
+            event["qa_chunks"] = len(update.get("qa_search_results", []))
+    elif node == "evaluate":
+        event["quality"] = update.get("answer_quality")
+        event["quality_source"] = update.get("answer_quality_source")
+
+    return event
+
+
+async def astream_langraph(user_input, config_id, image, chat_history=None):
+    """
+    run_langraph의 스트리밍 버전
+    - {"type": "progress", ...}: 노드 완료 이벤트 (분류 결과, 검색 청크 수 등)
+    - {"type": "token", "text": ...}: 답변 노드(basic/simple/impossible)의 생성 토큰
+    - {"type": "reset"}: 재검색(retry)으로 답변을 다시 생성하기 시작함
+    - {"type": "answer", "text": ...}: 최종 답변 (항상 마지막에 1번)
+    - 시맨틱 캐시 hit이면 progress(node="cache") 후 답변 전체를 token 1번으로 보냄
+    """
+    trace, callbacks = start_request(config_id)
+    config = {"configurable": {"thread_id": config_id}, "callbacks": callbacks}
+    answer = None
+    answer_step = None
+    route = answer_quality = quality_source = error = None
+
+    print(f"astream_langraph 호출 - 입력: {user_input}, 이미지: {bool(image)}")
+
+    cached, cache_key = await sync_to_async(_cache_lookup, thread_sensitive=False)(
+        user_input, image, chat_history
+    )
+    if cached is not None:
+        finish_request(trace, cache="semantic")
+        yield {"type": "progress", "node": "cache"}
+        yield {"type": "token", "text": cached}
+        yield {"type": "answer", "text": cached}
+        return
+
+    try:
+        # 아직 로드 전이면(워밍업 끔) 이벤트 루프를 막지 않도록 스레드에서 로드
+        compiled = await sync_to_async(graph.get, thread_sensitive=False)()
+        async for mode, chunk in compiled.astream(
+            _graph_input(user_input, image, chat_history),
+            config=config,
+            stream_mode=["updates", "messages"],
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") not in ANSWER_NODES:
+                    continue
+                text = message.content
+                if not text or not isinstance(text, str):
+                    continue
+
+                # 같은 답변 노드가 다시 실행되면(retry) 이전 토큰은 버리도록 알림
+                step = metadata.get("langgraph_step")
+                if answer_step is not None and step != answer_step:
+                    yield {"type": "reset"}
+                answer_step = step
+
+                yield {"type": "token", "text": text}
+                continue
+
+            for node, update in chunk.items():
+                if isinstance(update, dict):
+                    if node in ANSWER_NODES:
+                        answer = update.get("answer", answer)
+                    elif node == "classify":
+                        route = update.get("classify")
+                    elif node == "evaluate":
+                        answer_quality = update.get("answer_quality")
+                        quality_source = update.get("answer_quality_source")
+                yield _progress_event(node, update)
+
+        if answer is None:
+            answer = "처리 중 오류가 발생했습니다: 답변이 생성되지 않았습니다."
+        else:
+            _cache_store(cache_key, route, answer_quality, answer, quality_source)
+    except Exception as e:
+        print(f"astream_langraph 에러: {str(e)}")
+        import traceback
+
+        traceback.print_exc()
+        answer = f"처리 중 오류가 발생했습니다: {str(e)}"
+        error = str(e)
+
+    finish_request(trace, route=route, quality=answer_quality, error=error)
+    yield {"type": "answer", "text": answer}
@@ -0,0 +1,346 @@
+# metrics.py
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# 1이면 요청마다 노드별 시간/토큰을 JSON 한 줄로 출력
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG", "0") == "1"
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# 검색 결과 개수를 기록할 노드 (순차 그래프 tool, 병렬 그래프 search)와 state 키
+RETRIEVAL_NODES = ("tool", "search")
+CANDIDATE_KEYS = (
+    "search_results",
+    "qa_search_results",
+    "hyde_text_results",
+    "hyde_qa_results",
+)
+
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램 (Prometheus histogram 형식)"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # 라벨 값 → [버킷별 개수..., 마지막 버킷 초과 개수, 합계, 개수]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = _labels(self.label_names, labels)
+            prefix = f"{base}," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, value, *labels):
+        with self._lock:
+            self._values[labels] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_SECONDS = Histogram(
+    "apichat_request_seconds",
+    "run_langraph/astream_langraph 전체 시간",
+    ("route", "cache"),
+    SECONDS_BUCKETS,
+)
+NODE_SECONDS = Histogram(
+    "apichat_node_seconds", "LangGraph 노드 실행 시간", ("node",), SECONDS_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    "apichat_llm_seconds",
+    "노드 안 LLM 호출 시간",
+    ("node", "model"),
+    SECONDS_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "apichat_llm_tokens_total", "LLM 토큰 수", ("node", "model", "kind")
+)
+CANDIDATES = Histogram(
+    "apichat_retrieval_candidates",
+    "검색 노드가 넘긴 청크 수",
+    ("node", "section"),
+    COUNT_BUCKETS,
+)
+CACHE_EVENTS = Counter("apichat_request_cache_total", "요청 단위 캐시 결과", ("cache",))
+
+_collectors = {}  # 이름 → stats() 함수 (캐시/라우터 카운터)
+_listeners = []  # finish_request마다 요청 기록(dict)을 받을 함수
+
+
+def add_listener(fn):
+    """요청이 끝날 때마다 fn(record) 호출 (bench_replay 등에서 요청별 기록 수집)"""
+    _listeners.append(fn)
+
+
+def remove_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+def register_stats(name, stats_fn):
+    """stats() dict의 숫자 값을 apichat_component_stat{component=name,key=...} 게이지로 노출"""
+    _collectors[name] = stats_fn
+
+
+def render_prometheus():
+    lines = []
+    for metric in (
+        REQUEST_SECONDS,
+        NODE_SECONDS,
+        LLM_SECONDS,
+        LLM_TOKENS,
+        CANDIDATES,
+        CACHE_EVENTS,
+    ):
+        lines.extend(metric.render())
+
+    lines.append("# HELP apichat_component_stat 캐시/라우터/평가기 카운터")
+    lines.append("# TYPE apichat_component_stat gauge")
+    for name, stats_fn in sorted(_collectors.items()):
+        try:
+            stats = stats_fn()
+        except Exception as e:
+            print(f"[metrics] {name} stats 에러: {e}")
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(
+                    f"apichat_component_stat{{{_labels(('component', 'key'), (name, key))}}} {value}"
+                )
+    return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """요청 하나의 노드별 시간, LLM 호출, 검색 결과 개수 기록"""
+
+    def __init__(self, session_id=None):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.nodes = []  # (노드, 초)
+        self.llm_calls = []  # {"node", "model", "seconds", "prompt", "completion"}
+        self.candidates = {}  # "노드.섹션" → 개수
+        self._lock = threading.Lock()
+
+    def add_node(self, node, seconds, outputs):
+        NODE_SECONDS.observe(seconds, node)
+        counts = {}
+        if node in RETRIEVAL_NODES and isinstance(outputs, dict):
+            for key in CANDIDATE_KEYS:
+                if isinstance(outputs.get(key), list):
+                    counts[key] = len(outputs[key])
+                    CANDIDATES.observe(counts[key], node, key)
+        with self._lock:
+            self.nodes.append((node, round(seconds, 4)))
+            for key, count in counts.items():
+                self.candidates[f"{node}.{key}"] = count
+
+    def add_llm_call(self, node, model, seconds, prompt_tokens, completion_tokens):
+        LLM_SECONDS.observe(seconds, node, model)
+        LLM_TOKENS.inc(prompt_tokens, node, model, "prompt")
+        LLM_TOKENS.inc(completion_tokens, node, model, "completion")
+        with self._lock:
+            self.llm_calls.append(
+                {
+                    "node": node,
+                    "model": model,
+                    "seconds": round(seconds, 4),
+                    "prompt": prompt_tokens,
+                    "completion": completion_tokens,
+                }
+            )
+
+
+def _token_usage(response):
+    """LLMResult → (prompt, completion) 토큰 수 (스트리밍이면 usage_metadata 사용)"""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if prompt or completion:
+        return prompt, completion
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    그래프 실행 config에 넣는 콜백
+    - 노드 실행(on_chain_start/end, name == langgraph_node)의 시간과 결과 크기
+    - 노드 안의 모든 LLM 호출 시간과 토큰 수
+    """
+
+    run_inline = True
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, *info):
+        with self._lock:
+            self._starts[run_id] = (time.perf_counter(), *info)
+
+    def _pop(self, run_id):
+        with self._lock:
+            return self._starts.pop(run_id, None)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._start(run_id, "node", node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._pop(run_id)
+        if started:
+            self.trace.add_node(started[2], time.perf_counter() - started[0], outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        started = self._pop(run_id)
+        if started:
+            self.trace.add_node(started[2], time.perf_counter() - started[0], None)
+
+    def _llm_start(self, serialized, run_id, metadata, kwargs):
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model")
+            or params.get("model_name")
+            or metadata.get("ls_model_name")
+            or "unknown"
+        )
+        node = metadata.get("langgraph_node", "-")
+        self._start(run_id, "llm", node, model)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, metadata=None, **kwargs
+    ):
+        self._llm_start(serialized, run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._llm_start(serialized, run_id, metadata, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._pop(run_id)
+        if started:
+            prompt, completion = _token_usage(response)
+            self.trace.add_llm_call(
+                started[2],
+                started[3],
+                time.perf_counter() - started[0],
+                prompt,
+                completion,
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._pop(run_id)
+
+
+def start_request(session_id=None):
+    """(RequestTrace, 그래프 config에 넣을 callbacks 리스트), 비활성화면 (None, [])"""
+    if not METRICS_ENABLED:
+        return None, []
+    trace = RequestTrace(session_id)
+    return trace, [MetricsCallbackHandler(trace)]
+
+
+def finish_request(trace, route=None, cache=None, quality=None, error=None):
+    """요청 전체 시간 기록, METRICS_JSON_LOG면 JSON 한 줄 출력, 리스너에 기록 전달"""
+    if trace is None:
+        return
+    seconds = time.perf_counter() - trace.started
+    route = (route or "").strip() or "-"
+    REQUEST_SECONDS.observe(seconds, route, cache or "miss")
+    CACHE_EVENTS.inc(1, cache or "miss")
+
+    if not (METRICS_JSON_LOG or _listeners):
+        return
+
+    with trace._lock:
+        record = {
+            "request_id": trace.request_id,
+            "session_id": trace.session_id,
+            "route": route,
+            "cache": cache or "miss",
+            "quality": quality,
+            "seconds": round(seconds, 4),
+            "nodes": list(trace.nodes),
+            "llm": list(trace.llm_calls),
+            "prompt_tokens": sum(c["prompt"] for c in trace.llm_calls),
+            "completion_tokens": sum(c["completion"] for c in trace.llm_calls),
+            "candidates": dict(trace.candidates),
+        }
+    if error:
+        record["error"] = error
+
+    if METRICS_JSON_LOG:
+        print(json.dumps({"apichat_request": record}, ensure_ascii=False))
+    for listener in list(_listeners):
+        listener(record)
@@ -0,0 +1,101 @@
+# onnx_encoder.py
+import json
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# export_onnx_encoder 결과 디렉토리 (model.onnx, tokenizer.json, manifest.json)
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(HERE, "onnx_bge_m3"))
+# 쿼리 최대 토큰 수 (질문은 짧으므로 bge-m3의 8192 대신 512에서 자름)
+ONNX_MAX_LENGTH = int(os.getenv("ONNX_MAX_LENGTH", "512"))
+# onnxruntime intra-op 스레드 수 (0이면 onnxruntime 기본값)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+MODEL_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def read_manifest(model_dir=ONNX_MODEL_DIR):
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class OnnxEncoder:
+    """
+    export_onnx_encoder로 만든 ONNX(기본 int8) 모델로 문장 임베딩
+    - 풀링(cls/mean)과 정규화는 manifest에 기록된 SentenceTransformer 설정을 따름
+    - SentenceTransformer.encode의 주요 인자를 받아서 LocalEmbeddings/임베딩 서비스에서 그대로 사용
+    - InferenceSession.run은 스레드 안전 (동시 쿼리에서 세션 하나를 공유)
+    """
+
+    def __init__(
+        self, model_dir=ONNX_MODEL_DIR, max_length=ONNX_MAX_LENGTH, threads=ONNX_THREADS
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.manifest = read_manifest(model_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(
+                f"ONNX 모델 없음: {model_dir} (manage.py export_onnx_encoder로 생성하세요)"
+            )
+        self.model_name = self.manifest["model"]
+        self.pooling = self.manifest["pooling"]
+        self.normalize = self.manifest["normalize"]
+        self.max_length = min(max_length, self.manifest["max_seq_length"])
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(self.max_length)
+        self.tokenizer.enable_padding(
+            pad_id=self.manifest["pad_token_id"], pad_token=self.manifest["pad_token"]
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, MODEL_FILE),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def _run(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        (hidden,) = self.session.run(
+            None, {"input_ids": input_ids, "attention_mask": attention_mask}
+        )
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        # show_progress_bar, convert_to_numpy 등 나머지 인자는 무시 (항상 numpy 반환)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.manifest["dim"]), dtype=np.float32)
+
+        # 길이순으로 묶어서 패딩을 줄이고, 결과는 원래 순서로
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        vectors = np.empty((len(texts), self.manifest["dim"]), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            index = order[start : start + batch_size]
+            vectors[index] = self._run([texts[i] for i in index])
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors[0] if single else vectors
@@ -4,15 +4,15 @@ import json
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 
-# LangChain OpenAI
-from langchain_openai import ChatOpenAI
+# LangChain OpenAI (공유 커넥션 풀)
+from .http_client import chat_openai
 
 
 load_dotenv()
 
 
 def basic_chain_setting():
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = chat_openai(model="gpt-4o", temperature=0)
 
     basic_prompt = PromptTemplate.from_template(
         """
@@ -55,7 +55,7 @@ def basic_chain_setting():
 
 
 def query_setting():
-    llm = ChatOpenAI(
+    llm = chat_openai(
         model="gpt-4o",
         temperature=0,
         model_kwargs={"response_format": {"type": "json_object"}},
@@ -106,8 +106,33 @@ def query_setting():
     return chain
 
 
+# classify 프롬프트의 few-shot 예시 (로컬 의도 분류기 학습 데이터로도 사용)
+CLASSIFY_EXAMPLES = [
+    ("구글 캘린더 API에서 이벤트를 어떻게 추가하나요?", "api"),
+    ("Google Drive API로 파일 권한을 수정하는 방법 알려줘", "api"),
+    ("Gmail API에서 특정 라벨이 붙은 메일만 가져올 수 있어?", "api"),
+    ("구글 맵 API 호출하는 법 알려주고, 참고로 난 지금 배고파", "api"),
+    ("오늘 날씨 어때?", "basic"),
+    ("지금 몇 시야?", "basic"),
+    ("오늘 날씨 어때? 그리고 딥러닝 CNN 구조 설명해줘", "none"),
+    ("구글 캘린더 API 문서 보여줄 수 있어? 아, 그리고 안녕!", "api"),
+    ("양자컴퓨터에서 큐비트 얽힘이 뭔지 설명해줘", "none"),
+    ("딥러닝에서 Transformer 구조가 뭐야?", "none"),
+    ("Docker 컨테이너에서 MySQL 볼륨 마운트 하는 방법 알려줘", "api"),
+    ("OpenAI API랑 Google API 차이가 뭐야?", "api"),
+    ("AWS S3 SDK 사용법 알려줘", "api"),
+    ("Java에서 문자열을 어떻게 뒤집을 수 있나요?", "api"),
+    (
+        "구글 맵 API로 경로 계산하는 방법을 알려줘, 근데 딥러닝을 활용하는 방식으로",
+        "api",
+    ),
+    ("'Python'이라는 언어의 특징을 설명해줘", "none"),
+    ("머신러닝에서 과적합을 방지하는 방법은 뭐야?", "none"),
+]
+
+
 def classify_chain_setting():
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = chat_openai(model="gpt-4o", temperature=0)
 
     classification_prompt = PromptTemplate.from_template(
         """
@@ -132,58 +157,9 @@ def classify_chain_setting():
     {question}
 
     ## 🧪 예시
-    질문: 구글 캘린더 API에서 이벤트를 어떻게 추가하나요?  
-    정답: api
-
-    질문: Google Drive API로 파일 권한을 수정하는 방법 알려줘  
-    정답: api
-
-    질문: Gmail API에서 특정 라벨이 붙은 메일만 가져올 수 있어?  
-    정답: api
-
-    질문: 구글 맵 API 호출하는 법 알려주고, 참고로 난 지금 배고파  
-    정답: api
-
-    질문: 오늘 날씨 어때?  
-    정답: basic
-
-    질문: 지금 몇 시야?  
-    정답: basic
-
-    질문: 오늘 날씨 어때? 그리고 딥러닝 CNN 구조 설명해줘  
-    정답: none
-
-    질문: 구글 캘린더 API 문서 보여줄 수 있어? 아, 그리고 안녕!  
-    정답: api
-
-    질문: 양자컴퓨터에서 큐비트 얽힘이 뭔지 설명해줘  
-    정답: none
-
-    질문: 딥러닝에서 Transformer 구조가 뭐야?  
-    정답: none
-
-    질문: Docker 컨테이너에서 MySQL 볼륨 마운트 하는 방법 알려줘  
-    정답: api
-
-    질문: OpenAI API랑 Google API 차이가 뭐야?  
-    정답: api
-
-    질문: AWS S3 SDK 사용법 알려줘  
-    정답: api
-
-    질문: Java에서 문자열을 어떻게 뒤집을 수 있나요?  
-    정답: api
-
-    질문: 구글 맵 API로 경로 계산하는 방법을 알려줘, 근데 딥러닝을 활용하는 방식으로  
-    정답: api
-
-    질문: 'Python'이라는 언어의 특징을 설명해줘  
-    정답: none
-
-    질문: 머신러닝에서 과적합을 방지하는 방법은 뭐야?  
-    정답: none
-
-    --- 
+"""
+        + "".join(f"    질문: {q}  \n    정답: {label}\n\n" for q, label in CLASSIFY_EXAMPLES)
+        + """    --- 
 
     질문: {question}  
     정답:
@@ -196,7 +172,7 @@ def classify_chain_setting():
 
 
 def simple_chain_setting():
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.4)
+    llm = chat_openai(model="gpt-4o-mini", temperature=0.4)
     simple_prompt = PromptTemplate.from_template(
         """
     너는 사용자의 **일상적인 질문**에만 답변하는 도우미야.  
@@ -223,7 +199,7 @@ def simple_chain_setting():
 
 
 def impossable_chain_setting():
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.4)
+    llm = chat_openai(model="gpt-4o-mini", temperature=0.4)
     imp_prompt = PromptTemplate.from_template(
         """
     너는 사용자의 **사용자의 질문**에 대한 내용을 몰라서 답변할 수 없는 챗봇이야.  
@@ -248,8 +224,17 @@ def impossable_chain_setting():
     return imp_chain
 
 
+# 답변 평가 기준 0번의 회피성 문구 (answer_evaluator의 규칙 평가에서도 사용)
+REFUSAL_PHRASES = [
+    "죄송하지만",
+    "정보는 제공된 문서에 포함되어 있지 않습니다",
+    "답변할 수 없습니다",
+    "관련된 정보를 찾을 수 없습니다",
+]
+
+
 def answer_quality_chain_setting_rag():
-    llm = ChatOpenAI(model="gpt-4.1", temperature=0)
+    llm = chat_openai(model="gpt-4.1", temperature=0)
 
     quality_prompt = PromptTemplate.from_template(
         """
@@ -258,7 +243,9 @@ def answer_quality_chain_setting_rag():
         이 답변이 **검색된 결과**, **사용자의 이전 히스토리**, **이번 질문**에 맞게 적절하게 답변했는지 평가하세요.  
 
         평가 기준:
-        0. 답변에 '죄송하지만', '정보는 제공된 문서에 포함되어 있지 않습니다', '답변할 수 없습니다', '관련된 정보를 찾을 수 없습니다' 와 같이 **부정적, 회피적, 무응답 문구**가 포함되면 무조건 "bad"입니다.  
+        0. 답변에 """
+        + ", ".join(f"'{phrase}'" for phrase in REFUSAL_PHRASES)
+        + """ 와 같이 **부정적, 회피적, 무응답 문구**가 포함되면 무조건 "bad"입니다.  
             - 답변이 사용자의 질문에 대해 아무런 구체적 사실을 제공하지 않고 회피성 멘트만 한다면 무조건 "bad"입니다.  
             - bad 예시 답변: '죄송하지만, GMSMapPoint의 좌표계에서 (0, 0)이 어떤 지점을 의미하는지에 대한 정보는 제공된 문서에 포함되어 있지 않습니다. 다른 질문이 있으시면 말씀해 주세요.'
         1. **검색 결과에 포함되지 않은 정보**를 답변에 포함한 경우, 답변은 "bad"입니다.
@@ -284,7 +271,7 @@ def answer_quality_chain_setting_rag():
 
 
 def alternative_queries_chain_setting():
-    llm = ChatOpenAI(
+    llm = chat_openai(
         model="gpt-4o",
         temperature=0,
         model_kwargs={"response_format": {"type": "json_object"}},
@@ -0,0 +1,122 @@
+# reranker.py
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .startup import lazy
+
+load_dotenv()
+
+# 1이면 검색 결과를 cross-encoder로 다시 정렬해서 상위 N개만 사용
+RERANKER_ENABLED = os.getenv("RERANKER_ENABLED", "0") == "1"
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "BAAI/bge-reranker-v2-m3")
+# (쿼리, 청크) 쌍의 최대 토큰 길이 (넘으면 잘림)
+RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", "512"))
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "16"))
+RERANKER_TOP_N_TEXT = int(os.getenv("RERANKER_TOP_N_TEXT", "5"))
+RERANKER_TOP_N_QA = int(os.getenv("RERANKER_TOP_N_QA", "10"))
+# 비워두면 sentence-transformers 기본값 (GPU가 있으면 GPU)
+RERANKER_DEVICE = os.getenv("RERANKER_DEVICE") or None
+
+
+class CrossEncoderReranker:
+    """
+    로컬 cross-encoder로 (쿼리, 청크) 관련도 점수 계산
+    - 모든 쿼리의 후보를 한 번의 predict 호출로 처리
+    - 길이순으로 정렬해서 배치를 나누므로 배치 안 padding이 적음
+    - 청크가 여러 쿼리에서 나오면 가장 높은 점수를 사용
+    """
+
+    def __init__(
+        self,
+        model_name=RERANKER_MODEL,
+        max_length=RERANKER_MAX_LENGTH,
+        batch_size=RERANKER_BATCH_SIZE,
+        device=RERANKER_DEVICE,
+    ):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, max_length=max_length, device=device)
+
+    def score(self, pairs):
+        """(쿼리, 청크) 쌍 리스트 → 점수 배열 (입력 순서)"""
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0] + pairs[i][1]))
+        scores = self.model.predict(
+            [pairs[i] for i in order],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        result = np.empty(len(pairs), dtype=np.float32)
+        result[order] = np.asarray(scores, dtype=np.float32).reshape(-1)
+        return result
+
+    def rerank_sections(self, sections):
+        """
+        sections: {섹션명: ([쿼리, ...], [쿼리별 청크 리스트, ...], top_n)}
+        반환: {섹션명: 점수 순 상위 top_n 청크 리스트}
+        """
+        pairs, owners = [], []
+        for name, (queries, result_lists, _) in sections.items():
+            for query, chunks in zip(queries, result_lists):
+                for chunk in dict.fromkeys(chunks):
+                    pairs.append((query, chunk))
+                    owners.append(name)
+
+        scores = self.score(pairs)
+
+        best = {name: {} for name in sections}
+        for (_, chunk), name, score in zip(pairs, owners, scores):
+            if score > best[name].get(chunk, -np.inf):
+                best[name][chunk] = float(score)
+
+        return {
+            name: sorted(best[name], key=best[name].get, reverse=True)[:top_n]
+            for name, (_, _, top_n) in sections.items()
+        }
+
+
+def load_reranker():
+    if not RERANKER_ENABLED:
+        return None
+    try:
+        print(f"리랭커 로드: {RERANKER_MODEL}")
+        return CrossEncoderReranker()
+    except Exception as e:
+        print(f"리랭커 로드 실패 → RRF 순서 사용: {e}")
+        return None
+
+
+# 처음 순위를 매길 때 또는 startup 워밍업에서 로드 (꺼져 있거나 실패하면 None)
+reranker = lazy("reranker", load_reranker)
+
+
+def _texts(pool, group=None):
+    return [doc.page_content for doc in pool.ranked(group=group)]
+
+
+def rank_search_results(queries, text_pool, qa_pool):
+    """
+    요청 전체 원문/QA 후보(fusion.CandidatePool, 그룹 = 쿼리 번호)를 하나의 순위 리스트로 합침
+    - 리랭커가 있으면 쿼리별 후보의 cross-encoder 점수 상위 N개 (원문/QA 한 번에 계산)
+    - 없으면 모든 쿼리 x leg 결과를 한 번에 융합한 순서 (전체)
+    """
+    model = reranker.get()
+    if model is None or not queries:
+        return _texts(text_pool), _texts(qa_pool)
+
+    # 쿼리별 후보 (그 쿼리의 leg만 융합한 순서)
+    text_lists = [_texts(text_pool, group) for group in range(len(queries))]
+    qa_lists = [_texts(qa_pool, group) for group in range(len(queries))]
+    ranked = model.rerank_sections(
+        {
+            "text": (queries, text_lists, RERANKER_TOP_N_TEXT),
+            "qa": (queries, qa_lists, RERANKER_TOP_N_QA),
+        }
+    )
+    return ranked["text"], ranked["qa"]
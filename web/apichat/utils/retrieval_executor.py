@@ -0,0 +1,140 @@
+# retrieval_executor.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from .bm25_engine import BM25IndexRetriever
+from .dense_engine import DenseIndexRetriever
+from .fusion import FUSION_METHOD, CandidatePool, LegResult, doc_key
+from .retriever_hybrid import (
+    HYBRID_WEIGHTS,
+    hybrid_retriever_legs,
+    hybrid_retriever_legs_qa,
+)
+
+# 검색 leg(원문 Chroma/BM25, QA Chroma/BM25) 동시 실행용 스레드 풀
+# - tool_based_search_node의 쿼리 풀과 분리해야 중첩 실행 시 교착이 없음
+RETRIEVAL_LEG_WORKERS = int(os.getenv("RETRIEVAL_LEG_WORKERS", "32"))
+_leg_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_LEG_WORKERS, thread_name_prefix="retrieval-leg"
+)
+
+
+def _index_result(index, rows, scores):
+    docs = [index.document(int(row)) for row in rows]
+    return LegResult(docs, [doc_key(doc) for doc in docs], scores)
+
+
+def search_leg(leg, query):
+    """
+    retriever 하나를 실행해서 LegResult(문서, 청크 id, 점수) 반환
+    - BM25/Dense 인덱스: 행 번호로 바로 문서/점수를 가져옴
+    - Chroma: langchain 검색 결과에는 id가 없어서 컬렉션을 직접 조회 (점수 = -거리)
+    - 그 밖의 retriever는 invoke 결과 그대로 (id가 없으면 본문이 키, 점수 없음)
+    """
+    if isinstance(leg, BM25IndexRetriever):
+        rows, scores = leg.index.search_rows(query, leg.k, leg.tags)
+        return _index_result(leg.index, rows, scores)
+    if isinstance(leg, DenseIndexRetriever):
+        vector = leg.embeddings.embed_query(query)
+        rows, scores = leg.index.search_rows(vector, leg.k, leg.tags)
+        return _index_result(leg.index, rows, scores)
+
+    vs = getattr(leg, "vectorstore", None)
+    collection = getattr(vs, "_collection", None)
+    if collection is not None and leg.search_type == "similarity":
+        # Chroma.similarity_search와 같은 조회 (쿼리 임베딩은 캐시를 거침)
+        result = collection.query(
+            query_embeddings=[vs.embeddings.embed_query(query)],
+            n_results=leg.search_kwargs.get("k", 4),
+            where=leg.search_kwargs.get("filter"),
+            include=["documents", "metadatas", "distances"],
+        )
+        ids = result["ids"][0]
+        docs = [
+            Document(page_content=text, metadata=meta or {}, id=doc_id)
+            for doc_id, text, meta in zip(
+                ids, result["documents"][0], result["metadatas"][0]
+            )
+        ]
+        return LegResult(docs, ids, [-d for d in result["distances"][0]])
+
+    docs = leg.invoke(query)
+    return LegResult(docs, [doc_key(doc) for doc in docs], None)
+
+
+def search_legs(query, api_tags, text_k=5, qa_k=20):
+    """
+    원문/QA 하이브리드 검색의 4개 leg(원문 dense, 원문 BM25, QA dense, QA BM25)를 동시에 실행
+    - 지연 시간이 leg 합이 아니라 가장 느린 leg로 결정됨
+    - 반환: {"text": (dense, bm25), "qa": (dense, bm25)} LegResult (없는 leg는 None)
+    """
+    text_dense, text_bm25 = hybrid_retriever_legs(api_tags, text_k)
+    qa_dense, qa_bm25 = hybrid_retriever_legs_qa(api_tags, qa_k)
+
+    legs = [text_dense, text_bm25, qa_dense, qa_bm25]
+    futures = [
+        _leg_executor.submit(search_leg, leg, query) if leg is not None else None
+        for leg in legs
+    ]
+    results = [f.result() if f is not None else None for f in futures]
+
+    return {"text": tuple(results[:2]), "qa": tuple(results[2:])}
+
+
+def hybrid_search(query, api_tags, text_k=5, qa_k=20, method=FUSION_METHOD):
+    """
+    search_legs 결과를 원문/QA 각각 청크 id 기준으로 융합 (HYBRID_WEIGHTS)
+    - 반환: (원문 Document 리스트, QA Document 리스트)
+    """
+    legs = search_legs(query, api_tags, text_k, qa_k)
+    fused = []
+    for name in ("text", "qa"):
+        pool = CandidatePool()
+        pool.add_legs(legs[name], HYBRID_WEIGHTS)
+        fused.append(pool.ranked(method))
+    return fused[0], fused[1]
+
+
+def dump_legs(legs):
+    """
+    search_legs 결과를 그래프 state(체크포인트)에 넣을 수 있는 dict/list로 변환
+    - leg별 {"ids", "texts", "metadatas", "scores"} (없는 leg는 None)
+    """
+    return {
+        name: [
+            (
+                None
+                if leg is None
+                else {
+                    "ids": list(leg.keys),
+                    "texts": [doc.page_content for doc in leg.docs],
+                    "metadatas": [doc.metadata for doc in leg.docs],
+                    "scores": (
+                        None if leg.scores is None else [float(s) for s in leg.scores]
+                    ),
+                }
+            )
+            for leg in pair
+        ]
+        for name, pair in legs.items()
+    }
+
+
+def load_legs(data):
+    """dump_legs 결과를 다시 {"text": (dense, bm25), "qa": (dense, bm25)} LegResult로"""
+    legs = {}
+    for name, pair in data.items():
+        results = []
+        for leg in pair:
+            if leg is None:
+                results.append(None)
+                continue
+            docs = [
+                Document(page_content=text, metadata=meta or {}, id=key)
+                for key, text, meta in zip(leg["ids"], leg["texts"], leg["metadatas"])
+            ]
+            results.append(LegResult(docs, leg["ids"], leg["scores"]))
+        legs[name] = tuple(results)
+    return legs
@@ -1,59 +1,25 @@
 # retriever_bm25.py
-from collections import defaultdict
-from langchain_community.retrievers import BM25Retriever
-from langchain_core.documents import Document
-from .retriever import retriever_setting
-from .retriever_qa import retriever_setting2
-import os, pickle
+from .bm25_engine import BM25IndexRetriever
+from .bm25_store import load_index, COLLECTION_NAME, QA_COLLECTION_NAME
+from .startup import lazy
 
-HERE = os.path.dirname(os.path.abspath(__file__))
-INDEX_FILE_PATH = os.path.join(HERE, "bm25_index.pkl")
-QA_INDEX_FILE_PATH = os.path.join(HERE, "bm25_qa_index.pkl")
+# 처음 검색할 때 또는 startup 워밍업에서 로드 (디스크 인덱스를 mmap, Chroma와 다르면 다시 생성)
+BM25_INDEX = lazy("bm25:text", lambda: load_index(COLLECTION_NAME))
+BM25_QA_INDEX = lazy("bm25:qa", lambda: load_index(QA_COLLECTION_NAME))
 
-BM25_INDEX = None
-BM25_QA_INDEX = None
 
+def _bm25_retriever(index, api_tags, k):
+    # 인덱스에 있는 태그만 남김 (하나도 없으면 BM25 leg 없음)
+    tags = tuple(tag for tag in api_tags or [] if tag in index.tag_ranges)
+    if not tags:
+        return None
+    return BM25IndexRetriever(index=index, tags=tags, k=k)
 
-# 전역에서 한 번만 로드
-def _load_bm25_index(path, retriever_func):
-    if os.path.exists(path):
-        print(f"BM25 인덱스 로드: {path}")
-        with open(path, "rb") as f:
-            return pickle.load(f)
-    else:
-        print(f"BM25 인덱스 없음 → 새로 생성: {path}")
-        vs = retriever_func()
-        data = vs.get(include=["documents", "metadatas"])
-        docs, metas = data["documents"], data["metadatas"]
 
-        tag_docs = defaultdict(list)
-        for doc, meta in zip(docs, metas):
-            tag = meta.get("tags")
-            if tag:
-                tag_docs[tag].append(Document(page_content=doc, metadata=meta))
+# 공유 인덱스는 읽기 전용이고, 태그/k는 retriever마다 따로 가짐
+def bm25_retriever(api_tags, k=5):
+    return _bm25_retriever(BM25_INDEX.get(), api_tags, k)
 
-        bm25_dict = {
-            tag: BM25Retriever.from_documents(dlist) for tag, dlist in tag_docs.items()
-        }
 
-        with open(path, "wb") as f:
-            pickle.dump(bm25_dict, f)
-
-        return bm25_dict
-
-
-# 시작 시 로드
-BM25_INDEX = _load_bm25_index(INDEX_FILE_PATH, retriever_setting)
-BM25_QA_INDEX = _load_bm25_index(QA_INDEX_FILE_PATH, retriever_setting2)
-
-
-def bm25_retrievers_by_tag(k=5):
-    for r in BM25_INDEX.values():
-        r.k = k
-    return BM25_INDEX
-
-
-def bm25_retrievers_by_tag_qa(k=20):
-    for r in BM25_QA_INDEX.values():
-        r.k = k
-    return BM25_QA_INDEX
+def bm25_retriever_qa(api_tags, k=20):
+    return _bm25_retriever(BM25_QA_INDEX.get(), api_tags, k)
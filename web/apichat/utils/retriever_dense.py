@@ -0,0 +1,39 @@
+# retriever_dense.py
+import os
+
+from dotenv import load_dotenv
+
+from .dense_engine import DenseIndexRetriever
+from .dense_store import load_index, COLLECTION_NAME, QA_COLLECTION_NAME
+from .retriever import embeddings
+from .startup import lazy
+
+load_dotenv()
+
+# 하이브리드 검색의 dense leg 엔진
+# - chroma: Chroma HNSW 검색 (기본)
+# - numpy: Chroma 임베딩을 mmap한 DenseIndex로 exact 검색 (dense_engine)
+DENSE_ENGINE = os.getenv("DENSE_ENGINE", "chroma")
+
+# numpy 엔진일 때만 등록 (처음 검색할 때 또는 startup 워밍업에서 로드, Chroma와 다르면 다시 생성)
+DENSE_INDEXES = {}
+if DENSE_ENGINE == "numpy":
+    DENSE_INDEXES = {
+        COLLECTION_NAME: lazy("dense:text", lambda: load_index(COLLECTION_NAME)),
+        QA_COLLECTION_NAME: lazy("dense:qa", lambda: load_index(QA_COLLECTION_NAME)),
+    }
+
+
+def dense_retriever(index, api_tags, k):
+    # Chroma와 같이 태그가 없으면 전체 검색, 인덱스에 없는 태그만 있으면 결과 없음
+    return DenseIndexRetriever(
+        index=index, embeddings=embeddings, tags=tuple(api_tags or ()) or None, k=k
+    )
+
+
+def numpy_dense_retriever(collection, api_tags, k):
+    """DENSE_ENGINE=numpy일 때 공유 DenseIndex retriever (아니면 None → Chroma 사용)"""
+    index = DENSE_INDEXES.get(collection)
+    if index is None:
+        return None
+    return dense_retriever(index.get(), api_tags, k)
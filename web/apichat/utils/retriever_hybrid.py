@@ -1,70 +1,110 @@
-from collections import defaultdict
+import os
+import threading
+from collections import OrderedDict, namedtuple
 from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
-from langchain_core.documents import Document
-from .retriever import retriever_setting
-from .retriever_qa import retriever_setting2
-from .retriever_bm25 import bm25_retrievers_by_tag, bm25_retrievers_by_tag_qa
+from .retriever import vectorstore, COLLECTION_NAME
+from .retriever_qa import (
+    vectorstore as qa_vectorstore,
+    COLLECTION_NAME as QA_COLLECTION_NAME,
+)
+from .retriever_bm25 import bm25_retriever, bm25_retriever_qa
+from .retriever_dense import numpy_dense_retriever
 
-_vs = retriever_setting()
-_vs_qa = retriever_setting2()
+# 하이브리드(Chroma + BM25) 가중치
+HYBRID_WEIGHTS = [0.8, 0.2]
 
+# 미리 만들어 둔 검색 파이프라인 (한 번 만든 뒤에는 바꾸지 않음)
+# - dense: Chroma retriever (DENSE_ENGINE=numpy면 같은 임베딩의 DenseIndex exact 검색)
+# - bm25: 공유 BM25 인덱스를 태그로 걸러 검색하는 retriever (해당 태그가 없으면 None)
+# - hybrid: dense + bm25 앙상블 (bm25가 없으면 dense)
+HybridPipeline = namedtuple("HybridPipeline", ["dense", "bm25", "hybrid"])
 
-def hybrid_retriever_setting(api_tags, k=5):
+# (정렬된 태그, k, 컬렉션) → HybridPipeline LRU 레지스트리
+RETRIEVER_CACHE_SIZE = int(os.getenv("RETRIEVER_CACHE_SIZE", "256"))
+_pipelines = OrderedDict()
+_pipelines_lock = threading.Lock()
+
+
+def _build_pipeline(api_tags, k, collection):
+    # dense leg는 태그 필터 없이 전체 검색 (기존 동작: as_retriever(filter=...)는 적용되지 않았음)
+    # - 태그 필터는 BM25 leg에만 적용, dense에도 걸려면 bench_retrieval 전/후 비교 후 따로 변경
+    if collection == COLLECTION_NAME:
+        # 원문: Chroma, BM25 모두 k개
+        dense = numpy_dense_retriever(collection, None, k)
+        if dense is None:
+            dense = vectorstore.get().as_retriever(search_kwargs={"k": k})
+        bm25 = bm25_retriever(api_tags, k=k)
+    elif collection == QA_COLLECTION_NAME:
+        # QA: Chroma는 5개 고정, BM25만 k개
+        dense = numpy_dense_retriever(collection, None, 5)
+        if dense is None:
+            dense = qa_vectorstore.get().as_retriever(search_kwargs={"k": 5})
+        bm25 = bm25_retriever_qa(api_tags, k=k)
+    else:
+        raise ValueError(f"알 수 없는 컬렉션: {collection}")
+
+    if bm25 is None:
+        hybrid = dense  # BM25 retriever가 없으면 Chroma만 사용
+    else:
+        # 최종 하이브리드 (Chroma + BM25)
+        hybrid = EnsembleRetriever(retrievers=[dense, bm25], weights=HYBRID_WEIGHTS)
+
+    return HybridPipeline(dense=dense, bm25=bm25, hybrid=hybrid)
+
+
+def get_hybrid_pipeline(api_tags, k, collection=COLLECTION_NAME):
     """
-    특정 태그 리스트에 맞는 원문 하이브리드 retriever 생성
-    - api_tags: ["drive"], ["gmail"], ["drive","calendar"] 등
+    레지스트리에서 검색 파이프라인을 꺼내고, 없으면 만들어서 등록
+    - 키: (정렬된 api_tags, k, 컬렉션명)
+    - 요청마다 retriever를 새로 만들지 않고, 공유 객체도 수정하지 않음
     """
-    filters = {}
-    if api_tags:
-        filters["tags"] = {"$in": api_tags}
+    key = (tuple(sorted(set(api_tags or []))), k, collection)
 
-    # Chroma retriever (필터 적용)
-    chroma_retriever = _vs.as_retriever(search_kwargs={"k": k}, filter=filters)
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is not None:
+            _pipelines.move_to_end(key)
+            return pipeline
 
-    # 태그별 BM25 retrievers
-    # bm25_retrievers = 요청된 태그들(api_tags)에 해당하는 BM25Retriever 객체들의 리스트
-    bm25_dict = bm25_retrievers_by_tag(k=k)
-    bm25_retrievers = [bm25_dict[tag] for tag in api_tags if tag in bm25_dict]
+    # 생성은 락 밖에서 (동시에 같은 키를 만들면 먼저 등록된 것을 사용)
+    pipeline = _build_pipeline(key[0], k, collection)
 
-    if not bm25_retrievers:
-        return chroma_retriever  # BM25 retriever가 없으면 Chroma만 반환
+    with _pipelines_lock:
+        pipeline = _pipelines.setdefault(key, pipeline)
+        _pipelines.move_to_end(key)
+        while len(_pipelines) > RETRIEVER_CACHE_SIZE:
+            _pipelines.popitem(last=False)
 
-    if len(bm25_retrievers) == 1:  # 태그가 하나라면 단일 BM25
-        bm25 = bm25_retrievers[0]
-    else:
-        # 여러 태그 BM25 합치기 -> 앙상블
-        bm25 = EnsembleRetriever(
-            retrievers=bm25_retrievers,
-            weights=[1 / len(bm25_retrievers)] * len(bm25_retrievers),  # 동일한 가중치
-        )
-
-    # 최종 하이브리드 (Chroma + BM25)
-    return EnsembleRetriever(retrievers=[chroma_retriever, bm25], weights=[0.8, 0.2])
+    return pipeline
 
 
-def hybrid_retriever_setting_qa(api_tags, k=20):
+def hybrid_retriever_legs(api_tags, k=5):
     """
-    특정 태그 리스트에 맞는 QA 하이브리드 retriever 생성
+    원문 하이브리드 검색의 (Chroma retriever, BM25 retriever 또는 None) 반환
+    - 두 leg를 따로 실행할 수 있도록 분리 (retrieval_executor에서 동시 실행)
     """
-    filters = {}
-    if api_tags:
-        filters["tags"] = {"$in": api_tags}
+    pipeline = get_hybrid_pipeline(api_tags, k, COLLECTION_NAME)
+    return pipeline.dense, pipeline.bm25
 
-    chroma_retriever = _vs_qa.as_retriever(search_kwargs={"k": 5}, filter=filters)
 
-    bm25_dict = bm25_retrievers_by_tag_qa(k=k)
-    bm25_retrievers = [bm25_dict[tag] for tag in api_tags if tag in bm25_dict]
+def hybrid_retriever_legs_qa(api_tags, k=20):
+    """
+    QA 하이브리드 검색의 (Chroma retriever, BM25 retriever 또는 None) 반환
+    """
+    pipeline = get_hybrid_pipeline(api_tags, k, QA_COLLECTION_NAME)
+    return pipeline.dense, pipeline.bm25
 
-    if not bm25_retrievers:
-        return chroma_retriever
 
-    if len(bm25_retrievers) == 1:
-        bm25 = bm25_retrievers[0]
-    else:
-        bm25 = EnsembleRetriever(
-            retrievers=bm25_retrievers,
-            weights=[1 / len(bm25_retrievers)] * len(bm25_retrievers),
-        )
+def hybrid_retriever_setting(api_tags, k=5):
+    """
+    특정 태그 리스트에 맞는 원문 하이브리드 retriever 생성
+    - api_tags: ["drive"], ["gmail"], ["drive","calendar"] 등
+    """
+    return get_hybrid_pipeline(api_tags, k, COLLECTION_NAME).hybrid
 
-    return EnsembleRetriever(retrievers=[chroma_retriever, bm25], weights=[0.8, 0.2])
+
+def hybrid_retriever_setting_qa(api_tags, k=20):
+    """
+    특정 태그 리스트에 맞는 QA 하이브리드 retriever 생성
+    """
+    return get_hybrid_pipeline(api_tags, k, QA_COLLECTION_NAME).hybrid
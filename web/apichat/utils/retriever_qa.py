@@ -1,9 +1,9 @@
 import os
 from dotenv import load_dotenv
 
-import torch
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from .embedding_cache import cached_hf_embeddings
+from .startup import lazy
 from .vector_db_qa import create_chroma_db
 
 # .env 로드
@@ -15,9 +15,9 @@ DB_DIR = os.path.join(HERE, "qa_chroma_db")
 COLLECTION_NAME = "qna_collection"
 EMBED_MODEL = "BAAI/bge-m3"
 
-embeddings = HuggingFaceEmbeddings(
-    model_name=EMBED_MODEL,
-    encode_kwargs={"normalize_embeddings": True},  # DB 생성 시 설정과 일치해야 함
+# 쿼리 임베딩은 캐시를 거침 (원문/QA 검색이 같은 bge-m3 인스턴스와 캐시를 공유)
+embeddings = cached_hf_embeddings(
+    EMBED_MODEL, normalize=True  # DB 생성 시 설정과 일치해야 함
 )
 
 
@@ -54,3 +54,7 @@ def retriever_setting2(force_download=False):
     )
 
     return vs
+
+
+# 프로세스에서 공유하는 벡터스토어 (처음 사용할 때 또는 startup 워밍업에서 로드, 필요하면 다운로드)
+vectorstore = lazy("chroma:qa", retriever_setting2)
@@ -0,0 +1,208 @@
+# semantic_cache.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .bm25_store import indexed_fingerprints
+from .retriever import embeddings
+
+load_dotenv()
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# 코사인 유사도 임계값 (bge-m3 정규화 벡터 기준)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))  # 초
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))
+# 키에 포함할 직전 사용자 질문 개수 (후속 질문이 다른 대화의 답을 받지 않도록)
+SEMANTIC_CACHE_HISTORY_TURNS = int(os.getenv("SEMANTIC_CACHE_HISTORY_TURNS", "1"))
+# 벡터 DB 버전 확인 주기 (초)
+SEMANTIC_CACHE_VERSION_CHECK = int(os.getenv("SEMANTIC_CACHE_VERSION_CHECK", "60"))
+
+# 질문에 드러난 API 태그 힌트 (GOOGLE_API_OPTIONS 키 기준)
+TAG_KEYWORDS = {
+    "map": ["map", "maps", "지도", "맵"],
+    "firestore": ["firestore", "파이어스토어"],
+    "drive": ["drive", "드라이브"],
+    "firebase_authentication": ["firebase", "파이어베이스"],
+    "gmail": ["gmail", "지메일", "메일"],
+    "google_identity": ["identity", "oauth", "인증"],
+    "calendar": ["calendar", "캘린더", "일정"],
+    "bigquery": ["bigquery", "빅쿼리"],
+    "sheets": ["sheets", "sheet", "spreadsheet", "시트", "스프레드시트"],
+    "people": ["people", "contacts", "피플", "연락처"],
+    "youtube": ["youtube", "유튜브"],
+}
+
+# 조회 키 (lookup에서 만든 것을 store에서 그대로 사용)
+CacheKey = namedtuple("CacheKey", ["text", "scope", "vector"])
+CacheEntry = namedtuple("CacheEntry", ["scope", "vector", "answer", "created_at"])
+
+
+def hint_tags(text):
+    """질문에 나온 API 이름으로 태그 힌트 추출 (영문은 단어 단위, 한글은 부분 일치)"""
+    text = text.lower()
+    tags = set()
+    for tag, keywords in TAG_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword.isascii():
+                if re.search(rf"\b{re.escape(keyword)}\b", text):
+                    tags.add(tag)
+                    break
+            elif keyword in text:
+                tags.add(tag)
+                break
+    return tuple(sorted(tags))
+
+
+def cache_text(question, chat_history=None):
+    """
+    캐시 키 문장: 직전 사용자 질문 + 이번 질문
+    - chat_history 마지막 항목은 이번 질문이므로 제외
+    """
+    history = chat_history or []
+    if history and history[-1].get("content") == question:
+        history = history[:-1]
+
+    prior = [m["content"] for m in history if m.get("role") == "user"]
+    prior = (
+        prior[-SEMANTIC_CACHE_HISTORY_TURNS:] if SEMANTIC_CACHE_HISTORY_TURNS else []
+    )
+    return "\n".join(prior + [question])
+
+
+class SemanticCache:
+    """
+    질문 임베딩 유사도 기반 답변 캐시
+    - scope(이미지 첨부 여부/이미지 URL, API 태그 힌트)가 같은 항목끼리만 비교
+    - TTL이 지나면 만료, 크기를 넘으면 가장 오래 안 쓴 항목부터 삭제 (LRU)
+    - 벡터 DB 버전(version_fn)이 바뀌면 전체 비움
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        version_fn=None,
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        ttl=SEMANTIC_CACHE_TTL,
+        max_size=SEMANTIC_CACHE_SIZE,
+        version_check=SEMANTIC_CACHE_VERSION_CHECK,
+    ):
+        self.embed_fn = embed_fn
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version_check = version_check
+
+        self._entries = OrderedDict()  # entry_id → CacheEntry (LRU 순서)
+        self._scopes = {}  # scope → {entry_id, ...}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self.counters = dict.fromkeys(
+            ["hits", "misses", "stores", "evictions", "expired", "invalidations"], 0
+        )
+
+    def _check_version(self, now):
+        if (
+            self.version_fn is None
+            or now - self._version_checked_at < self.version_check
+        ):
+            return
+        self._version_checked_at = now
+        version = self.version_fn()
+        if self._version is not None and version != self._version:
+            print("[semantic_cache] 벡터 DB 버전 변경 → 캐시 비움")
+            self.clear()
+            self.counters["invalidations"] += 1
+        self._version = version
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._scopes[entry.scope]
+        ids.discard(entry_id)
+        if not ids:
+            del self._scopes[entry.scope]
+
+    def make_key(self, question, chat_history=None, image=None):
+        text = cache_text(question, chat_history)
+        scope = (image or None, hint_tags(text))
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        return CacheKey(text=text, scope=scope, vector=vector)
+
+    def lookup(self, question, chat_history=None, image=None):
+        """(캐시된 답변 또는 None, CacheKey) 반환"""
+        now = time.time()
+        self._check_version(now)
+        key = self.make_key(question, chat_history, image)
+
+        with self._lock:
+            ids = list(self._scopes.get(key.scope, ()))
+            for entry_id in ids:
+                if now - self._entries[entry_id].created_at > self.ttl:
+                    self._remove(entry_id)
+                    self.counters["expired"] += 1
+            ids = [i for i in ids if i in self._entries]
+
+            if ids:
+                matrix = np.stack([self._entries[i].vector for i in ids])
+                scores = matrix @ key.vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.counters["hits"] += 1
+                    print(f"[semantic_cache] hit (유사도 {scores[best]:.3f})")
+                    return self._entries[entry_id].answer, key
+
+            self.counters["misses"] += 1
+            return None, key
+
+    def store(self, key, answer):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CacheEntry(
+                scope=key.scope,
+                vector=key.vector,
+                answer=answer,
+                created_at=time.time(),
+            )
+            self._scopes.setdefault(key.scope, set()).add(entry_id)
+            self.counters["stores"] += 1
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries))
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+def is_cacheable(route, answer_quality):
+    # API 질문이고 평가에서 good을 받은 답변만 저장 (일상/불가 답변, 재검색 후 final 답변 제외)
+    return (route or "").strip() == "api" and answer_quality == "good"
+
+
+def _vector_db_version():
+    # BM25 인덱스 manifest의 Chroma fingerprint (build_bm25_index로 다시 만들면 바뀜)
+    return tuple(sorted(indexed_fingerprints().items()))
+
+
+answer_cache = SemanticCache(embeddings.embed_query, _vector_db_version)
@@ -0,0 +1,257 @@
+# startup.py
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 서버 프로세스(asgi) 시작 시 무거운 컴포넌트(모델, Chroma, BM25, 그래프)를 미리 로드하는 방식
+# - background: 백그라운드 스레드에서 로드, 끝날 때까지 /ready/는 503 (기본)
+# - sync: application을 만들기 전에 로드 완료 (워커가 뜨면 바로 준비 상태)
+# - off: 미리 로드하지 않고 처음 사용할 때 로드 (/ready/는 바로 200)
+APICHAT_WARMUP = os.getenv("APICHAT_WARMUP", "background")
+
+# 워밍업에서 실패한 컴포넌트 재시도 (횟수, 첫 대기 초 - 매번 2배, 최대 WARMUP_MAX_BACKOFF)
+WARMUP_RETRIES = int(os.getenv("APICHAT_WARMUP_RETRIES", "5"))
+WARMUP_BACKOFF = float(os.getenv("APICHAT_WARMUP_BACKOFF", "5"))
+WARMUP_MAX_BACKOFF = 120.0
+
+# 워밍업 때 import할 모듈 (lazy 컴포넌트 등록, 첫 요청이 URLconf/뷰 import를 기다리지 않도록)
+WARMUP_MODULES = ("apichat.utils.main3", "codenova.urls")
+
+# 대략적인 프로세스 시작 시점 (asgi.py가 django 설정 직후 import)
+_BOOT = time.perf_counter()
+
+
+class LazyComponent:
+    """
+    처음 get()할 때 loader()를 한 번만 실행하는 싱글톤
+    - 동시에 get()하면 한 스레드만 로드하고 나머지는 락에서 기다림
+    - 상태(pending/loading/ready/failed)와 로드 시간을 기록 (/ready/, 시작 리포트)
+    - 로드에 실패하면 예외를 그대로 올리고, 다음 get()에서 다시 시도
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = "pending"
+        self.seconds = None
+        self.error = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == "ready":
+            return self._value
+        with self._lock:
+            if self.state != "ready":
+                self._load()
+        return self._value
+
+    def _load(self):
+        # self._lock 안에서 호출
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            value = self.loader()
+        except Exception as e:
+            self.seconds = time.perf_counter() - start
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            raise
+        self.seconds = time.perf_counter() - start
+        self.error = None
+        self._value = value
+        self.state = "ready"  # 락 없이 읽는 get()을 위해 마지막에 변경
+
+    def status(self):
+        return {
+            "state": self.state,
+            "seconds": None if self.seconds is None else round(self.seconds, 3),
+            "error": self.error,
+        }
+
+
+_components = OrderedDict()
+_components_lock = threading.Lock()
+
+_warmup = {
+    "state": "pending",
+    "import_seconds": None,
+    "seconds": None,
+    "ready_after": None,
+    "error": None,
+    "retries": 0,
+}
+_warmup_lock = threading.Lock()
+
+
+def lazy(name, loader):
+    """
+    이름별 LazyComponent를 등록해서 반환 (같은 이름이면 처음 등록한 것)
+    - 등록 순서가 워밍업 로드 순서
+    """
+    with _components_lock:
+        component = _components.get(name)
+        if component is None:
+            component = _components[name] = LazyComponent(name, loader)
+        return component
+
+
+def components():
+    with _components_lock:
+        return list(_components.values())
+
+
+def _load_all(modules):
+    """모듈 import 후 ready가 아닌 컴포넌트를 등록 순서대로 로드 (로드 중 새로 등록된 것도 포함)"""
+    start = time.perf_counter()
+    try:
+        for module in modules:
+            importlib.import_module(module)
+        _warmup["error"] = None
+    except Exception as e:
+        _warmup["error"] = f"{type(e).__name__}: {e}"
+        print(f"[startup] 모듈 import 실패: {_warmup['error']}")
+    import_seconds = time.perf_counter() - start
+
+    done = set()
+    while True:
+        pending = [c for c in components() if c.name not in done]
+        if not pending:
+            break
+        for component in pending:
+            done.add(component.name)
+            try:
+                component.get()
+            except Exception as e:
+                print(f"[startup] {component.name} 로드 실패: {e}")
+    return import_seconds
+
+
+def warmup(modules=WARMUP_MODULES):
+    """
+    모듈을 import하고 등록된 컴포넌트를 등록 순서대로 로드한 뒤 시작 리포트 출력
+    - 로드 중에 새로 등록된 컴포넌트도 이어서 로드
+    - 실패한 컴포넌트는 리포트에 남기고 나머지는 계속 로드 (retry_failed에서 다시 시도)
+    """
+    _warmup["state"] = "running"
+    start = time.perf_counter()
+    _warmup["import_seconds"] = _load_all(modules)
+    _warmup["seconds"] = time.perf_counter() - start
+    _warmup["ready_after"] = time.perf_counter() - _BOOT
+    _warmup["state"] = "done"
+    print(startup_report())
+    return readiness()
+
+
+def retry_failed(
+    modules=WARMUP_MODULES, retries=WARMUP_RETRIES, backoff=WARMUP_BACKOFF
+):
+    """
+    워밍업 후 준비되지 않았으면 실패한 import/컴포넌트를 backoff(2배씩)로 다시 로드
+    - 일시적인 실패(Chroma/모델 다운로드 등)로 /ready/가 계속 503이 되지 않도록
+    - 준비되면 ready_after를 갱신하고 시작 리포트를 다시 출력
+    """
+    delay = backoff
+    for attempt in range(1, retries + 1):
+        if readiness()["ready"]:
+            return readiness()
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_MAX_BACKOFF)
+        _warmup["retries"] = attempt
+        print(f"[startup] 실패한 컴포넌트 다시 로드 ({attempt}/{retries})")
+        _load_all(modules)
+        if readiness()["ready"]:
+            _warmup["ready_after"] = time.perf_counter() - _BOOT
+            print(startup_report())
+            return readiness()
+    print(startup_report())
+    return readiness()
+
+
+def _warmup_with_retry():
+    warmup()
+    retry_failed()
+
+
+def start_warmup(mode=None):
+    """
+    서버 시작 시 한 번 호출 (asgi.py)
+    - background면 워밍업 스레드를 띄우고 바로 반환, sync면 끝날 때까지 대기
+    - 실패한 컴포넌트 재시도는 항상 백그라운드 스레드에서
+    """
+    mode = mode or APICHAT_WARMUP
+    with _warmup_lock:
+        if mode == "off" or _warmup["state"] != "pending":
+            return
+        _warmup["state"] = "running"
+
+    if mode == "sync":
+        if not warmup()["ready"]:
+            threading.Thread(
+                target=retry_failed, name="apichat-warmup-retry", daemon=True
+            ).start()
+        return
+    threading.Thread(
+        target=_warmup_with_retry, name="apichat-warmup", daemon=True
+    ).start()
+
+
+def readiness():
+    """
+    컴포넌트별 로드 상태/시간과 준비 여부
+    - 워밍업이 끝나고 모든 컴포넌트가 ready일 때 준비 완료
+    - APICHAT_WARMUP=off면 미리 로드하지 않으므로 항상 준비 완료
+    """
+    statuses = {c.name: c.status() for c in components()}
+    if APICHAT_WARMUP == "off":
+        ready = True
+    else:
+        ready = (
+            _warmup["state"] == "done"
+            and _warmup["error"] is None
+            and all(s["state"] == "ready" for s in statuses.values())
+        )
+    warmup_status = dict(_warmup)
+    for key in ("import_seconds", "seconds", "ready_after"):
+        if warmup_status[key] is not None:
+            warmup_status[key] = round(warmup_status[key], 3)
+    return {"ready": ready, "warmup": warmup_status, "components": statuses}
+
+
+def startup_stats():
+    """/metrics용 숫자 값 (준비 여부, 워밍업 시간, 컴포넌트별 로드 시간)"""
+    status = readiness()
+    stats = {"ready": int(status["ready"])}
+    for key in ("import_seconds", "seconds", "ready_after"):
+        if status["warmup"][key] is not None:
+            stats[f"warmup_{key}"] = status["warmup"][key]
+    for name, component in status["components"].items():
+        if component["seconds"] is not None:
+            stats[f"{name}_seconds"] = component["seconds"]
+    return stats
+
+
+def startup_report():
+    status = readiness()
+    warmup_status = status["warmup"]
+    lines = [
+        f"[startup] 워밍업 {warmup_status['seconds']}s "
+        f"(import {warmup_status['import_seconds']}s, "
+        f"프로세스 시작 후 {warmup_status['ready_after']}s), "
+        f"준비 {'완료' if status['ready'] else '실패'}"
+    ]
+    for name, component in status["components"].items():
+        seconds = (
+            "-" if component["seconds"] is None else f"{component['seconds']:.3f}s"
+        )
+        line = f"  {name:<28} {component['state']:<8} {seconds:>9}"
+        if component["error"]:
+            line += f"  {component['error']}"
+        lines.append(line)
+    return "\n".join(lines)
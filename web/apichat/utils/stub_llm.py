@@ -0,0 +1,275 @@
+# stub_llm.py
+import ast
+import hashlib
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, List
+
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field
+
+load_dotenv()
+
+# LLM_BACKEND=stub일 때 OpenAI 대신 쓰는 로컬 스텁 (네트워크/비용 없이 파이프라인 측정용)
+# 호출당 지연(초), 스트리밍 토큰 사이 지연(초)
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0.3"))
+STUB_LLM_TOKEN_LATENCY = float(os.getenv("STUB_LLM_TOKEN_LATENCY", "0.01"))
+# 종류별 고정 응답을 덮어쓸 JSON 파일 (예: {"classify": "basic", "quality": "bad"})
+STUB_LLM_RESPONSES = os.getenv("STUB_LLM_RESPONSES", "")
+
+DEFAULT_RESPONSES = {
+    "classify": "api",
+    "quality": "good",
+    "answer": "문서에 따르면 요청하신 기능은 해당 API 메서드로 처리할 수 있습니다.",
+    "simple": "안녕하세요! 무엇을 도와드릴까요?",
+    "impossible": "질문하신 내용은 제가 모르는 내용입니다. 일상 질문 혹은 구글 api 관련 질문만 답변드릴수 있어요",
+    "image": "화면 캡처 이미지로, API 요청 코드와 에러 메시지가 보입니다.",
+    "title": "API 사용 문의",
+    "transcription": "구글 드라이브 API로 파일 권한을 수정하는 방법 알려줘",
+}
+
+# 프롬프트에 들어 있는 문구 → 응답 종류 (rag2의 각 체인 프롬프트 기준, 위에서부터 확인)
+PROMPT_KINDS = [
+    ('"questions"', "queries"),
+    ('"docs"', "alternative"),
+    ("분류하세요", "classify"),
+    ("답변 평가자", "quality"),
+    ("일상적인 질문**에만", "simple"),
+    ("답변할 수 없는 챗봇", "impossible"),
+]
+
+stub_config = {
+    "latency": STUB_LLM_LATENCY,
+    "token_latency": STUB_LLM_TOKEN_LATENCY,
+    "responses": dict(DEFAULT_RESPONSES),
+}
+
+
+def configure_stub(latency=None, token_latency=None, responses=None):
+    """실행 중 스텁 설정 변경 (이미 만들어진 체인에도 다음 호출부터 적용)"""
+    if latency is not None:
+        stub_config["latency"] = latency
+    if token_latency is not None:
+        stub_config["token_latency"] = token_latency
+    if responses:
+        stub_config["responses"].update(responses)
+
+
+if STUB_LLM_RESPONSES:
+    with open(STUB_LLM_RESPONSES, encoding="utf-8") as f:
+        configure_stub(responses=json.load(f))
+
+
+def _stable_hash(text):
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16)
+
+
+def _count_tokens(text):
+    # 토크나이저 없이 대략적인 토큰 수 (metrics 집계용)
+    return max(1, len(text) // 3)
+
+
+def _last_question(prompt):
+    """query_setting 프롬프트의 '대화 히스토리: [...]'에서 마지막 사용자 메시지"""
+    match = re.search(r"대화 히스토리: (\[.*\])", prompt)
+    if match:
+        try:
+            history = ast.literal_eval(match.group(1))
+            for message in reversed(history):
+                if message.get("role") == "user":
+                    return message.get("content", "")
+        except (ValueError, SyntaxError, AttributeError):
+            pass
+    return "API 사용 방법"
+
+
+def _section(prompt, start, end):
+    match = re.search(re.escape(start) + r"(.*?)" + re.escape(end), prompt, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def stub_reply(prompt):
+    """프롬프트 → 고정 응답 문자열 (같은 프롬프트면 항상 같은 응답)"""
+    responses = stub_config["responses"]
+    kind = next((k for marker, k in PROMPT_KINDS if marker in prompt), "answer")
+
+    if kind == "queries":
+        question = _last_question(prompt).split("\n")[0]
+        return json.dumps(
+            {"questions": [question, f"How to: {question}"]}, ensure_ascii=False
+        )
+    if kind == "alternative":
+        question = _section(prompt, "사용자의 이번 질문:", "---")
+        return json.dumps(
+            {
+                "docs": [
+                    f"{question}은(는) 해당 API의 메서드를 호출해서 처리합니다.",
+                    f"Use the corresponding API method to handle: {question}",
+                ]
+            },
+            ensure_ascii=False,
+        )
+    if kind == "answer":
+        # 실제 답변처럼 검색 결과 문장을 그대로 사용 (규칙 평가의 겹침 계산이 의미 있도록)
+        context = _section(prompt, "원문 문서 :", "QA 문서 :")
+        if context:
+            return "문서에 따르면 " + context[:400]
+    return responses.get(kind, responses["answer"])
+
+
+def stub_tool_calls(prompt, tools):
+    """
+    llm_tool_calls 프롬프트의 '질문들: [...]'마다 첫 번째 툴 호출 생성
+    - api_tags는 쿼리에 태그 이름이 있으면 그것, 없으면 프롬프트의 선택지 중 해시로 하나
+    """
+    name = tools[0]["function"]["name"]
+    match = re.search(r"질문들: (\[.*?\])", prompt)
+    try:
+        queries = ast.literal_eval(match.group(1)) if match else []
+    except (ValueError, SyntaxError):
+        queries = []
+    options = re.findall(r"^\s*- (\w+): ", prompt, re.MULTILINE)
+
+    calls = []
+    for i, query in enumerate(queries):
+        lowered = query.lower()
+        tags = [tag for tag in options if tag in lowered]
+        if not tags and options:
+            tags = [options[_stable_hash(query) % len(options)]]
+        calls.append(
+            {
+                "name": name,
+                "args": {"query": query, "api_tags": tags},
+                "id": f"call_stub_{i}",
+            }
+        )
+    return calls
+
+
+class StubChatModel(BaseChatModel):
+    """ChatOpenAI 대신 쓰는 결정적 스텁 (ChatOpenAI 인자는 model 외에 무시)"""
+
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+    model_name: str = Field(default="gpt-4o", alias="model")
+
+    @property
+    def _llm_type(self):
+        return "stub-openai"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _message(self, messages, tools):
+        prompt = "\n".join(str(m.content) for m in messages)
+        time.sleep(stub_config["latency"])
+        if tools:
+            content, tool_calls = "", stub_tool_calls(prompt, tools)
+        else:
+            content, tool_calls = stub_reply(prompt), []
+        usage = {
+            "input_tokens": _count_tokens(prompt),
+            "output_tokens": _count_tokens(content or json.dumps(tool_calls)),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata=usage)
+
+    def _generate(
+        self, messages, stop=None, run_manager=None, tools: List[Any] = None, **kwargs
+    ):
+        return ChatResult(
+            generations=[ChatGeneration(message=self._message(messages, tools))]
+        )
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, tools: List[Any] = None, **kwargs
+    ):
+        message = self._message(messages, tools)
+        if tools:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"],
+                            "args": json.dumps(call["args"], ensure_ascii=False),
+                            "id": call["id"],
+                            "index": i,
+                        }
+                        for i, call in enumerate(message.tool_calls)
+                    ],
+                    usage_metadata=message.usage_metadata,
+                )
+            )
+            return
+
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(stub_config["token_latency"])
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=word if i == len(words) - 1 else word + " "
+                )
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        # ChatOpenAI(stream_usage=True)처럼 마지막에 사용량만 담은 청크
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=message.usage_metadata)
+        )
+
+
+class _StubCompletions:
+    def create(self, model=None, messages=None, **kwargs):
+        time.sleep(stub_config["latency"])
+        responses = stub_config["responses"]
+        has_image = any(
+            isinstance(m.get("content"), list)
+            and any(part.get("type") == "image_url" for part in m["content"])
+            for m in messages or []
+        )
+        content = responses["image"] if has_image else responses["title"]
+        return SimpleNamespace(
+            model=model,
+            choices=[
+                SimpleNamespace(
+                    index=0,
+                    finish_reason="stop",
+                    message=SimpleNamespace(role="assistant", content=content),
+                )
+            ],
+            usage=SimpleNamespace(
+                prompt_tokens=_count_tokens(str(messages)),
+                completion_tokens=_count_tokens(content),
+            ),
+        )
+
+
+class _StubTranscriptions:
+    def create(self, model=None, file=None, **kwargs):
+        time.sleep(stub_config["latency"])
+        return SimpleNamespace(text=stub_config["responses"]["transcription"])
+
+
+class StubOpenAIClient:
+    """openai.OpenAI 중 서비스가 쓰는 부분(chat.completions, audio.transcriptions)만 흉내"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_StubCompletions())
+        self.audio = SimpleNamespace(transcriptions=_StubTranscriptions())
+
+    def with_options(self, **kwargs):
+        return self
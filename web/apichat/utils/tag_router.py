@@ -0,0 +1,185 @@
+# tag_router.py
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .bm25_engine import index_lock
+from .bm25_store import VECTORSTORES, indexed_fingerprints
+from .retriever import embeddings
+
+load_dotenv()
+
+TAG_ROUTER_ENABLED = os.getenv("TAG_ROUTER_ENABLED", "1") == "1"
+# 1위/2위 태그 유사도 차이가 이 값보다 작으면 LLM(bind_tools)으로 태그 선택
+TAG_ROUTER_MARGIN = float(os.getenv("TAG_ROUTER_MARGIN", "0.04"))
+TAG_ROUTER_CACHE_SIZE = int(os.getenv("TAG_ROUTER_CACHE_SIZE", "1024"))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CENTROIDS_FILE_PATH = os.path.join(HERE, "tag_centroids.npz")
+
+# Chroma get 배치 크기 (임베딩 전체를 한 번에 올리지 않도록)
+_BATCH_SIZE = 5000
+
+
+def compute_centroids(vectorstores, tags):
+    """
+    Chroma에 저장된 문서 임베딩을 tags metadata별로 평균 내서 태그 중심 벡터 계산
+    - tags: 라우팅 대상 태그 (GOOGLE_API_OPTIONS 키), 그 외 태그의 문서는 무시
+    """
+    sums, counts = {}, {}
+    for vs in vectorstores:
+        offset = 0
+        while True:
+            data = vs.get(
+                include=["embeddings", "metadatas"], limit=_BATCH_SIZE, offset=offset
+            )
+            metas = data["metadatas"]
+            if not metas:
+                break
+            vectors = np.asarray(data["embeddings"], dtype=np.float32)
+            for vec, meta in zip(vectors, metas):
+                tag = (meta or {}).get("tags")
+                if tag not in tags:
+                    continue
+                if tag not in sums:
+                    sums[tag] = np.zeros_like(vec)
+                    counts[tag] = 0
+                sums[tag] += vec
+                counts[tag] += 1
+            offset += len(metas)
+
+    names = sorted(sums)
+    if not names:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    centroids = np.stack([sums[t] / counts[t] for t in names])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return names, centroids
+
+
+class TagRouter:
+    """
+    쿼리 임베딩과 태그 중심 벡터의 코사인 유사도로 api_tags 선택
+    - 1위와 2위 차이가 margin 이상이면 1위 태그 하나를 선택
+    - 그보다 가까우면 None (LLM이 선택하도록)
+    - 같은 쿼리는 같은 결과이므로 LRU로 캐시
+    """
+
+    def __init__(self, tags, centroids, embed_fn, margin=TAG_ROUTER_MARGIN):
+        self.tags = list(tags)
+        self.centroids = centroids
+        self.embed_fn = embed_fn
+        self.margin = margin
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(["local", "fallback"], 0)
+
+    def scores(self, query):
+        vec = np.asarray(self.embed_fn(query), dtype=np.float32)
+        vec /= np.linalg.norm(vec) or 1.0
+        return self.centroids @ vec
+
+    def _route(self, query):
+        if len(self.tags) == 0:
+            return None
+        if len(self.tags) == 1:
+            return [self.tags[0]]
+
+        scores = self.scores(query)
+        second, first = np.argsort(scores)[-2:]
+        if scores[first] - scores[second] < self.margin:
+            return None
+        return [self.tags[first]]
+
+    def route(self, query):
+        """쿼리의 api_tags 리스트, 애매하면 None"""
+        with self._lock:
+            if query in self._cache:
+                self._cache.move_to_end(query)
+                tags = self._cache[query]
+                self.counters["local" if tags else "fallback"] += 1
+                return tags
+
+        tags = self._route(query)
+
+        with self._lock:
+            self._cache[query] = tags
+            while len(self._cache) > TAG_ROUTER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            self.counters["local" if tags else "fallback"] += 1
+        return tags
+
+    def route_queries(self, queries):
+        """(로컬로 정한 [(쿼리, api_tags)], LLM에 맡길 쿼리 리스트)"""
+        routed, pending = [], []
+        for query in queries:
+            tags = self.route(query)
+            if tags:
+                routed.append((query, tags))
+            else:
+                pending.append(query)
+        return routed, pending
+
+
+def _read_centroids(fingerprint, options):
+    """저장된 중심 벡터 (태그, 행렬), 없거나 fingerprint/태그 목록이 다르거나 읽기 실패면 None"""
+    if not os.path.exists(CENTROIDS_FILE_PATH):
+        return None
+    try:
+        with np.load(CENTROIDS_FILE_PATH, allow_pickle=False) as data:
+            if (
+                str(data["fingerprint"]) != fingerprint
+                or list(data["options"]) != options
+            ):
+                return None
+            return list(data["tags"]), data["centroids"]
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        print(f"태그 중심 벡터 읽기 실패 → 다시 계산: {type(e).__name__}: {e}")
+        return None
+
+
+def _load_centroids(tags):
+    """
+    tag_centroids.npz 로드, 없거나 Chroma fingerprint가 다르면 다시 계산해서 저장
+    - fingerprint는 BM25 인덱스 manifest 값 (시작 시 Chroma와 대조해 갱신됨)
+    - 계산/저장은 index_lock 안에서, 임시 파일에 쓴 뒤 os.replace로 교체
+      (여러 워커가 동시에 워밍업해도 반쯤 쓴 파일을 읽지 않도록)
+    """
+    fingerprint = repr(sorted(indexed_fingerprints().items()))
+    options = sorted(tags)
+
+    loaded = _read_centroids(fingerprint, options)
+    if loaded is not None:
+        print(f"태그 중심 벡터 로드: {CENTROIDS_FILE_PATH}")
+        return loaded
+
+    with index_lock(CENTROIDS_FILE_PATH):
+        # 락을 기다리는 동안 다른 워커가 이미 저장했으면 그대로 사용
+        loaded = _read_centroids(fingerprint, options)
+        if loaded is not None:
+            print(f"태그 중심 벡터 로드 (다른 프로세스가 생성): {CENTROIDS_FILE_PATH}")
+            return loaded
+
+        print(f"태그 중심 벡터 생성: {CENTROIDS_FILE_PATH}")
+        names, centroids = compute_centroids([f() for f in VECTORSTORES.values()], tags)
+        tmp_path = f"{CENTROIDS_FILE_PATH}.tmp-{os.getpid()}"
+        # 파일 객체로 넘겨야 np.savez가 이름 끝에 .npz를 붙이지 않음
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                tags=np.array(names, dtype=str),
+                options=np.array(options, dtype=str),
+                centroids=centroids,
+                fingerprint=np.array(fingerprint),
+            )
+        os.replace(tmp_path, CENTROIDS_FILE_PATH)
+    return names, centroids
+
+
+def build_tag_router(tags):
+    names, centroids = _load_centroids(tags)
+    print(f"태그 라우터 준비: {names}")
+    return TagRouter(names, centroids, embeddings.embed_query)
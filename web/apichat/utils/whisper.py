@@ -1,7 +1,8 @@
-import openai
 import os
 from dotenv import load_dotenv
 
+from .http_client import get_openai_client
+
 load_dotenv()
 
 
@@ -14,7 +15,7 @@ def call_whisper_api(audio_file):
                 f.write(chunk)
 
         # OpenAI 1.0.0+ 방식으로 Whisper API 호출
-        client = openai.OpenAI()
+        client = get_openai_client()  # 공유 커넥션 풀
         with open(temp_path, "rb") as audio_file_obj:
             transcript = client.audio.transcriptions.create(
                 model="whisper-1", file=audio_file_obj, language="ko"
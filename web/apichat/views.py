@@ -2,22 +2,24 @@ import json
 import os, re, textwrap
 from difflib import SequenceMatcher
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
 
+from asgiref.sync import sync_to_async
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 
 from main.models import Card, ChatMessage
 from main.models import ChatSession, CardMessage, ChatImage
 from uauth.models import *
-from .utils.main3 import run_langraph
+from .utils.main3 import run_langraph, astream_langraph
 from .utils.whisper import call_whisper_api
+from .utils.http_client import chat_openai, get_openai_client
+from .utils.metrics import render_prometheus
 from .aws_s3_service import S3Client
 
 from dotenv import load_dotenv
@@ -25,7 +27,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 제목 요약을 위한 LangChain용 LLM
-title_llm = ChatOpenAI(
+title_llm = chat_openai(
     model="gpt-4o",
     temperature=0.2,
     max_tokens=30,
@@ -57,7 +59,7 @@ title_chain = title_prompt | title_llm | StrOutputParser()
 suggest_model = os.getenv("OPENAI_SUGGEST_MODEL", "gpt-4o-mini")
 
 # LangChain LLM 객체
-suggest_llm = ChatOpenAI(
+suggest_llm = chat_openai(
     model=suggest_model,
     temperature=0.4,
     max_tokens=150,
@@ -173,30 +175,24 @@ def initial_title_with_llm(first_question: str) -> str:
 
     try:
         print("[title] initial via LLM")
-        import requests
-
-        url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        body = {
-            "model": OPENAI_TITLE_MODEL,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "Return only the title text. No punctuation at the end.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.2,
-            "max_tokens": 30,
-        }
-        r = requests.post(url, headers=headers, json=body, timeout=12)
-        if not r.ok:
-            print("[title] status:", r.status_code, "body:", r.text[:300])
-            r.raise_for_status()
-        raw = r.json()["choices"][0]["message"]["content"]
+        # 공유 커넥션 풀 사용, 제목 생성은 짧게 끊음 (재시도 없음)
+        r = (
+            get_openai_client()
+            .with_options(timeout=12, max_retries=0)
+            .chat.completions.create(
+                model=OPENAI_TITLE_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Return only the title text. No punctuation at the end.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.2,
+                max_tokens=30,
+            )
+        )
+        raw = r.choices[0].message.content
         title = sanitize_title(raw)
 
         if is_echo_like(title, first_question) or len(tokens(title)) < 2:
@@ -268,6 +264,62 @@ def update_session_title_inline(session, all_messages):
             session.save(update_fields=["title"])
 
 
+def build_chat_history(session, user_message):
+    """
+    최근 6개 메시지 + 이번 사용자 메시지로 LangGraph 입력 히스토리 구성
+    """
+    db_chat_history = []
+    messages = ChatMessage.objects.filter(session=session).order_by("-created_at")[:6]
+    messages = reversed(messages)
+
+    for msg in messages:
+        if msg.role == "user":
+            db_chat_history.append({"role": "user", "content": msg.content})
+        else:
+            db_chat_history.append({"role": "assistant", "content": msg.content})
+
+    db_chat_history.append({"role": "user", "content": user_message})
+    return db_chat_history
+
+
+def save_chat_turn(session, user_message, response, image_url=None):
+    """
+    사용자/봇 메시지 저장 + 추천 질문 생성 + 제목 갱신 후 응답 데이터 반환
+    """
+    # 사용자 메시지 저장
+    user_msg = ChatMessage.objects.create(
+        session=session, role="user", content=user_message
+    )
+
+    # 이미지 URL이 있으면 ChatImage 객체 생성
+    if image_url:
+        ChatImage.objects.create(message=user_msg, image_url=image_url)
+
+    # 추천 질문 생성(assistant 저장 전)
+    suggestions = generate_suggestions(user_message, response, k=5)
+
+    # 봇 응답 저장
+    ChatMessage.objects.create(
+        session=session, role="assistant", content=response, suggestions=suggestions
+    )
+
+    # 제목 갱신
+    all_msgs = list(ChatMessage.objects.filter(session=session).order_by("created_at"))
+    update_session_title_inline(session, all_msgs)
+
+    response_data = {
+        "success": True,
+        "bot_message": response,
+        "title": session.title,
+        "suggestions": suggestions,
+    }
+
+    if image_url:
+        response_data["image_url"] = image_url
+
+    return response_data
+
+
 # 제목 요약
 @csrf_exempt
 @login_required
@@ -286,21 +338,7 @@ def chat(request):
             except ChatSession.DoesNotExist:
                 return JsonResponse({"error": "세션을 찾을 수 없습니다."}, status=404)
 
-            db_chat_history = []
-            messages = ChatMessage.objects.filter(session=session).order_by(
-                "-created_at"
-            )[:6]
-            messages = reversed(messages)
-
-            for msg in messages:
-                if msg.role == "user":
-                    db_chat_history.append({"role": "user", "content": msg.content})
-                else:
-                    db_chat_history.append(
-                        {"role": "assistant", "content": msg.content}
-                    )
-
-            db_chat_history.append({"role": "user", "content": user_message})
+            db_chat_history = build_chat_history(session, user_message)
 
             # S3에 업로드
             image_url = None
@@ -323,52 +361,105 @@ def chat(request):
                 else:
                     response = f"응답 생성 중 오류가 발생했습니다: {str(e)}"
 
-            # 사용자 메시지 저장
-            user_msg = ChatMessage.objects.create(
-                session=session, role="user", content=user_message
-            )
+            response_data = save_chat_turn(session, user_message, response, image_url)
 
-            # 이미지 URL이 있으면 ChatImage 객체 생성
-            if image_url:
-                ChatImage.objects.create(message=user_msg, image_url=image_url)
-                
-            # 추천 질문 생성(assistant 저장 전)
-            suggestions = generate_suggestions(user_message, response, k=5)
+            return JsonResponse(response_data)
 
-            # 봇 응답 저장
-            ChatMessage.objects.create(
-                session=session,
-                role="assistant",
-                content=response,
-                suggestions=suggestions
-            )
+        except Exception as e:
+            import traceback
 
-            # 제목 갱신
-            all_msgs = list(
-                ChatMessage.objects.filter(session=session).order_by("created_at")
+            print(f"Chat 오류 상세: {str(e)}")
+            print(f"Traceback: {traceback.format_exc()}")
+            return JsonResponse(
+                {"error": f"서버 오류가 발생했습니다: {str(e)}"}, status=500
             )
-            update_session_title_inline(session, all_msgs)
 
-            response_data = {
-                "success": True,
-                "bot_message": response,
-                "title": session.title,
-                "suggestions": suggestions,
-            }
 
-            if image_url:
-                response_data["image_url"] = image_url
+def sse_event(event, data):
+    """SSE(server-sent events) 형식 문자열 생성"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
 
-            return JsonResponse(response_data)
+
+# 토큰 스트리밍(SSE) 채팅
+@csrf_exempt
+@login_required
+async def chat_stream(request):
+    """
+    chat과 입력/저장 방식은 같고, 응답을 SSE로 흘려보냄
+    - progress: 노드 진행 상황 (분류 결과, 검색 청크 수 등)
+    - token: 답변 토큰
+    - reset: 재검색 후 답변을 다시 생성 (클라이언트는 받은 토큰을 비움)
+    - done: 저장된 최종 답변 + 제목 + 추천 질문
+    - error: 서버 오류
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST 요청만 허용됩니다."}, status=405)
+
+    user = await request.auser()
+    user_message = request.POST.get("message")
+    session_id = request.POST.get("session_id")
+    image_file = request.FILES.get("image")
+
+    if not session_id:
+        return JsonResponse({"error": "세션 ID가 필요합니다."}, status=400)
+
+    try:
+        session = await ChatSession.objects.aget(id=session_id, user=user)
+    except ChatSession.DoesNotExist:
+        return JsonResponse({"error": "세션을 찾을 수 없습니다."}, status=404)
+
+    db_chat_history = await sync_to_async(build_chat_history)(session, user_message)
+
+    # S3에 업로드
+    image_url = None
+    if image_file:
+        image_url = await sync_to_async(S3Client().upload)(image_file)
+        if not image_url:
+            return JsonResponse({"error": "이미지 업로드에 실패했습니다."}, status=500)
+
+    async def event_stream():
+        try:
+            response = None
+            async for event in astream_langraph(
+                user_message, session_id, image_url, db_chat_history
+            ):
+                if event["type"] == "answer":
+                    response = event["text"]
+                    continue
+                data = {k: v for k, v in event.items() if k != "type"}
+                yield sse_event(event["type"], data)
+
+            response_data = await sync_to_async(save_chat_turn)(
+                session, user_message, response, image_url
+            )
+            yield sse_event("done", response_data)
 
         except Exception as e:
             import traceback
 
-            print(f"Chat 오류 상세: {str(e)}")
+            print(f"Chat stream 오류 상세: {str(e)}")
             print(f"Traceback: {traceback.format_exc()}")
-            return JsonResponse(
-                {"error": f"서버 오류가 발생했습니다: {str(e)}"}, status=500
-            )
+            yield sse_event("error", {"error": f"서버 오류가 발생했습니다: {str(e)}"})
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # 프록시(nginx) 버퍼링 비활성화
+    return response
+
+
+def metrics(request):
+    """
+    Prometheus 수집용 지표 (노드/LLM 시간, 토큰 수, 검색 결과 수, 캐시 카운터)
+    - 워커 프로세스별 값이므로 워커마다 따로 수집하거나 JSON 로그(METRICS_JSON_LOG)로 집계
+    - Authorization: Bearer METRICS_TOKEN 이 일치해야 함 (METRICS_TOKEN이 없으면 항상 거부)
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if not token or request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=403)
+    return HttpResponse(
+        render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @csrf_exempt
@@ -385,21 +476,7 @@ def transcribe_audio(request):
             transcribed_text = call_whisper_api(audio_file)
 
             # 채팅 히스토리 가져오기
-            db_chat_history = []
-            messages = ChatMessage.objects.filter(session=session).order_by(
-                "-created_at"
-            )[:6]
-            messages = reversed(messages)
-
-            for msg in messages:
-                if msg.role == "user":
-                    db_chat_history.append({"role": "user", "content": msg.content})
-                else:
-                    db_chat_history.append(
-                        {"role": "assistant", "content": msg.content}
-                    )
-
-            db_chat_history.append({"role": "user", "content": transcribed_text})
+            db_chat_history = build_chat_history(session, transcribed_text)
 
             # run_langraph 호출
             try:
@@ -20,3 +20,8 @@ application = get_asgi_application()
 # blacknoise(asgi전용) 설정
 application = BlackNoise(get_asgi_application())
 application.add(settings.BASE_DIR / "staticfiles", "/static")
+
+# apichat 컴포넌트 워밍업 (APICHAT_WARMUP, 진행 상태는 /ready/)
+from apichat.utils.startup import start_warmup
+
+start_warmup()
@@ -1,8 +1,10 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from apichat.views import metrics
+from apichat.utils.startup import readiness
 
 
 # health_check 함수
@@ -10,9 +12,19 @@ def health_check(request):
     return HttpResponse("OK", status=200)
 
 
+# readiness 함수: 워밍업(모델, Chroma, BM25, 그래프 로드)이 끝나기 전에는 503
+# (로드밸런서 헬스체크는 /ready/로 → 준비 안 된 워커로 요청을 보내지 않음, /health/는 프로세스 생존 확인)
+def ready_check(request):
+    status = readiness()
+    return JsonResponse(status, status=200 if status["ready"] else 503)
+
+
 urlpatterns = [
     path("health/", health_check),
     path("health", health_check),
+    path("ready/", ready_check),
+    path("ready", ready_check),
+    path("metrics", metrics),
     path("admin/", admin.site.urls),
     path("", include("uauth.urls")),
     path("main/", include("main.urls")),
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "codenova.settings")
 
 application = get_wsgi_application()
+
+# apichat 컴포넌트 워밍업 (APICHAT_WARMUP, 진행 상태는 /ready/)
+from apichat.utils.startup import start_warmup
+
+start_warmup()
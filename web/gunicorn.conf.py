@@ -1,9 +1,26 @@
 # gunicorn 실행옵션 python 변수로 선언
 import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlparse
 
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # workers 워커프로세스 개수
-workers = min(multiprocessing.cpu_count(), 1)
+# - 워커마다 bge-m3(약 2.3GB)를 올리면 1개만 가능
+# - 임베딩 서비스(manage.py run_embedding_service)를 쓰면 워커는 클라이언트만 가지므로 여러 개 실행
+# - 단, RERANKER_ENABLED=1이면 워커마다 cross-encoder(bge-reranker-v2-m3, 약 2.2GB)를 올리므로 1개
+#   (메모리가 충분하면 GUNICORN_WORKERS로 직접 지정)
+if os.getenv("EMBEDDING_SERVICE_URL") and os.getenv("RERANKER_ENABLED", "0") != "1":
+    default_workers = min(multiprocessing.cpu_count(), 4)
+else:
+    default_workers = 1
+workers = int(os.getenv("GUNICORN_WORKERS", default_workers))
 print("workers =", workers)
 
 # bind 주소/포트
@@ -23,3 +40,44 @@ max_requests_jitter = 100
 
 # wsgi_app 실행한 모듈 application
 wsgi_app = "codenova.asgi:application"
+
+
+# EMBEDDING_SERVICE_AUTOSTART=1이면 마스터가 임베딩 서비스를 띄우고 준비될 때까지 기다린 뒤 워커 시작
+embedding_service = None
+
+
+def on_starting(server):
+    global embedding_service
+    url = os.getenv("EMBEDDING_SERVICE_URL")
+    if not url or os.getenv("EMBEDDING_SERVICE_AUTOSTART", "0") != "1":
+        return
+
+    parsed = urlparse(url)
+    embedding_service = subprocess.Popen(
+        [
+            sys.executable,
+            "manage.py",
+            "run_embedding_service",
+            "--host",
+            parsed.hostname,
+            "--port",
+            str(parsed.port or 80),
+        ]
+    )
+
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if embedding_service.poll() is not None:
+            raise RuntimeError("임베딩 서비스가 시작 중 종료됨")
+        try:
+            urllib.request.urlopen(url.rstrip("/") + "/health", timeout=2)
+            print("임베딩 서비스 준비 완료:", url)
+            return
+        except OSError:
+            time.sleep(2)
+    raise RuntimeError("임베딩 서비스 시작 시간 초과")
+
+
+def on_exit(server):
+    if embedding_service is not None:
+        embedding_service.terminate()
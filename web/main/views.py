@@ -2,8 +2,6 @@ import json
 import chromadb
 
 import threading
-import torch
-from sentence_transformers import SentenceTransformer
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
@@ -11,6 +9,8 @@ from django.views.decorators.http import require_POST, require_GET
 from django.http import JsonResponse, HttpResponseForbidden
 from django.core.paginator import Paginator
 
+from apichat.utils.embedding_cache import cached_hf_embeddings
+
 from .models import Post, Comment, Card, ChatMessage
 from .forms import CommentForm, PostForm
 
@@ -190,16 +190,15 @@ def delete_post(request, post_id):
 
 collection = None
 search_lock = threading.RLock()
-bge = None
 
 class Bge_M3:
+    """
+    chromadb embedding_function
+    - apichat 검색과 같은 bge-m3 인스턴스(또는 임베딩 서비스)를 사용해서 모델을 따로 올리지 않음
+    """
+
     def model(self):
-        global bge
-        if bge is None:
-            with search_lock:
-                if bge is None:
-                    bge = SentenceTransformer("BAAI/bge-m3", device="cpu")
-        return bge
+        return cached_hf_embeddings("BAAI/bge-m3", normalize=True).inner
 
     def _to_texts(self, x):
         if isinstance(x, str):
@@ -211,34 +210,19 @@ class Bge_M3:
         return ["" if t is None else str(t) for t in xs]
 
     def embed_documents(self, texts):
-        texts = self._to_texts(texts)
-        with torch.inference_mode():
-            embs = self.model().encode(
-                texts,
-                normalize_embeddings=True,
-                batch_size=1,
-                show_progress_bar=False,
-            )
-        return embs.tolist() 
+        return self.model().embed_documents(self._to_texts(texts))
 
     def embed_query(self, input):
         is_batch = isinstance(input, (list, tuple))
-        texts = self._to_texts(input)
-
-        with torch.inference_mode():
-            embs = self.model().encode(
-                texts,
-                normalize_embeddings=True,
-                batch_size=1,
-                show_progress_bar=False,
-            )
-
-        return embs.tolist() if is_batch else embs[0].tolist()
+        embs = self.model().embed_documents(self._to_texts(input))
+        return embs if is_batch else embs[0]
 
     def __call__(self, input):
         return self.embed_documents(input)
 
 embedding_fn = Bge_M3()
+# 검색 쿼리 임베딩 캐시 (apichat 검색과 같은 키 → 같은 질문이면 서로 재사용)
+query_embedding_fn = cached_hf_embeddings("BAAI/bge-m3", normalize=True)
 
 def ensure_search_initialized():
     global collection
@@ -302,7 +286,7 @@ def search_dense(q, k):
     with search_lock:
         print("before query")
         res = collection.query(
-            query_texts=[q],
+            query_embeddings=[query_embedding_fn.embed_query(q)],
             n_results=k * 3,
             include=["metadatas"],
         )